@@ -0,0 +1,67 @@
+"""
+Compare two sets of benchmark results, for example from ``master`` and a
+feature branch.
+
+Usage::
+
+    python -m benchmarks.compare before.json after.json --threshold=1.2
+
+The exit code is 1 if any benchmark got slower by more than the threshold.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+
+from targ import CLI
+
+
+def compare(before: str, after: str, threshold: float = 1.2):
+    """
+    Compare two benchmark results files.
+
+    :param before:
+        The path to the baseline results.
+    :param after:
+        The path to the new results.
+    :param threshold:
+        The ratio of new to old times, above which a benchmark is considered
+        to have regressed.
+
+    """
+    with open(before) as f:
+        before_results = json.load(f)["results"]
+
+    with open(after) as f:
+        after_results = json.load(f)["results"]
+
+    regressions = []
+
+    print(f"{'Benchmark':<24} {'Before (us)':>14} {'After (us)':>14} Ratio")
+
+    for name, after_result in after_results.items():
+        before_result = before_results.get(name)
+        if before_result is None:
+            continue
+
+        ratio = after_result["median"] / before_result["median"]
+        if ratio > threshold:
+            regressions.append(name)
+
+        print(
+            f"{name:<24} "
+            f"{before_result['median'] * 1e6:>14.2f} "
+            f"{after_result['median'] * 1e6:>14.2f} "
+            f"{ratio:.2f}{' *' if ratio > threshold else ''}"
+        )
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmarks regressed: {regressions}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    cli = CLI(description="Compare benchmarks")
+    cli.register(compare)
+    cli.run(solo=True)
@@ -0,0 +1,198 @@
+"""
+Benchmarks for targ's hot paths - registering commands, finding the command
+to run, parsing and converting arguments, rendering help text, and the cold
+start time of a script.
+
+Usage::
+
+    python -m benchmarks.run --output=results.json
+
+Compare the results with another commit using ``benchmarks.compare``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from collections.abc import Callable
+from typing import Any, Optional
+
+from targ import __VERSION__, CLI
+
+from .synthetic import get_commands, get_script
+
+SIZES = (10, 100, 1000)
+
+
+def measure(
+    function: Callable[[], Any], number: int = 1, repeat: int = 5
+) -> dict[str, Any]:
+    """
+    :returns:
+        The time per call in seconds - the median and minimum across the
+        repeats.
+    """
+    timings = [
+        i / number
+        for i in timeit.repeat(function, number=number, repeat=repeat)
+    ]
+    return {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _get_cli(commands: list) -> CLI:
+    cli = CLI()
+    for index, command in enumerate(commands):
+        cli.register(command, group_name=f"group_{index // 10}")
+    return cli
+
+
+def benchmark_in_process(size: int) -> dict[str, Any]:
+    commands = get_commands(size)
+    cli = _get_cli(commands)
+    last = size - 1
+    group_name = f"group_{last // 10}"
+    args = ["bob", "3", "--ratio=0.1", "--verbose", "--label=x"]
+
+    def register():
+        _get_cli(commands)
+
+    def dispatch():
+        cli._find_command([group_name, f"command_{last}", *args])
+
+    def parse_args():
+        cli._get_arg_class(args)
+
+    command = cli._get_command(f"command_{last}", group_name=group_name)
+    assert command is not None
+    arg_class = cli._get_arg_class(args)
+
+    def call():
+        command.call_with(arg_class)
+
+    def first_call():
+        # Includes the introspection of a newly registered command.
+        _get_cli(commands[-1:]).commands[0].call_with(arg_class)
+
+    def help_text():
+        with contextlib.redirect_stdout(io.StringIO()):
+            cli.get_help_text()
+            command.print_help()
+
+    def render_help():
+        # Excludes the caching, so the help text is rendered each time.
+        cli._help_text_cache.clear()
+        command._help_text_cache.clear()
+        help_text()
+
+    return {
+        f"register[{size}]": measure(register, number=1),
+        f"dispatch[{size}]": measure(dispatch, number=10000),
+        f"parse_args[{size}]": measure(parse_args, number=10000),
+        f"first_call[{size}]": measure(first_call, number=100),
+        f"call[{size}]": measure(call, number=10000),
+        f"help[{size}]": measure(help_text, number=10),
+        f"render_help[{size}]": measure(render_help, number=10),
+    }
+
+
+def benchmark_cold_start(size: int, repeat: int = 5) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        script_path = os.path.join(temp_dir, "cli.py")
+        with open(script_path, "w") as f:
+            f.write(get_script(size))
+
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.path.dirname(os.path.dirname(__file__)),
+        }
+
+        def run():
+            subprocess.run(
+                [
+                    sys.executable,
+                    script_path,
+                    "group_0",
+                    "command_0",
+                    "a",
+                    "1",
+                ],
+                env=env,
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+
+        # Warm up the file system cache, and write the bytecode.
+        run()
+
+        return {f"cold_start[{size}]": measure(run, repeat=repeat)}
+
+
+def _get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(output: Optional[str] = None, quick: bool = False):
+    """
+    Run the benchmarks.
+
+    :param output:
+        Save the results as JSON to this path.
+    :param quick:
+        Only run the smallest size, e.g. as a sanity check.
+
+    """
+    sizes = SIZES[:1] if quick else SIZES
+    results: dict[str, Any] = {}
+
+    for size in sizes:
+        results.update(benchmark_in_process(size))
+        results.update(benchmark_cold_start(size))
+
+    for name, result in results.items():
+        print(f"{name:<24} {result['median'] * 1e6:>14.2f} us")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(
+                {
+                    "metadata": {
+                        "targ_version": __VERSION__,
+                        "commit": _get_commit(),
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "timestamp": time.time(),
+                    },
+                    "results": results,
+                },
+                f,
+                indent=4,
+            )
+        print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    cli = CLI(description="Targ benchmarks")
+    cli.register(run)
+    cli.run(solo=True)
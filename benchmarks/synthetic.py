@@ -0,0 +1,75 @@
+"""
+Generates synthetic commands, with realistic signatures and docstrings, for
+benchmarking.
+"""
+
+from __future__ import annotations
+
+import textwrap
+
+COMMAND_TEMPLATE = '''
+def command_{index}(
+    name: str,
+    count: int,
+    ratio: float = 0.5,
+    verbose: bool = False,
+    label: Optional[str] = None,
+):
+    """
+    Command number {index}, which does something useful.
+
+    This is a longer description, which explains in more detail what the
+    command does, and when you might want to use it.
+
+    :param name:
+        The name of the thing to process.
+    :param count:
+        How many times to process it.
+    :param ratio:
+        A tuning parameter, between 0 and 1.
+    :param verbose:
+        If set, more output is shown.
+    :param label:
+        An optional label to attach.
+
+    """
+    return count
+'''
+
+
+def get_source(count: int) -> str:
+    """
+    :returns:
+        The source code for a module containing ``count`` commands, named
+        ``command_0`` to ``command_{count - 1}``.
+    """
+    return "from typing import Optional\n" + "".join(
+        textwrap.dedent(COMMAND_TEMPLATE).format(index=index)
+        for index in range(count)
+    )
+
+
+def get_script(count: int) -> str:
+    """
+    :returns:
+        The source code for a script which registers ``count`` commands, in
+        groups of 10.
+    """
+    return (
+        get_source(count)
+        + "\n\nif __name__ == '__main__':\n"
+        + "    from targ import CLI\n\n"
+        + "    cli = CLI()\n"
+        + "".join(
+            f"    cli.register(command_{index}, "
+            f"group_name='group_{index // 10}')\n"
+            for index in range(count)
+        )
+        + "    cli.run()\n"
+    )
+
+
+def get_commands(count: int) -> list:
+    namespace: dict = {}
+    exec(get_source(count), namespace)
+    return [namespace[f"command_{index}"] for index in range(count)]
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-SOURCES="targ tests"
+SOURCES="targ tests benchmarks"
 
 isort $SOURCES
 black $SOURCES
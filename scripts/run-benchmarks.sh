@@ -0,0 +1,5 @@
+#!/bin/bash
+# To save the results: ./scripts/run-benchmarks.sh --output=results.json
+# To compare: python -m benchmarks.compare before.json after.json
+
+python -m benchmarks.run $@
@@ -35,6 +35,7 @@ setup(
     packages=["targ"],
     include_package_data=True,
     install_requires=REQUIREMENTS,
+    entry_points={"console_scripts": ["targ = targ.__main__:main"]},
     license="MIT",
     classifiers=[
         "License :: OSI Approved :: MIT License",
@@ -1,41 +1,254 @@
 from __future__ import annotations
 
-import asyncio
-import decimal
+import importlib
 import inspect
-import json
 import sys
+import time
 import traceback
-from collections.abc import Callable
+from collections.abc import Callable, Coroutine, Iterable
 from dataclasses import dataclass, field
-from typing import Any, Optional, Union, get_args, get_origin, get_type_hints
+from functools import cached_property
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Optional,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+
+# Some of these are only imported so they can be used via ``targ``, e.g.
+# ``targ.register_converter``.
+from .converters import (  # noqa: F401
+    CONVERTABLE_TYPES,
+    UnionType,
+    get_converter,
+    is_multi_valued,
+    register_converter,
+)
+from .files import BinaryFile, MMap, close_resource
+from .format import (
+    Color,
+    format_columns,
+    format_text,
+    get_terminal_width,
+    get_underline,
+    use_color,
+    wrap,
+    wrap_words,
+)
+from .progress import Progress
+from .streams import Stream, is_stream_type  # noqa: F401
+
+# To keep startup fast, anything which isn't needed for simply running a
+# command (e.g. asyncio, docstring_parser, and the other targ modules) is
+# imported when first used.
+if TYPE_CHECKING:
+    import asyncio
+
+    from docstring_parser import Docstring, DocstringParam  # type: ignore
+
+    from .fan_out import FanOutResult
+    from .output import OutputWriter
+    from .tasks import Task, TaskResult
 
-from docstring_parser import Docstring, DocstringParam, parse  # type: ignore
+__VERSION__ = "0.6.0"
 
-from .format import Color, format_text, get_underline
+# Used by ``--targ-profile``. CPU time is used for the startup, as there's no
+# portable way of getting the process start time.
+STARTUP_CPU_TIME = time.process_time()
+TARG_IMPORTED_AT = time.perf_counter()
 
-# Only available in Python 3.10 and above:
-try:
-    from types import NoneType, UnionType  # type: ignore
-except ImportError:
-    NoneType = type(None)  # type: ignore
 
-    class UnionType:  # type: ignore
-        pass
+def load_import_string(import_string: str) -> Any:
+    """
+    Import the object referred to by an import string.
 
+    :param import_string:
+        In the format ``'module.path:attribute'``, for example
+        ``'myapp.commands:migrate'``.
 
-__VERSION__ = "0.6.0"
+    """
+    module_path, _, attribute_path = import_string.partition(":")
+    if not module_path or not attribute_path:
+        raise ValueError(
+            f"{import_string} isn't a valid import string - it should be in "
+            "the format 'module.path:attribute'."
+        )
+
+    value: Any = importlib.import_module(module_path)
+    for attribute in attribute_path.split("."):
+        value = getattr(value, attribute)
+
+    return value
+
+
+def is_resource_type(annotation: Any) -> bool:
+    """
+    Whether the converted value is something like an open file, which needs
+    cleaning up once the command has finished.
+    """
+    if get_origin(annotation) in [Union, UnionType]:  # type: ignore
+        return any(is_resource_type(i) for i in get_args(annotation))
+
+    return annotation in (BinaryFile, MMap) or is_stream_type(annotation)
+
+
+def _cancel_all_tasks(loop: asyncio.AbstractEventLoop):
+    """
+    Cancel any tasks which are still running (e.g. started by a command
+    without being awaited), and wait for them to finish, so they can clean
+    up.
+    """
+    import asyncio
 
+    tasks = asyncio.all_tasks(loop)
+    if not tasks:
+        return
 
-# If an annotation is one of these values, we will convert the string value
-# to it.
-CONVERTABLE_TYPES = (int, float, decimal.Decimal)
+    for task in tasks:
+        task.cancel()
+
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            loop.call_exception_handler(
+                {
+                    "message": "Unhandled exception while closing the loop",
+                    "exception": task.exception(),
+                    "task": task,
+                }
+            )
+
+
+def _close_event_loop(loop: asyncio.AbstractEventLoop):
+    """
+    Clean up the event loop, in the same way as ``asyncio.run``.
+    """
+    try:
+        _cancel_all_tasks(loop)
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(loop.shutdown_default_executor())
+    finally:
+        loop.close()
 
 
 @dataclass
 class Arguments:
     args: list[str] = field(default_factory=list)
     kwargs: dict[str, Any] = field(default_factory=dict)
+    # If a keyword argument is given more than once (e.g.
+    # ``--tag=a --tag=b``), ``kwargs`` contains the last value, and this
+    # contains all of them.
+    repeated: dict[str, list[Any]] = field(default_factory=dict)
+
+
+@dataclass
+class BindingPlan:
+    """
+    How the command line arguments map onto a command's parameters. It's
+    worked out once per command, so calling a command repeatedly doesn't
+    repeat the introspection.
+
+    :param positional:
+        The names of the parameters which positional arguments are assigned
+        to, in order.
+    :param converters:
+        Maps parameter names to a callable which converts the value from the
+        command line into the correct type.
+    :param is_coroutine:
+        Whether the command is a coroutine function.
+    :param resources:
+        The names of any parameters which are passed something which needs
+        cleaning up afterwards, like an open file or a ``Stream``.
+    :param defaults:
+        Values used for any arguments which aren't passed in, before they're
+        converted. For example, streams read from stdin by default.
+    :param multi_valued:
+        The names of any parameters which accept all of the values when
+        they're given more than once, like ``list[str]``. For other
+        parameters, the last value is used.
+    :param progress:
+        The names of any parameters annotated with ``Progress``, which are
+        passed a new ``Progress`` each time (see :meth:`start_progress`),
+        rather than a value from the command line.
+
+    """
+
+    positional: list[str]
+    converters: dict[str, Callable[[Any], Any]]
+    is_coroutine: bool = False
+    resources: list[str] = field(default_factory=list)
+    defaults: dict[str, str] = field(default_factory=dict)
+    multi_valued: list[str] = field(default_factory=list)
+    progress: list[str] = field(default_factory=list)
+
+    def bind(self, arg_class: Arguments) -> dict[str, Any]:
+        if len(arg_class.args) > len(self.positional):
+            raise ValueError(
+                f"Expected at most {len(self.positional)} positional "
+                f"arguments, but got {len(arg_class.args)}."
+            )
+
+        kwargs = arg_class.kwargs.copy()
+        kwargs.update(zip(self.positional, arg_class.args))
+
+        for key, value in self.defaults.items():
+            kwargs.setdefault(key, value)
+
+        if arg_class.repeated:
+            for key in self.multi_valued:
+                if key in arg_class.repeated:
+                    kwargs[key] = arg_class.repeated[key]
+
+        converters = self.converters
+        for key, value in kwargs.items():
+            converter = converters.get(key)
+            if converter is not None:
+                kwargs[key] = converter(value)
+
+        return kwargs
+
+    def start_progress(self, kwargs: dict[str, Any]):
+        """
+        Add a new ``Progress`` to the arguments for each parameter which
+        wants one. It's called right before the command, as each one has a
+        thread drawing it, until :meth:`close` is called.
+        """
+        for key in self.progress:
+            kwargs[key] = Progress().start()
+
+    def close(self, kwargs: dict[str, Any]):
+        """
+        Clean up any resources which were opened by :meth:`bind`, once the
+        command has finished.
+        """
+        for name in self.resources:
+            value = kwargs.get(name)
+            if value is not None and not isinstance(value, str):
+                close_resource(value)
+
+        for name in self.progress:
+            value = kwargs.get(name)
+            if isinstance(value, Progress):
+                value.close()
+
+
+@dataclass
+class ParameterSpec:
+    """
+    Describes a command's parameter, for use in help text. It's either worked
+    out by inspecting the function, or loaded from a manifest.
+    """
+
+    name: str
+    description: str = ""
+    required: bool = True
+    is_flag: bool = False
+    default_json: Optional[str] = None
+    annotated: bool = False
 
 
 @dataclass
@@ -44,7 +257,9 @@ class Command:
     Represents a CLI command.
 
     :param command:
-        The Pyton function or coroutine which gets called.
+        The Pyton function or coroutine which gets called. Alternatively, an
+        import string like ``'myapp.commands:migrate'`` - the module is only
+        imported when the command is actually needed.
     :param group_name:
         Commands can belong to a group. In this situation, the group name must
         appear before the command name when called from the command line. For
@@ -56,21 +271,105 @@ class Command:
         You can provide aliases, which can be abbreviations or common
         mispellings. For example, for a `command_name` of ``run``, we could
         have aliases like ``['start', 'rn']``.
+    :param cacheable:
+        If ``True``, the result is cached, along with anything the command
+        prints out - see :meth:`CLI.register`.
+    :param cache_ttl:
+        If specified, cached results expire after this many seconds.
+    :param depends_on:
+        Commands which are run first, e.g. ``['assets build']`` - see
+        :meth:`CLI.register`.
+    :param inputs:
+        Glob patterns for the files the command reads.
+    :param outputs:
+        Glob patterns for the files the command writes. If they're up to
+        date, the command is skipped.
+    :param timeout:
+        If specified, the command is stopped if it takes longer than this
+        many seconds.
 
     """
 
-    command: Callable
+    command: Union[Callable, str]
     group_name: Optional[str] = None
     command_name: Optional[str] = None
     aliases: list[str] = field(default_factory=list)
+    cacheable: bool = False
+    cache_ttl: Optional[float] = None
+    depends_on: list[str] = field(default_factory=list)
+    inputs: list[str] = field(default_factory=list)
+    outputs: list[str] = field(default_factory=list)
+    timeout: Optional[float] = None
 
     def __post_init__(self) -> None:
-        self.command_docstring: Docstring = parse(self.command.__doc__ or "")
-        self.annotations = get_type_hints(self.command)
-        self.signature = inspect.signature(self.command)
         self.solo = False
-        if not self.command_name:
-            self.command_name = self.command.__name__
+        self._command_callable: Optional[Callable] = None
+        self.manifest_entry: Optional[dict[str, Any]] = None
+        # Keyed by the width, and whether colours are used:
+        self._help_text_cache: dict[tuple[int, bool], str] = {}
+
+        if isinstance(self.command, str):
+            if not self.command_name:
+                # Use the attribute name, so we don't have to import it.
+                attribute_path = self.command.partition(":")[2]
+                self.command_name = attribute_path.rsplit(".", 1)[-1]
+        else:
+            self._command_callable = self.command
+            if not self.command_name:
+                self.command_name = self.command.__name__
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Whether the underlying function or coroutine has been imported yet.
+        """
+        return self._command_callable is not None
+
+    @property
+    def import_path(self) -> str:
+        """
+        Identifies the underlying function or coroutine, e.g.
+        ``'myapp.commands:migrate'``.
+        """
+        if isinstance(self.command, str):
+            return self.command
+        command = self.command_callable
+        return f"{command.__module__}:{command.__qualname__}"
+
+    @property
+    def command_callable(self) -> Callable:
+        """
+        The function or coroutine which gets called. If the command was
+        registered using an import string, it's imported on first access.
+        """
+        if self._command_callable is None:
+            if isinstance(self.command, str):
+                self._command_callable = load_import_string(self.command)
+            else:
+                self._command_callable = self.command
+        return self._command_callable
+
+    @cached_property
+    def command_docstring(self) -> Docstring:
+        from docstring_parser import parse  # type: ignore
+
+        return parse(self.command_callable.__doc__ or "")
+
+    @cached_property
+    def annotations(self) -> dict[str, Any]:
+        return get_type_hints(self.command_callable)
+
+    @cached_property
+    def signature(self) -> inspect.Signature:
+        return inspect.signature(self.command_callable)
+
+    @property
+    def is_task(self) -> bool:
+        """
+        Whether the command has dependencies, or files which are checked to
+        see if it needs running - see :mod:`targ.tasks`.
+        """
+        return bool(self.depends_on or self.inputs or self.outputs)
 
     @property
     def full_name(self):
@@ -80,9 +379,21 @@ class Command:
             else self.command_name
         )
 
+    def use_manifest_entry(self, entry: dict[str, Any]):
+        """
+        Use the description and parameters stored in a manifest entry, so
+        the function doesn't need importing to show help text.
+        """
+        self.manifest_entry = entry
+        self.__dict__.pop("parameters", None)
+        self._help_text_cache.clear()
+
     @property
     def description(self) -> str:
-        docstring: Docstring = parse(self.command.__doc__ or "")
+        if self.manifest_entry is not None:
+            return self.manifest_entry["description"]
+
+        docstring = self.command_docstring
         return " ".join(
             [
                 docstring.short_description or "",
@@ -111,52 +422,78 @@ class Command:
                 return default
         return None
 
-    @property
-    def arguments_description(self) -> str:
-        """
-        :returns: A string containing a description for each argument.
-        """
-        output = []
+    @cached_property
+    def parameters(self) -> list[ParameterSpec]:
+        if self.manifest_entry is not None:
+            return [
+                ParameterSpec(**parameter)
+                for parameter in self.manifest_entry["parameters"]
+            ]
 
-        for arg_name, _ in self.annotations.items():
-            arg_description = self._get_arg_description(arg_name=arg_name)
+        import json
 
-            arg_default = self._get_arg_default(arg_name=arg_name)
-            arg_default_json = json.dumps(arg_default)
+        output = []
 
-            default_str = (
-                f"[default={arg_default_json}]"
-                if arg_default is not None
-                else ""
-            )
+        for arg_name, parameter in self.signature.parameters.items():
+            if self.annotations.get(arg_name) is Progress:
+                # It's passed in by targ, rather than the user.
+                continue
 
+            arg_default = self._get_arg_default(arg_name=arg_name)
             output.append(
-                format_text(arg_name, color=Color.cyan) + f" {default_str}"
+                ParameterSpec(
+                    name=arg_name,
+                    description=self._get_arg_description(arg_name=arg_name),
+                    required=parameter.default is inspect.Parameter.empty,
+                    is_flag=parameter.default is False,
+                    default_json=(
+                        json.dumps(arg_default)
+                        if arg_default is not None
+                        else None
+                    ),
+                    annotated=arg_name in self.annotations,
+                )
             )
-            if arg_description:
-                output.append(arg_description)
-            output.append("")
 
-        return "\n".join(output)
+        return output
+
+    def _get_argument_rows(self) -> list[tuple[str, str]]:
+        rows = []
+
+        for parameter in self.parameters:
+            if not parameter.annotated:
+                continue
+
+            name = format_text(parameter.name, color=Color.cyan)
+            if parameter.default_json is not None:
+                name += f" [default={parameter.default_json}]"
+
+            rows.append((name, parameter.description))
+
+        return rows
 
     @property
-    def usage(self) -> str:
+    def arguments_description(self) -> str:
         """
-        Example:
-
-        some_command required_arg [--optional_arg=value] [--some_flag]
+        :returns: A string containing a description for each argument.
         """
+        return "\n".join(
+            format_columns(self._get_argument_rows(), get_terminal_width())
+        )
+
+    def _get_usage_words(self) -> list[str]:
         if self.solo:
             output = []
         else:
             command_name = self.command_name or ""
             output = [format_text(command_name, color=Color.green)]
 
-        for arg_name, parameter in self.signature.parameters.items():
-            if parameter.default is inspect._empty:  # type: ignore
+        for parameter in self.parameters:
+            arg_name = parameter.name
+            if parameter.required:
                 output.append(format_text(arg_name, color=Color.cyan))
             else:
-                if parameter.default is False:
+                if parameter.is_flag:
                     output.append(
                         format_text(f"[--{arg_name}]", color=Color.cyan)
                     )
@@ -165,76 +502,352 @@ class Command:
                         format_text(f"[--{arg_name}=X]", color=Color.cyan)
                     )
 
-        return " ".join(output)
+        return output
 
-    def print_help(self):
-        print("")
-        print(self.command_name)
-        print(get_underline(len(self.command_name)))
-        print(self.description)
-
-        print("")
-        print("Usage")
-        print(get_underline(5, character="-"))
-        print(self.usage)
-        print("")
-
-        print("Args")
-        print(get_underline(4, character="-"))
-        if self.arguments_description:
-            print(self.arguments_description)
+    @property
+    def usage(self) -> str:
+        """
+        Example:
+
+        some_command required_arg [--optional_arg=value] [--some_flag]
+        """
+        return " ".join(self._get_usage_words())
+
+    def get_help_text(self, width: Optional[int] = None) -> str:
+        """
+        The help text is rendered once for each width (and depending on
+        whether colours are used), and then cached.
+
+        :param width:
+            The maximum line length. Defaults to the width of the terminal.
+
+        """
+        if width is None:
+            width = get_terminal_width()
+
+        key = (width, use_color())
+        help_text = self._help_text_cache.get(key)
+        if help_text is None:
+            help_text = self._render_help_text(width)
+            self._help_text_cache[key] = help_text
+        return help_text
+
+    def _render_help_text(self, width: int) -> str:
+        command_name = self.command_name or ""
+
+        lines = [
+            "",
+            command_name,
+            get_underline(len(command_name)),
+            *wrap(self.description, width),
+            "",
+            "Usage",
+            get_underline(5, character="-"),
+            *wrap_words(
+                self._get_usage_words(),
+                width=width,
+                indent=0 if self.solo else len(command_name) + 1,
+            ),
+            "",
+            "Args",
+            get_underline(4, character="-"),
+        ]
+
+        argument_rows = self._get_argument_rows()
+        if argument_rows:
+            lines.extend(format_columns(argument_rows, width))
         else:
-            print("No args\n")
+            lines.append("No args")
+        lines.append("")
 
         if self.aliases:
-            print("Aliases")
-            print(get_underline(7, character="-"))
-            alias_string = ", ".join(self.aliases)
-            print(format_text(alias_string, color=Color.green))
-        print("")
+            lines.extend(
+                [
+                    "Aliases",
+                    get_underline(7, character="-"),
+                    format_text(", ".join(self.aliases), color=Color.green),
+                    "",
+                ]
+            )
+
+        lines.append("")
+        return "\n".join(lines)
+
+    def print_help(self):
+        # Written in one go, rather than line by line.
+        sys.stdout.write(self.get_help_text())
+
+    @cached_property
+    def binding_plan(self) -> BindingPlan:
+        positional = []
+        converters = {}
+        resources = []
+        defaults = {}
+        multi_valued = []
+        progress = []
+
+        for arg_name, parameter in self.signature.parameters.items():
+            annotation = self.annotations.get(arg_name)
+
+            if annotation is Progress:
+                progress.append(arg_name)
+                continue
+
+            if parameter.kind in (
+                inspect.Parameter.POSITIONAL_ONLY,
+                inspect.Parameter.POSITIONAL_OR_KEYWORD,
+            ):
+                positional.append(arg_name)
+
+            converter = get_converter(annotation)
+            if converter is not None:
+                converters[arg_name] = converter
+
+            if is_resource_type(annotation):
+                resources.append(arg_name)
+
+            if is_multi_valued(annotation):
+                multi_valued.append(arg_name)
 
-    def call_with(self, arg_class: Arguments):
+            if (
+                is_stream_type(annotation)
+                and parameter.default is inspect.Parameter.empty
+            ):
+                defaults[arg_name] = "-"
+
+        return BindingPlan(
+            positional=positional,
+            converters=converters,
+            is_coroutine=inspect.iscoroutinefunction(self.command_callable),
+            resources=resources,
+            defaults=defaults,
+            multi_valued=multi_valued,
+            progress=progress,
+        )
+
+    def bind_arguments(self, arg_class: Arguments) -> dict[str, Any]:
+        """
+        Convert the arguments from the command line into the keyword
+        arguments which the command gets called with.
+        """
+        return self.binding_plan.bind(arg_class)
+
+    def call_with(
+        self,
+        arg_class: Arguments,
+        run_coroutine: Optional[Callable[[Coroutine], Any]] = None,
+        output_format: Optional[str] = None,
+        use_cache: bool = True,
+        timeout: Optional[float] = None,
+    ) -> Any:
         """
         Call the command function with the given arguments.
 
         The arguments are all strings at this point, as they're come from the
         command line.
 
+        :param run_coroutine:
+            If the command is a coroutine, this is used to run it. By default
+            it's ``asyncio.run``, which creates a new event loop each time.
+        :param output_format:
+            If specified, the value returned by the command is written to
+            stdout in this format - see :class:`targ.output.OutputWriter`.
+        :param use_cache:
+            If ``False``, the command is run even if it's ``cacheable`` and a
+            cached result exists (``--targ-no-cache``).
+        :param timeout:
+            If the command takes longer than this many seconds, it's stopped,
+            and ``CommandTimeout`` is raised. Overrides the command's own
+            ``timeout`` (``--targ-timeout``). Coroutines are cancelled. For
+            normal functions, the exception is raised inside the function.
+            If the command returns a generator, writing out its values is
+            limited too.
+        :returns:
+            The value returned by the command.
+
         """
         if arg_class.kwargs.get("help"):
             self.print_help()
-            return
+            return None
+
+        return self.call(
+            self.bind_arguments(arg_class),
+            run_coroutine=run_coroutine,
+            output_format=output_format,
+            use_cache=use_cache,
+            timeout=timeout,
+        )
 
-        annotations = get_type_hints(self.command)
+    def call(
+        self,
+        kwargs: dict[str, Any],
+        run_coroutine: Optional[Callable[[Coroutine], Any]] = None,
+        output_format: Optional[str] = None,
+        use_cache: bool = True,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Call the command function with arguments which have already been
+        converted, using :meth:`bind_arguments`.
+        """
+        command = self.command_callable
+        binding_plan = self.binding_plan
+        if timeout is None:
+            timeout = self.timeout
 
-        kwargs = arg_class.kwargs.copy()
-        for index, value in enumerate(arg_class.args):
-            key = inspect.getfullargspec(self.command).args[index]
-            kwargs[key] = value
+        if binding_plan.is_coroutine and run_coroutine is None:
+            import asyncio
 
-        cleaned_kwargs = {}
+            run_coroutine = asyncio.run
 
-        for key, value in kwargs.items():
-            annotation = annotations.get(key)
-            # This only works with basic types like str at the moment.
-
-            if annotation in CONVERTABLE_TYPES:
-                value = annotation(value)
-            elif get_origin(annotation) in [Union, UnionType]:  # type: ignore
-                # Union is used to detect Optional
-                inner_annotations = get_args(annotation)
-                filtered = [i for i in inner_annotations if i is not NoneType]
-                if len(filtered) == 1:
-                    annotation = filtered[0]
-                    if annotation in CONVERTABLE_TYPES:
-                        value = annotation(value)
-
-            cleaned_kwargs[key] = value
-
-        if inspect.iscoroutinefunction(self.command):
-            asyncio.run(self.command(**cleaned_kwargs))
+        def call() -> Any:
+            if binding_plan.progress:
+                binding_plan.start_progress(kwargs)
+
+            if binding_plan.is_coroutine:
+                from .cancellation import supervise
+
+                assert run_coroutine is not None
+                return run_coroutine(supervise(command(**kwargs), timeout))
+
+            if timeout is None:
+                return command(**kwargs)
+
+            from .cancellation import time_limit
+
+            with time_limit(timeout):
+                return command(**kwargs)
+
+        try:
+            # Created first, so an unrecognised format is reported before
+            # the command runs - and inside ``try``, so any files which were
+            # opened for the arguments are still closed.
+            writer = self._get_output_writer(output_format)
+
+            if use_cache and self._is_cached:
+                from .cache import call_cached
+
+                result = call_cached(self, kwargs, call)
+            else:
+                result = call()
+
+            # Generators are consumed here, before any resources they're
+            # reading from are closed.
+            if writer is not None:
+                self._write_output(writer, result, run_coroutine, timeout)
+
+            return result
+        finally:
+            binding_plan.close(kwargs)
+
+    def _write_output(
+        self,
+        writer: OutputWriter,
+        result: Any,
+        run_coroutine: Optional[Callable[[Coroutine], Any]],
+        timeout: Optional[float],
+    ):
+        """
+        If the command returned a generator, it runs while its values are
+        written out, so the timeout applies here too.
+        """
+        if inspect.isasyncgen(result):
+            from .cancellation import supervise
+
+            if run_coroutine is None:
+                import asyncio
+
+                run_coroutine = asyncio.run
+
+            run: Callable[[Coroutine], Any] = run_coroutine
+            writer.write(
+                result,
+                run_coroutine=lambda coroutine: run(
+                    supervise(coroutine, timeout)
+                ),
+            )
+        elif timeout is None:
+            writer.write(result)
         else:
-            self.command(**cleaned_kwargs)
+            from .cancellation import time_limit
+
+            with time_limit(timeout):
+                writer.write(result)
+
+    @property
+    def _is_cached(self) -> bool:
+        # If the command reads from files, the result depends on their
+        # contents, so can't be cached.
+        return self.cacheable and not self.binding_plan.resources
+
+    def _get_output_writer(
+        self, output_format: Optional[str]
+    ) -> Optional[OutputWriter]:
+        if output_format is None:
+            return None
+
+        from .output import OutputWriter
+
+        return OutputWriter(format=output_format)
+
+    async def acall_with(
+        self,
+        arg_class: Arguments,
+        output_format: Optional[str] = None,
+        use_cache: bool = True,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        The same as :meth:`call_with`, but awaitable, so it can be used
+        when an event loop is already running. Note that if the command is a
+        normal function, rather than a coroutine, it will block the event
+        loop while it runs.
+
+        Signals are left to the application which is running the event
+        loop.
+        """
+        from .cancellation import time_limit, wait_for
+
+        if arg_class.kwargs.get("help"):
+            self.print_help()
+            return None
+
+        # Created first, so an unrecognised format is reported before any
+        # files are opened for the arguments.
+        writer = self._get_output_writer(output_format)
+        kwargs = self.bind_arguments(arg_class)
+        command = self.command_callable
+        binding_plan = self.binding_plan
+        if timeout is None:
+            timeout = self.timeout
+
+        async def call() -> Any:
+            if binding_plan.progress:
+                binding_plan.start_progress(kwargs)
+
+            if binding_plan.is_coroutine:
+                return await wait_for(command(**kwargs), timeout)
+            with time_limit(timeout):
+                return command(**kwargs)
+
+        try:
+            if use_cache and self._is_cached:
+                from .cache import acall_cached
+
+                result = await acall_cached(self, kwargs, call)
+            else:
+                result = await call()
+
+            if writer is not None:
+                if inspect.isasyncgen(result):
+                    await wait_for(writer.awrite(result), timeout)
+                else:
+                    with time_limit(timeout):
+                        await writer.awrite(result)
+
+            return result
+        finally:
+            binding_plan.close(kwargs)
 
 
 @dataclass
@@ -251,11 +864,64 @@ class CLI:
 
     :param description:
         Customise the title of your CLI tool.
+    :param manifest_path:
+        If specified, help text is loaded from the manifest at this path,
+        rather than importing each command and parsing its docstring. The
+        manifest is created using :meth:`write_manifest`, or
+        ``targ manifest build``. Entries are ignored if the command's source
+        file has changed since the manifest was built.
+    :param persistent_loop:
+        By default, each coroutine command runs in a new event loop. If
+        ``True``, the same event loop is used for every command run by this
+        CLI (e.g. using :meth:`run_batch`), so resources like connection
+        pools can be shared between them. Call :meth:`close` once finished.
+    :param loop_factory:
+        Used to create event loops - for example ``uvloop.new_event_loop``.
+        Defaults to ``asyncio.new_event_loop``.
+    :param env_prefix:
+        If specified, argument values are also read from environment
+        variables. For example, if the prefix is ``'TARG'``, then
+        ``TARG_MATHS_ADD_A`` is used for the ``a`` argument of the ``add``
+        command in the ``maths`` group.
+    :param config_files:
+        Argument values are also read from these TOML files, for example
+        ``['targ.toml', 'pyproject.toml']``. In ``targ.toml``, the values
+        for the ``add`` command in the ``maths`` group go in a
+        ``[maths.add]`` section. In ``pyproject.toml``, it's
+        ``[tool.targ.maths.add]``. If a value is in several files, the last
+        one takes precedence. Environment variables take precedence over
+        config files, and the command line takes precedence over both.
 
     """
 
     description: str = "Targ CLI"
+    manifest_path: Optional[str] = None
+    persistent_loop: bool = False
+    loop_factory: Optional[Callable[[], asyncio.AbstractEventLoop]] = None
+    env_prefix: Optional[str] = None
+    config_files: list[str] = field(default_factory=list)
     commands: list[Command] = field(default_factory=list, init=False)
+    # Commands keyed by (group name, command name or alias):
+    _command_index: dict[tuple[Optional[str], str], Command] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    # The first command registered with each command name or alias,
+    # regardless of group:
+    _name_index: dict[str, Command] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _manifest_loaded: bool = field(default=False, init=False, repr=False)
+    # Keyed by the width, and whether colours are used:
+    _help_text_cache: dict[tuple[int, bool], str] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    # How long each command took to register, for ``--targ-profile``:
+    _registration_times: dict[str, float] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _event_loop: Optional[asyncio.AbstractEventLoop] = field(
+        default=None, init=False, repr=False
+    )
 
     def command_exists(self, group_name: str, command_name: str) -> bool:
         """
@@ -263,13 +929,8 @@ class CLI:
         which wants to inspect the CLI, to find if a command with the given
         name exists.
         """
-        for command in self.commands:
-            if (
-                command.group_name == group_name
-                and command.command_name == command_name
-            ):
-                return True
-        return False
+        command = self._command_index.get((group_name or None, command_name))
+        return command is not None and command.command_name == command_name
 
     def _validate_name(self, name: str) -> bool:
         """
@@ -282,16 +943,26 @@ class CLI:
 
     def register(
         self,
-        command: Callable,
+        command: Union[Callable, str],
         group_name: Optional[str] = None,
         command_name: Optional[str] = None,
         aliases: list[str] = [],
+        cacheable: bool = False,
+        cache_ttl: Optional[float] = None,
+        depends_on: list[str] = [],
+        inputs: list[str] = [],
+        outputs: list[str] = [],
+        timeout: Optional[float] = None,
     ):
         """
         Register a function or coroutine as a CLI command.
 
         :param command:
-            The function or coroutine to register as a CLI command.
+            The function or coroutine to register as a CLI command. You can
+            also pass in an import string instead, like
+            ``'myapp.commands:migrate'``. The module then isn't imported until
+            the command is run, or its help text is shown, which keeps startup
+            fast when lots of commands are registered.
         :param group_name:
             If specified, the CLI command will belong to a group. When calling
             a command which belongs to a group, it must be prefixed with the
@@ -303,45 +974,253 @@ class CLI:
             here.
         :param aliases:
             The command can also be accessed using these aliases.
+        :param cacheable:
+            If ``True``, the result is cached on disk, along with anything the
+            command prints out. Running the command again with the same
+            arguments returns the cached result, without running it. Only
+            use this for commands which always give the same result for the
+            same arguments. The cache is invalidated when the file where
+            the command is defined changes, but not when other code it
+            depends on changes. Results which can't be pickled (e.g.
+            generators) aren't cached, and neither are the results of
+            commands which read from files. Use ``--targ-no-cache`` to run
+            the command regardless.
+        :param cache_ttl:
+            If specified, cached results expire after this many seconds.
+        :param depends_on:
+            Commands which have to run successfully before this one, for
+            example ``['assets build', 'docs build --strict']``. Each one is
+            in the same format as the command line, so can include arguments.
+            The dependencies can have their own dependencies, and
+            independent ones are run in parallel using ``--targ-jobs``. Each
+            one runs at most once.
+        :param inputs:
+            Glob patterns for the files which the command reads, like
+            ``['src/**/*.scss']``, relative to the working directory.
+        :param outputs:
+            Glob patterns for the files which the command writes. If
+            specified, the command is skipped when its output files exist,
+            and none of its input or output files have changed since it last
+            ran successfully - like ``make``. If a command uses the outputs
+            of one of its dependencies, list them in its ``inputs``.
+        :param timeout:
+            If the command takes longer than this many seconds, it's stopped,
+            and counts as failed. It can be overridden using
+            ``--targ-timeout``.
+
+        A ``ValueError`` is raised if the command name, or any of the aliases,
+        clash with a command which is already registered in the same group.
 
         """
+        started_at = time.perf_counter()
+
         if group_name and not self._validate_name(group_name):
             raise ValueError("The group name should not contain spaces.")
 
         if command_name and not self._validate_name(command_name):
             raise ValueError("The command name should not contain spaces.")
 
-        self.commands.append(
-            Command(
-                command=command,
-                group_name=group_name,
-                command_name=command_name,
-                aliases=aliases,
+        if isinstance(command, str) and ":" not in command:
+            raise ValueError(
+                "Import strings should be in the format "
+                "'module.path:attribute'."
             )
+
+        command_instance = Command(
+            command=command,
+            group_name=group_name or None,
+            command_name=command_name,
+            aliases=aliases,
+            cacheable=cacheable,
+            cache_ttl=cache_ttl,
+            depends_on=depends_on,
+            inputs=inputs,
+            outputs=outputs,
+            timeout=timeout,
+        )
+        names: list[str] = [command_instance.command_name or "", *aliases]
+        keys = [(command_instance.group_name, name) for name in names]
+
+        for key in keys:
+            if key in self._command_index or keys.count(key) > 1:
+                full_name = " ".join(i for i in key if i)
+                raise ValueError(
+                    f"A command called '{full_name}' is already registered."
+                )
+
+        self.commands.append(command_instance)
+        self._help_text_cache.clear()
+
+        for key in keys:
+            self._command_index[key] = command_instance
+            self._name_index.setdefault(key[1], command_instance)
+
+        self._registration_times[command_instance.full_name] = (
+            time.perf_counter() - started_at
         )
 
-    def get_help_text(self) -> str:
+    def register_plugins(self, entry_point_group: str = "targ.commands"):
+        """
+        Register the commands published by installed packages, using entry
+        points. For example, in a plugin's ``pyproject.toml``:
+
+        .. code-block:: toml
+
+            [project.entry-points."targ.commands"]
+            "maths.add" = "myplugin.commands:add"
+
+        The entry point name is the command name, optionally prefixed with
+        the group name and a dot.
+
+        The commands are registered lazily, so the plugins aren't imported
+        unless one of their commands is run, or its help text is shown. The
+        installed packages are only scanned again when a directory on
+        ``sys.path`` changes (e.g. a package is installed).
+
+        If a plugin's command clashes with a command which is already
+        registered, a warning is shown, and the plugin's command is skipped.
+
+        :param entry_point_group:
+            Commands are looked for in this entry point group.
+
+        """
+        from .plugins import get_entry_points
+
+        for name, value in get_entry_points(entry_point_group):
+            group_name, _, command_name = name.rpartition(".")
+            try:
+                self.register(
+                    value,
+                    group_name=group_name or None,
+                    command_name=command_name,
+                )
+            except ValueError as exception:
+                import warnings
+
+                warnings.warn(
+                    f"The plugin command {name} ({value}) wasn't registered - "
+                    f"{exception}"
+                )
+
+    def write_manifest(self, path: Optional[str] = None) -> str:
+        """
+        Save the help text for every registered command to a manifest file.
+        This imports all of the commands, so is best done ahead of time - for
+        example, in CI, or when deploying.
+
+        :param path:
+            Where to save the manifest - defaults to ``manifest_path``.
+        :returns:
+            The path of the manifest.
+
+        """
+        from .manifest import build_manifest, write_manifest
+
+        path = path or self.manifest_path
+        if not path:
+            raise ValueError("No manifest path was specified.")
+
+        write_manifest(build_manifest(self.commands), path)
+        return path
+
+    def _load_manifest(self) -> None:
+        """
+        Attach any up to date manifest entries to the registered commands.
+        """
+        if self._manifest_loaded or not self.manifest_path:
+            return
+
+        from .manifest import is_fresh, read_manifest
+
+        self._manifest_loaded = True
+        entries = read_manifest(self.manifest_path)
+        if not entries:
+            return
+
+        # Several commands are often defined in the same file.
+        fresh_paths: dict[str, bool] = {}
+
+        for command in self.commands:
+            entry = entries.get(command.full_name)
+            if entry is None or entry["import_path"] != command.import_path:
+                continue
+
+            source = entry["source"]
+            fresh = fresh_paths.get(source["path"])
+            if fresh is None:
+                fresh = fresh_paths[source["path"]] = is_fresh(source)
+
+            if fresh:
+                command.use_manifest_entry(entry)
+
+    def get_help_text(self, width: Optional[int] = None) -> str:
+        """
+        The help text listing every command. It's rendered once for each
+        width (and depending on whether colours are used), and then cached.
+
+        :param width:
+            The maximum line length. Defaults to the width of the terminal.
+
+        """
+        self._load_manifest()
+
+        if width is None:
+            width = get_terminal_width()
+
+        key = (width, use_color())
+        help_text = self._help_text_cache.get(key)
+        if help_text is None:
+            help_text = self._render_help_text(width)
+            self._help_text_cache[key] = help_text
+        return help_text
+
+    def _render_help_text(self, width: int) -> str:
         lines = [
             "",
             self.description,
             get_underline(len(self.description)),
-            (
+            *wrap(
                 "Enter the name of a command followed by --help to learn "
-                "more."
+                "more.",
+                width,
             ),
             "",
             "",
             "Commands",
             "--------",
+            *format_columns(
+                [
+                    (
+                        format_text(command.full_name, color=Color.green),
+                        command.description,
+                    )
+                    for command in self.commands
+                ],
+                width,
+            ),
+            "",
         ]
 
-        for command in self.commands:
-            lines.append(format_text(command.full_name, color=Color.green))
-            lines.append(command.description)
-            lines.append("")
-
         return "\n".join(lines)
 
+    def print_help(self):
+        # Written in one go, rather than line by line.
+        print(self.get_help_text())
+
+    def _print_completions(self, words: list[str]):
+        """
+        Used by the shell completion scripts - see :mod:`targ.completion`.
+        """
+        from .completion import get_completions
+
+        # Writing it all at once is faster than lots of print calls.
+        sys.stdout.write(
+            "".join(
+                f"{candidate}\t{description}\n"
+                for candidate, description in get_completions(self, words)
+            )
+        )
+
     def _get_cleaned_args(self) -> list[str]:
         """
         Remove any redundant arguments.
@@ -351,15 +1230,9 @@ class CLI:
     def _get_command(
         self, command_name: str, group_name: Optional[str] = None
     ) -> Optional[Command]:
-        for command in self.commands:
-            if (
-                command.command_name == command_name
-                or command_name in command.aliases
-            ):
-                if group_name and command.group_name != group_name:
-                    continue
-                return command
-        return None
+        if group_name:
+            return self._command_index.get((group_name, command_name))
+        return self._name_index.get(command_name)
 
     def _clean_cli_argument(self, value: str) -> Any:
         if value in ["True", "true", "t"]:
@@ -368,7 +1241,17 @@ class CLI:
             return False
         return value
 
-    def _get_arg_class(self, args: list[str]) -> Arguments:
+    def _get_arg_class(
+        self, args: list[str], command: Optional[Command] = None
+    ) -> Arguments:
+        """
+        Parse the arguments from the command line.
+
+        :param command:
+            If specified, any values for the command from config files and
+            environment variables are added too.
+
+        """
         arguments = Arguments()
         for arg_str in args:
             if arg_str.startswith("--"):
@@ -382,12 +1265,657 @@ class CLI:
                     name = components[0]
                     value = True
 
+                if name in arguments.kwargs:
+                    arguments.repeated.setdefault(
+                        name, [arguments.kwargs[name]]
+                    ).append(value)
                 arguments.kwargs[name] = value
             else:
                 value = self._clean_cli_argument(arg_str)
                 arguments.args.append(value)
+
+        if command is not None and (self.config_files or self.env_prefix):
+            self._add_configured_values(arguments, command)
+
         return arguments
 
+    def _add_configured_values(self, arguments: Arguments, command: Command):
+        """
+        Add any values from config files and environment variables, which
+        weren't passed in on the command line.
+        """
+        from .config import get_config_values, get_env_values, load_config_file
+
+        values: dict[str, Any] = {}
+
+        for path in self.config_files:
+            values.update(get_config_values(load_config_file(path), command))
+
+        if self.env_prefix:
+            for key, value in get_env_values(self.env_prefix, command).items():
+                values[key] = self._clean_cli_argument(value)
+
+        for key, value in values.items():
+            arguments.kwargs.setdefault(key, value)
+
+    def _pop_flag(self, args: list[str], flag: str) -> bool:
+        """
+        Remove the flag (e.g. ``--trace``) from the arguments.
+
+        :returns:
+            Whether the flag was present.
+
+        """
+        try:
+            index = args.index(flag)
+        except ValueError:
+            return False
+        else:
+            args.pop(index)
+            return True
+
+    def _pop_option(
+        self, args: list[str], option: str, allow_separate: bool = True
+    ) -> Optional[str]:
+        """
+        Remove an option which takes a value from the arguments - either
+        ``--option value`` or ``--option=value``.
+
+        :param allow_separate:
+            If ``False``, only ``--option=value`` is accepted. Used for
+            options which can also be given without a value.
+        :returns:
+            The value, or ``None`` if the option wasn't present.
+
+        """
+        for index, arg in enumerate(args):
+            if arg == option and allow_separate and index + 1 < len(args):
+                args.pop(index)
+                return args.pop(index)
+            if arg.startswith(f"{option}="):
+                args.pop(index)
+                return arg.split("=", 1)[1]
+        return None
+
+    def _pop_timeout(self, args: list[str]) -> Optional[float]:
+        """
+        Remove ``--targ-timeout`` from the arguments.
+
+        :returns:
+            The timeout in seconds, or ``None`` if it wasn't present.
+        :raises ValueError:
+            If the value isn't a positive number.
+
+        """
+        value = self._pop_option(args, "--targ-timeout")
+        if value is None:
+            return None
+
+        try:
+            timeout = float(value)
+        except ValueError:
+            timeout = 0.0
+
+        if not timeout > 0:
+            raise ValueError(
+                "--targ-timeout should be a number of seconds greater than 0, "
+                f"not {value!r}."
+            )
+
+        return timeout
+
+    def _pop_jobs(self, args: list[str]) -> int:
+        """
+        Remove ``--targ-jobs`` from the arguments.
+
+        :returns:
+            The number of jobs, or 1 if it wasn't present.
+        :raises ValueError:
+            If the value isn't a whole number of at least 1.
+
+        """
+        value = self._pop_option(args, "--targ-jobs")
+        if value is None:
+            return 1
+
+        try:
+            jobs = int(value)
+        except ValueError:
+            jobs = 0
+
+        if jobs < 1:
+            raise ValueError(
+                f"--targ-jobs should be a whole number of at least 1, not "
+                f"{value!r}."
+            )
+
+        return jobs
+
+    def _find_command(
+        self, args: list[str]
+    ) -> tuple[Optional[Command], list[str]]:
+        """
+        Work out which command the arguments refer to, i.e.
+        ``command_name ...`` or ``group_name command_name ...``.
+
+        :returns:
+            The command (or ``None`` if not recognised), and the remaining
+            arguments.
+
+        """
+        command = self._get_command(command_name=args[0])
+        if command:
+            return command, args[1:]
+
+        # See if it belongs to a group:
+        if len(args) >= 2:
+            command = self._get_command(
+                command_name=args[1], group_name=args[0]
+            )
+            if command:
+                return command, args[2:]
+
+        return None, args
+
+    def _print_unrecognised(self, args: list[str]):
+        """
+        Report the name which :meth:`_find_command` couldn't match - if the
+        first argument is a group name, it's the command name after it.
+        """
+        name = args[0]
+        if len(args) >= 2 and any(
+            group_name == args[0] for group_name, _ in self._command_index
+        ):
+            name = args[1]
+
+        print(f"Unrecognised command - {name}")
+
+    @property
+    def event_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        The event loop used when ``persistent_loop`` is ``True``. It's
+        created on first access.
+        """
+        import asyncio
+
+        if self._event_loop is None or self._event_loop.is_closed():
+            self._event_loop = (self.loop_factory or asyncio.new_event_loop)()
+            asyncio.set_event_loop(self._event_loop)
+        return self._event_loop
+
+    def _run_coroutine(self, coroutine: Coroutine) -> Any:
+        if self.persistent_loop:
+            return self.event_loop.run_until_complete(coroutine)
+
+        if self.loop_factory is None:
+            import asyncio
+
+            return asyncio.run(coroutine)
+
+        loop = self.loop_factory()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            _close_event_loop(loop)
+
+    def close(self):
+        """
+        Close the persistent event loop, if one was created.
+        """
+        if self._event_loop is not None:
+            import asyncio
+
+            if not self._event_loop.is_closed():
+                _close_event_loop(self._event_loop)
+                asyncio.set_event_loop(None)
+            self._event_loop = None
+
+    def _print_failure(
+        self, command: Command, exception: Exception, trace: bool = False
+    ):
+        print(format_text("The command failed.", color=Color.red))
+        print(exception)
+
+        if trace:
+            print(traceback.format_exc())
+        else:
+            print("For a full stack trace, use --trace")
+
+        if command.is_loaded:
+            command.print_help()
+
+    def _run_command(
+        self,
+        command: Command,
+        args: list[str],
+        trace: bool = False,
+        output_format: Optional[str] = None,
+        use_cache: bool = True,
+        jobs: int = 1,
+        timeout: Optional[float] = None,
+    ) -> int:
+        """
+        Call the command, printing out an error message if it fails.
+
+        :param output_format:
+            If specified, the value returned by the command is written out in
+            this format (``--targ-output``).
+        :param use_cache:
+            If ``False``, cached results are ignored (``--targ-no-cache``).
+        :param jobs:
+            If the command has dependencies, how many can run at the same
+            time (``--targ-jobs``).
+        :param timeout:
+            Overrides the command's timeout (``--targ-timeout``).
+        :returns:
+            The exit status - 0 if successful, or 1 if an exception was
+            raised.
+
+        """
+        from .cancellation import reset_grace_period
+
+        try:
+            arg_class = self._get_arg_class(args, command=command)
+
+            if command.is_task and not arg_class.kwargs.get("help"):
+                from .tasks import TaskStatus, print_failures
+
+                results = self.run_tasks(
+                    command,
+                    args,
+                    jobs=jobs,
+                    output_format=output_format,
+                    use_cache=use_cache,
+                    timeout=timeout,
+                )
+                print_failures(results, trace=trace)
+                return int(any(i.status is TaskStatus.failed for i in results))
+
+            command.call_with(
+                arg_class,
+                run_coroutine=self._run_coroutine,
+                output_format=output_format,
+                use_cache=use_cache,
+                timeout=timeout,
+            )
+        except Exception as exception:
+            self._print_failure(command, exception, trace=trace)
+            return 1
+        finally:
+            reset_grace_period()
+
+        return 0
+
+    def _run_profiled(
+        self,
+        command: Command,
+        args: list[str],
+        mode: str = "",
+        run_started_at: float = 0.0,
+        trace: bool = False,
+        output_format: Optional[str] = None,
+        use_cache: bool = True,
+        timeout: Optional[float] = None,
+    ) -> int:
+        """
+        Like :meth:`_run_command`, but times each step, and prints out a
+        report afterwards. Used by ``--targ-profile``.
+        """
+        from .profiling import Profiler
+
+        profiler = Profiler(mode=mode)
+        status = 0
+
+        try:
+            with profiler.phase("Loading the command"):
+                command.binding_plan
+
+            with profiler.phase("Parsing arguments"):
+                arg_class = self._get_arg_class(args, command=command)
+
+            if arg_class.kwargs.get("help"):
+                command.print_help()
+            else:
+                with profiler.phase("Converting arguments"):
+                    kwargs = command.bind_arguments(arg_class)
+
+                with profiler.phase("Running the command"):
+                    profiler.call(
+                        command.call,
+                        kwargs,
+                        run_coroutine=self._run_coroutine,
+                        output_format=output_format,
+                        use_cache=use_cache,
+                        timeout=timeout,
+                    )
+        except Exception as exception:
+            self._print_failure(command, exception, trace=trace)
+            status = 1
+
+        profiler.print_report(
+            command,
+            run_started_at=run_started_at,
+            registration_times=self._registration_times,
+        )
+        return status
+
+    async def run_async(self, args: Optional[list[str]] = None) -> int:
+        """
+        Run a command from within a running event loop, for example when
+        embedding the CLI in an async application:
+
+        .. code-block:: python
+
+            await cli.run_async(["migrate", "--tenant=acme"])
+
+        :param args:
+            The command line arguments, excluding the script name. Defaults
+            to ``sys.argv[1:]``.
+        :returns:
+            The exit status - 0 if successful, otherwise 1.
+
+        """
+        self._load_manifest()
+
+        args = list(args) if args is not None else self._get_cleaned_args()
+        trace = self._pop_flag(args, "--trace")
+        output_format = self._pop_option(args, "--targ-output")
+        use_cache = not self._pop_flag(args, "--targ-no-cache")
+
+        try:
+            timeout = self._pop_timeout(args)
+        except ValueError as exception:
+            print(f"Error - {exception}")
+            return 1
+
+        if not args:
+            self.print_help()
+            return 0
+
+        command, args = self._find_command(args)
+        if command is None:
+            self._print_unrecognised(args)
+            return 1
+
+        if command.is_task and "--help" not in args:
+            print(
+                f"Error - {command.full_name} has dependencies, inputs or "
+                "outputs, which run_async doesn't support - use run_tasks "
+                "instead."
+            )
+            return 1
+
+        try:
+            await command.acall_with(
+                self._get_arg_class(args, command=command),
+                output_format=output_format,
+                use_cache=use_cache,
+                timeout=timeout,
+            )
+        except Exception as exception:
+            self._print_failure(command, exception, trace=trace)
+            return 1
+
+        return 0
+
+    def run_tasks(
+        self,
+        command: Command,
+        args: list[str] = [],
+        jobs: int = 1,
+        output_format: Optional[str] = None,
+        use_cache: bool = True,
+        timeout: Optional[float] = None,
+    ) -> list[TaskResult]:
+        """
+        Run the command, after the commands it depends on (see the
+        ``depends_on`` argument of :meth:`register`).
+
+        :param args:
+            The arguments for the command. Dependencies are called with the
+            arguments given in ``depends_on``, along with any values from
+            config files and environment variables.
+        :param jobs:
+            How many commands can run at the same time. Normal functions run
+            in a thread pool, and coroutines run in their own event loop in
+            each thread.
+        :param output_format:
+            If specified, the value returned by the command (but not its
+            dependencies) is written out in this format.
+        :param timeout:
+            Overrides the timeout of each command.
+        :returns:
+            The result of each command which needed running, with the
+            command itself last.
+
+        """
+        from .cancellation import reset_grace_period
+        from .tasks import build_graph, run_graph
+
+        tasks = build_graph(command, args, find_command=self._find_command)
+        root = tasks[next(reversed(tasks))]
+
+        def call(task: Task):
+            try:
+                task.command.call_with(
+                    self._get_arg_class(task.args, command=task.command),
+                    # The persistent event loop can't be shared between
+                    # threads.
+                    run_coroutine=self._run_coroutine if jobs == 1 else None,
+                    output_format=output_format if task is root else None,
+                    use_cache=use_cache,
+                    timeout=timeout,
+                )
+            finally:
+                reset_grace_period()
+
+        return run_graph(tasks, call, jobs=jobs)
+
+    def run_batch(
+        self,
+        lines: Iterable[str],
+        stop_on_error: bool = False,
+        trace: bool = False,
+    ) -> list[int]:
+        """
+        Run a sequence of commands in the same process, so the startup cost
+        is only paid once.
+
+        .. code-block:: python
+
+            cli.run_batch(["add 1 2", "math subtract --a=5 --b=3"])
+
+        :param lines:
+            Each line is parsed like a shell command, e.g.
+            ``group_name command_name --arg=value``. Blank lines, and comments
+            starting with ``#``, are ignored.
+        :param stop_on_error:
+            If ``True``, no more commands are run once one fails.
+        :param trace:
+            If ``True``, show a full stack trace when a command fails. It can
+            also be enabled for individual lines using ``--trace``.
+        :returns:
+            The exit status of each command which was run - 0 if successful,
+            otherwise 1.
+
+        """
+        import shlex
+
+        from .cancellation import handle_signals
+
+        self._load_manifest()
+
+        statuses = []
+
+        with handle_signals():
+            for line in lines:
+                args = shlex.split(line, comments=True)
+                if not args:
+                    continue
+
+                statuses.append(self._run_line(args, trace=trace))
+
+                if statuses[-1] and stop_on_error:
+                    break
+
+        return statuses
+
+    def _run_line(self, args: list[str], trace: bool = False) -> int:
+        """
+        Run a single line from :meth:`run_batch`.
+
+        :returns:
+            The exit status - 0 if successful, otherwise 1.
+
+        """
+        trace = self._pop_flag(args, "--trace") or trace
+        output_format = self._pop_option(args, "--targ-output")
+        use_cache = not self._pop_flag(args, "--targ-no-cache")
+
+        try:
+            timeout = self._pop_timeout(args)
+        except ValueError as exception:
+            print(f"Error - {exception}")
+            return 1
+
+        command, args = self._find_command(args)
+        if command is None:
+            self._print_unrecognised(args)
+            return 1
+
+        return self._run_command(
+            command,
+            args,
+            trace=trace,
+            output_format=output_format,
+            use_cache=use_cache,
+            timeout=timeout,
+        )
+
+    def _run_batch_file(self, args: list[str], trace: bool = False):
+        """
+        Handles ``--batch commands.txt``. If the path is ``-``, or omitted,
+        the commands are read from stdin.
+        """
+        stop_on_error = self._pop_flag(args, "--stop-on-error")
+        path = args[1] if len(args) >= 2 else "-"
+
+        if path == "-":
+            statuses = self.run_batch(
+                sys.stdin, stop_on_error=stop_on_error, trace=trace
+            )
+        else:
+            with open(path) as f:
+                statuses = self.run_batch(
+                    f, stop_on_error=stop_on_error, trace=trace
+                )
+
+        failed = len([i for i in statuses if i])
+        if failed:
+            print(
+                format_text(
+                    f"{failed} of {len(statuses)} commands failed.",
+                    color=Color.red,
+                )
+            )
+            sys.exit(1)
+
+    def run_map(
+        self,
+        command: Command,
+        args: list[str],
+        lines: Iterable[str],
+        jobs: int = 1,
+        use_processes: bool = False,
+        timeout: Optional[float] = None,
+    ) -> list[FanOutResult]:
+        """
+        Run the command once per line, with up to ``jobs`` running at the
+        same time. For example, to run a migration for lots of tenants.
+
+        :param args:
+            Arguments which are passed to every call.
+        :param lines:
+            Each line contains extra arguments for one call, e.g.
+            ``--tenant=acme``. Blank lines, and comments starting with ``#``,
+            are ignored.
+        :param jobs:
+            How many calls can run at the same time. Normal functions run in
+            a thread pool, and coroutines run concurrently in an event loop.
+        :param use_processes:
+            If ``True``, normal functions are run in a process pool instead
+            of a thread pool.
+        :param timeout:
+            Overrides the command's timeout for each call.
+        :raises ValueError:
+            If the command has dependencies, inputs or outputs - see
+            :meth:`run_tasks`.
+        :returns:
+            The result of each call.
+
+        """
+        import shlex
+
+        from .fan_out import fan_out
+
+        if command.is_task:
+            raise ValueError(
+                f"{command.full_name} has dependencies, inputs or outputs, "
+                "which aren't supported when running it once per line."
+            )
+
+        arg_sets = []
+
+        for line in lines:
+            line_args = shlex.split(line, comments=True)
+            if line_args:
+                arg_sets.append(
+                    (
+                        line_args,
+                        self._get_arg_class(args + line_args, command=command),
+                    )
+                )
+
+        return fan_out(
+            command,
+            arg_sets,
+            jobs=jobs,
+            use_processes=use_processes,
+            run_coroutine=self._run_coroutine,
+            timeout=command.timeout if timeout is None else timeout,
+        )
+
+    def _run_map_file(
+        self,
+        command: Command,
+        args: list[str],
+        path: str,
+        jobs: int = 1,
+        use_processes: bool = False,
+        trace: bool = False,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Handles ``--targ-map tenants.txt``. If the path is ``-``, the
+        argument sets are read from stdin.
+        """
+        from .fan_out import print_summary
+
+        if path == "-":
+            results = self.run_map(
+                command, args, sys.stdin, jobs, use_processes, timeout
+            )
+        else:
+            with open(path) as f:
+                results = self.run_map(
+                    command, args, f, jobs, use_processes, timeout
+                )
+
+        print_summary(results, trace=trace)
+
+        if not all(i.succeeded for i in results):
+            sys.exit(1)
+
     @property
     def _can_run_in_solo_mode(self) -> bool:
         return len(self.commands) == 1
@@ -405,17 +1933,58 @@ class CLI:
             automatically call the single registered command.
 
         """
+        run_started_at = time.perf_counter()
+
+        self._load_manifest()
+
         cleaned_args = self._get_cleaned_args()
         command: Optional[Command] = None
 
+        if cleaned_args and cleaned_args[0] == "--targ-complete":
+            self._print_completions(cleaned_args[1:])
+            return
+
+        if cleaned_args and cleaned_args[0] == "--targ-completion":
+            shell = cleaned_args[1] if len(cleaned_args) >= 2 else "bash"
+            from .completion import get_script
+
+            print(get_script(shell=shell, program=sys.argv[0]))
+            return
+
         # Work out if to enable tracebacks
+        trace = self._pop_flag(cleaned_args, "--trace")
+
+        # Work out if to run the command once per line of a file. The number
+        # of jobs is also used for running the command's dependencies.
+        map_path = self._pop_option(cleaned_args, "--targ-map")
         try:
-            index = cleaned_args.index("--trace")
-        except ValueError:
-            trace = False
-        else:
-            cleaned_args.pop(index)
-            trace = True
+            jobs = self._pop_jobs(cleaned_args)
+        except ValueError as exception:
+            print(f"Error - {exception}")
+            sys.exit(1)
+        use_processes = self._pop_flag(cleaned_args, "--targ-processes")
+
+        # Work out if to write out the command's return value
+        output_format = self._pop_option(cleaned_args, "--targ-output")
+
+        # Work out if to ignore cached results
+        use_cache = not self._pop_flag(cleaned_args, "--targ-no-cache")
+
+        # Work out if to stop the command after a number of seconds
+        try:
+            timeout = self._pop_timeout(cleaned_args)
+        except ValueError as exception:
+            print(f"Error - {exception}")
+            sys.exit(1)
+
+        # Work out if to show where the time is spent
+        profile_mode = self._pop_option(
+            cleaned_args, "--targ-profile", allow_separate=False
+        )
+        if profile_mode is None and self._pop_flag(
+            cleaned_args, "--targ-profile"
+        ):
+            profile_mode = ""
 
         if solo:
             if not self._can_run_in_solo_mode:
@@ -424,45 +1993,82 @@ class CLI:
                     "registered with the CLI."
                 )
                 return
-            command_name = ""
             command = self.commands[0]
             command.solo = True
         else:
             if len(cleaned_args) == 0:
-                print(self.get_help_text())
+                self.print_help()
                 return
 
-            command_name = cleaned_args[0]
-            command = self._get_command(command_name=command_name)
-            if command:
-                cleaned_args = cleaned_args[1:]
-
-        if not command:
-            # See if it belongs to a group:
-            if len(cleaned_args) >= 2:
-                group_name = cleaned_args[0]
-                command_name = cleaned_args[1]
-                command = self._get_command(
-                    command_name=command_name, group_name=group_name
-                )
-                if command:
-                    cleaned_args = cleaned_args[2:]
+            if cleaned_args[0] == "--batch":
+                self._run_batch_file(cleaned_args, trace=trace)
+                return
 
-        if command:
-            try:
-                arg_class = self._get_arg_class(cleaned_args)
-                command.call_with(arg_class)
-            except Exception as exception:
-                print(format_text("The command failed.", color=Color.red))
-                print(exception)
-
-                if trace:
-                    print(traceback.format_exc())
-                else:
-                    print("For a full stack trace, use --trace")
+            if cleaned_args[0] == "--shell":
+                from .shell import run_shell
 
-                command.print_help()
+                run_shell(self, trace=trace)
+                return
+
+            if cleaned_args[0] == "--targ-serve":
+                if len(cleaned_args) < 2:
+                    print("Error - please specify a socket path.")
+                    sys.exit(1)
+                from .server import serve
+
+                serve(self, socket_path=cleaned_args[1])
+                return
+
+            command, cleaned_args = self._find_command(cleaned_args)
+
+        if command is None:
+            self._print_unrecognised(cleaned_args)
+            self.print_help()
+            return
+
+        if command.is_task and (
+            map_path is not None or profile_mode is not None
+        ):
+            option = "--targ-map" if map_path is not None else "--targ-profile"
+            print(
+                f"Error - {command.full_name} has dependencies, inputs or "
+                f"outputs, which aren't supported with {option}."
+            )
+            sys.exit(1)
+
+        from .cancellation import handle_signals
+
+        # SIGINT and SIGTERM cancel the command, so it can clean up.
+        with handle_signals():
+            if map_path is not None:
+                self._run_map_file(
+                    command,
+                    cleaned_args,
+                    map_path,
+                    jobs=jobs,
+                    use_processes=use_processes,
+                    trace=trace,
+                    timeout=timeout,
+                )
+            elif profile_mode is not None:
+                if self._run_profiled(
+                    command,
+                    cleaned_args,
+                    mode=profile_mode,
+                    run_started_at=run_started_at,
+                    trace=trace,
+                    output_format=output_format,
+                    use_cache=use_cache,
+                    timeout=timeout,
+                ):
+                    sys.exit(1)
+            elif self._run_command(
+                command,
+                cleaned_args,
+                trace=trace,
+                output_format=output_format,
+                use_cache=use_cache,
+                jobs=jobs,
+                timeout=timeout,
+            ):
                 sys.exit(1)
-        else:
-            print(f"Unrecognised command - {command_name}")
-            print(self.get_help_text())
@@ -0,0 +1,44 @@
+"""
+Targ's own CLI. It's available as ``targ`` once installed, or via
+``python -m targ``.
+"""
+
+import os
+import sys
+from typing import Optional
+
+from targ import CLI, load_import_string
+
+
+def build(cli: str, path: Optional[str] = None):
+    """
+    Build the manifest for a CLI, so its help text can be shown without
+    importing the command modules.
+
+    :param cli:
+        An import string for the CLI instance, e.g. ``myapp.cli:cli``.
+    :param path:
+        Where to save the manifest. Defaults to the CLI's ``manifest_path``.
+
+    """
+    # Console scripts don't include the current directory on the path.
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+
+    target = load_import_string(cli)
+    if not isinstance(target, CLI):
+        raise ValueError(f"{cli} isn't a CLI instance.")
+
+    print(f"Manifest saved to {target.write_manifest(path=path)}")
+
+
+def main():
+    cli = CLI(description="Targ")
+    cli.register(build, group_name="manifest")
+    # Commands published by installed packages can be run using ``targ``.
+    cli.register_plugins()
+    cli.run()
+
+
+if __name__ == "__main__":
+    main()
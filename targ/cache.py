@@ -0,0 +1,299 @@
+"""
+Caches the results of commands registered with ``cacheable=True``, so running
+them again with the same arguments returns straight away.
+
+Each result is stored in its own file, along with anything the command
+printed out. The key is made from the command, its converted arguments, and
+the modification time and size of the file where the command is defined - so
+editing the command invalidates its cached results.
+
+Once the cache is larger than ``MAX_SIZE``, the least recently used results
+are removed.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import sys
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from targ import Command
+
+
+CACHE_VERSION = 1
+
+# In bytes.
+MAX_SIZE = 256 * 1024 * 1024
+
+
+def get_cache_directory() -> str:
+    """
+    Where targ stores its caches - ``$XDG_CACHE_HOME/targ``, or
+    ``~/.cache/targ``.
+    """
+    return os.path.join(
+        os.environ.get("XDG_CACHE_HOME")
+        or os.path.join(os.path.expanduser("~"), ".cache"),
+        "targ",
+    )
+
+
+def get_results_directory() -> str:
+    return os.path.join(get_cache_directory(), "results")
+
+
+def get_key(command: Command, kwargs: dict[str, Any]) -> Optional[str]:
+    """
+    :returns:
+        The key for this combination of command and arguments, or ``None``
+        if the arguments can't be pickled, in which case the result isn't
+        cached.
+    """
+    import hashlib
+    import pickle
+
+    from .manifest import get_source_path
+
+    source_path = get_source_path(command)
+    if source_path is None:
+        source = None
+    else:
+        stat = os.stat(source_path)
+        source = (source_path, stat.st_mtime_ns, stat.st_size)
+
+    # Sorted, so the order the arguments were given in doesn't matter.
+    arguments = sorted(kwargs.items())
+
+    try:
+        payload = pickle.dumps(
+            (CACHE_VERSION, command.import_path, source, arguments)
+        )
+    except Exception:
+        return None
+
+    return hashlib.sha256(payload).hexdigest()
+
+
+@dataclass
+class CachedResult:
+    result: Any
+    # Anything the command printed out:
+    output: str
+
+
+def load_result(
+    key: str, ttl: Optional[float] = None
+) -> Optional[CachedResult]:
+    """
+    :param ttl:
+        If specified, results older than this many seconds are ignored.
+    :returns:
+        The cached result, or ``None`` if there isn't one.
+    """
+    import pickle
+
+    path = os.path.join(get_results_directory(), f"{key}.pickle")
+
+    try:
+        with open(path, "rb") as f:
+            created_at, output, result = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # e.g. it was written by an incompatible version of the code.
+        _remove(path)
+        return None
+
+    if ttl is not None and time.time() - created_at > ttl:
+        _remove(path)
+        return None
+
+    # The modification time records when it was last used, for eviction.
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+    return CachedResult(result=result, output=output)
+
+
+def save_result(key: str, result: Any, output: str) -> bool:
+    """
+    :returns:
+        Whether the result was saved - it isn't if it can't be pickled (e.g.
+        it's a generator), or the cache directory can't be written to.
+    """
+    import pickle
+
+    try:
+        data = pickle.dumps((time.time(), output, result))
+    except Exception:
+        return False
+
+    from .files import write_file
+
+    directory = get_results_directory()
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+        write_file(os.path.join(directory, f"{key}.pickle"), data)
+    except OSError:
+        return False
+
+    evict(directory, max_size=MAX_SIZE)
+    return True
+
+
+def evict(directory: str, max_size: int):
+    """
+    Remove the least recently used results, until the total size is no more
+    than ``max_size`` bytes.
+    """
+    entries = []
+
+    with os.scandir(directory) as scanner:
+        for entry in scanner:
+            if entry.name.endswith(".pickle"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+    total_size = sum(size for _, size, _ in entries)
+
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        _remove(path)
+        total_size -= size
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class _Recorder:
+    """
+    Replaces ``sys.stdout`` while any cacheable commands are running. It
+    passes everything through to the real stdout, and also records it for
+    the commands running in the current thread or asyncio task.
+
+    Just one is installed, however many commands are running in parallel -
+    swapping ``sys.stdout`` for each command would mix up their output.
+    """
+
+    def __init__(self, stdout: Any):
+        self.stdout = stdout
+
+    def write(self, text: str) -> int:
+        for buffer in _buffers.get():
+            buffer.write(text)
+        return self.stdout.write(text)
+
+    def flush(self):
+        self.stdout.flush()
+
+    def isatty(self) -> bool:
+        return self.stdout.isatty()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.stdout, name)
+
+
+# The output of each cacheable command which is running in this thread or
+# task. There can be several, if one calls another.
+_buffers: ContextVar[tuple[io.StringIO, ...]] = ContextVar(
+    "_buffers", default=()
+)
+_recorder_lock = threading.Lock()
+_recorder: Optional[_Recorder] = None
+_recorder_users = 0
+
+
+@contextmanager
+def _record_stdout() -> Iterator[io.StringIO]:
+    """
+    Record everything the command writes to stdout, while still passing it
+    through.
+    """
+    global _recorder, _recorder_users
+
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = _Recorder(sys.stdout)
+            sys.stdout = _recorder
+        recorder = _recorder
+        _recorder_users += 1
+
+    buffer = io.StringIO()
+    token = _buffers.set(_buffers.get() + (buffer,))
+
+    try:
+        yield buffer
+    finally:
+        _buffers.reset(token)
+
+        with _recorder_lock:
+            _recorder_users -= 1
+            if _recorder_users == 0:
+                # Unless something else has replaced it in the meantime.
+                if sys.stdout is recorder:
+                    sys.stdout = recorder.stdout
+                _recorder = None
+
+
+def call_cached(command: Command, kwargs: dict[str, Any], call: Callable):
+    """
+    Return the cached result if there is one, otherwise call ``call``, and
+    cache its result. Exceptions aren't cached.
+    """
+    key = get_key(command, kwargs)
+    if key is None:
+        return call()
+
+    cached = load_result(key, ttl=command.cache_ttl)
+    if cached is not None:
+        sys.stdout.write(cached.output)
+        return cached.result
+
+    with _record_stdout() as output:
+        result = call()
+
+    save_result(key, result, output.getvalue())
+    return result
+
+
+async def acall_cached(
+    command: Command,
+    kwargs: dict[str, Any],
+    call: Callable[[], Awaitable],
+):
+    """
+    The same as :func:`call_cached`, but ``call`` returns an awaitable.
+    """
+    key = get_key(command, kwargs)
+    if key is None:
+        return await call()
+
+    cached = load_result(key, ttl=command.cache_ttl)
+    if cached is not None:
+        sys.stdout.write(cached.output)
+        return cached.result
+
+    with _record_stdout() as output:
+        result = await call()
+
+    save_result(key, result, output.getvalue())
+    return result
@@ -0,0 +1,306 @@
+"""
+Stops commands which take too long (``--targ-timeout``), and lets commands
+clean up when the process receives SIGINT or SIGTERM.
+
+The first signal cancels the command - coroutines are cancelled, and normal
+functions have ``CommandCancelled`` raised inside them, so ``finally``
+blocks and context managers run. If the command hasn't stopped within the
+grace period, or a second signal is received, the process exits straight
+away.
+
+The signal handlers are installed once by the CLI (see
+:func:`handle_signals`), rather than for each command, as installing them is
+relatively slow. When targ is used as a library, the application's own
+signal handlers are left alone.
+"""
+
+from __future__ import annotations
+
+import os
+import signal
+import sys
+from collections.abc import Awaitable, Callable, Coroutine, Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+# In seconds.
+GRACE_PERIOD = 10.0
+
+# Called when a signal is received, instead of raising ``CommandCancelled`` -
+# see :func:`on_cancel`.
+_cancellers: list[Callable[[int], Any]] = []
+
+# Started by the first signal - if the command is still running once it
+# fires, the process exits.
+_grace_timer: Any = None
+
+
+class CommandTimeout(TimeoutError):
+    """
+    Raised when a command takes longer than its timeout.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        super().__init__(
+            f"The command didn't finish within {timeout} seconds."
+            if timeout is not None
+            else "The command took too long."
+        )
+
+
+class CommandCancelled(KeyboardInterrupt):
+    """
+    Raised when the process receives SIGINT or SIGTERM while a command is
+    running. It's a ``KeyboardInterrupt``, so no more commands are run
+    afterwards (e.g. in batch mode).
+    """
+
+    def __init__(self, signal_number: int):
+        self.signal_number = signal_number
+        super().__init__(
+            "The command was cancelled "
+            f"({signal.Signals(signal_number).name})."
+        )
+
+
+def _exit(signal_number: int):
+    sys.stderr.write("The command didn't stop in time, so exiting.\n")
+    sys.stderr.flush()
+    os._exit(128 + signal_number)
+
+
+def reset_grace_period():
+    """
+    Called once a command has finished. If it was cancelled, but stopped in
+    time (e.g. a coroutine which caught ``CancelledError``), the next signal
+    cancels the next command, rather than exiting.
+
+    Signals are only handled by the main thread, so elsewhere this does
+    nothing - a command finishing in a worker thread doesn't mean the one
+    which was cancelled has stopped.
+    """
+    global _grace_timer
+    if _grace_timer is None:
+        return
+
+    import threading
+
+    if threading.current_thread() is threading.main_thread():
+        _grace_timer.cancel()
+        _grace_timer = None
+
+
+@contextmanager
+def handle_signals(grace_period: Optional[float] = None) -> Iterator[None]:
+    """
+    While running commands, SIGINT and SIGTERM cancel the current command.
+    Signal handlers can only be set in the main thread, so elsewhere this
+    does nothing.
+
+    :param grace_period:
+        How long a cancelled command has to stop, before the process exits.
+        Defaults to ``GRACE_PERIOD``.
+    """
+    if grace_period is None:
+        grace_period = GRACE_PERIOD
+
+    def handler(signal_number: int, frame: Any):
+        global _grace_timer
+        if _grace_timer is not None:
+            _exit(signal_number)
+
+        import threading
+
+        _grace_timer = threading.Timer(
+            grace_period, _exit, args=(signal_number,)
+        )
+        _grace_timer.daemon = True
+        _grace_timer.start()
+
+        if _cancellers:
+            _cancellers[-1](signal_number)
+        else:
+            raise CommandCancelled(signal_number)
+
+    try:
+        previous = {
+            signal_number: signal.signal(signal_number, handler)
+            for signal_number in (signal.SIGINT, signal.SIGTERM)
+        }
+    except ValueError:
+        # It's not the main thread.
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        for signal_number, previous_handler in previous.items():
+            signal.signal(
+                signal_number,
+                (
+                    signal.SIG_DFL
+                    if previous_handler is None
+                    else previous_handler
+                ),
+            )
+        reset_grace_period()
+
+
+@contextmanager
+def on_cancel(cancel: Callable[[int], Any]) -> Iterator[None]:
+    """
+    Within the block, signals call ``cancel`` with the signal number, rather
+    than raising ``CommandCancelled`` - e.g. to cancel a coroutine, as
+    raising an exception inside an event loop doesn't let it clean up.
+    Signals are always handled by the main thread, so this does nothing
+    elsewhere.
+    """
+    import threading
+
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    _cancellers.append(cancel)
+    try:
+        yield
+    finally:
+        _cancellers.remove(cancel)
+
+
+@contextmanager
+def time_limit(timeout: Optional[float]) -> Iterator[None]:
+    """
+    Raise ``CommandTimeout`` in the current thread if the block takes longer
+    than ``timeout`` seconds.
+
+    In the main thread, ``SIGALRM`` is used where available, which also
+    interrupts blocking calls like ``time.sleep``. Otherwise, the exception
+    is raised asynchronously in the thread, so blocking calls are only
+    interrupted once they return.
+    """
+    if timeout is None:
+        yield
+        return
+
+    import threading
+
+    if (
+        threading.current_thread() is threading.main_thread()
+        and hasattr(signal, "setitimer")
+        and signal.getsignal(signal.SIGALRM) == signal.SIG_DFL
+    ):
+        limit = _alarm(timeout)
+    else:
+        limit = _async_exception(timeout)
+
+    with limit:
+        yield
+
+
+@contextmanager
+def _alarm(timeout: float) -> Iterator[None]:
+    def handler(signal_number: int, frame: Any):
+        raise CommandTimeout(timeout)
+
+    signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+
+
+@contextmanager
+def _async_exception(timeout: float) -> Iterator[None]:
+    import ctypes
+    import threading
+
+    thread_id = ctypes.c_ulong(threading.get_ident())
+    lock = threading.Lock()
+    finished = False
+    fired = False
+    delivered = False
+
+    class AsyncTimeout(CommandTimeout):
+        # It's instantiated by the interpreter once it's been raised in the
+        # thread, which is how we know it's been delivered - even if the
+        # command catches it.
+        def __init__(self):
+            nonlocal delivered
+            delivered = True
+            super().__init__(timeout)
+
+    def interrupt():
+        nonlocal fired
+        with lock:
+            if not finished:
+                fired = True
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                    thread_id, ctypes.py_object(AsyncTimeout)
+                )
+
+    timer = threading.Timer(timeout, interrupt)
+    timer.daemon = True
+    timer.start()
+
+    try:
+        yield
+    finally:
+        with lock:
+            finished = True
+            timer.cancel()
+
+        if fired and not delivered:
+            # It finished just before the exception was raised. Wait for it
+            # here, rather than it being raised later on. It can't be
+            # cleared using ``PyThreadState_SetAsyncExc``, as that leaves the
+            # interpreter checking for it indefinitely.
+            try:
+                while True:
+                    pass
+            except AsyncTimeout:
+                pass
+
+
+async def wait_for(awaitable: Awaitable, timeout: Optional[float]) -> Any:
+    """
+    Like ``asyncio.wait_for``, but raises ``CommandTimeout``.
+    """
+    import asyncio
+
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise CommandTimeout(timeout) from None
+
+
+async def supervise(
+    coroutine: Coroutine, timeout: Optional[float] = None
+) -> Any:
+    """
+    Await the command's coroutine, cancelling it if it takes longer than
+    ``timeout`` seconds, or the process receives SIGINT or SIGTERM while
+    :func:`handle_signals` is active.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(coroutine)
+    signal_numbers: list[int] = []
+
+    def cancel(signal_number: int):
+        signal_numbers.append(signal_number)
+        loop.call_soon_threadsafe(task.cancel)
+
+    with on_cancel(cancel):
+        try:
+            return await wait_for(task, timeout)
+        except asyncio.CancelledError:
+            if signal_numbers:
+                raise CommandCancelled(signal_numbers[0]) from None
+            raise
@@ -0,0 +1,114 @@
+"""
+A lightweight client for a CLI running in server mode. For example:
+
+.. code-block:: bash
+
+    python -m targ.client /tmp/my_cli.sock migrate --tenant=acme
+
+It passes its stdin, stdout and stderr to the server, along with the
+arguments, environment variables and current directory, and exits with the
+command's exit code.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Optional
+
+from .server import HEADER
+
+
+def _connect(socket_path: str, timeout: float) -> socket.socket:
+    """
+    Keep trying to connect, in case the server is restarting.
+    """
+    deadline = time.monotonic() + timeout
+
+    while True:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            connection.close()
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+        else:
+            return connection
+
+
+def run_command(
+    socket_path: str, args: list[str], timeout: float = 10.0
+) -> int:
+    """
+    Run the command on the server.
+
+    :param timeout:
+        How many seconds to wait for the server to be available.
+    :returns:
+        The command's exit code.
+
+    """
+    payload = json.dumps(
+        {"args": args, "env": dict(os.environ), "cwd": os.getcwd()}
+    ).encode()
+
+    while True:
+        connection = _connect(socket_path, timeout=timeout)
+        try:
+            socket.send_fds(connection, [HEADER.pack(len(payload))], [0, 1, 2])
+            connection.sendall(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The server is restarting.
+            connection.close()
+            continue
+
+        responses = connection.makefile("rb")
+        pid: Optional[int] = None
+
+        while True:
+            try:
+                line = responses.readline()
+            except ConnectionResetError:
+                if pid is not None:
+                    raise
+                # The server restarted before it could reply, so the command
+                # never started - it's safe to try again.
+                break
+            except KeyboardInterrupt:
+                # Pass it on to the process running the command.
+                if pid is not None:
+                    os.kill(pid, signal.SIGINT)
+                continue
+
+            if not line:
+                print("The server closed the connection.", file=sys.stderr)
+                return 1
+
+            message = json.loads(line)
+
+            if message.get("reload"):
+                break
+            elif "pid" in message:
+                pid = message["pid"]
+            elif "exit" in message:
+                return message["exit"]
+
+        connection.close()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python -m targ.client SOCKET_PATH [ARGS...]")
+        sys.exit(1)
+
+    sys.exit(run_command(socket_path=sys.argv[1], args=sys.argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Shell completion for bash, zsh and fish.
+
+The shell calls the CLI with ``--targ-complete``, followed by the words typed
+so far (the last one being the word which is being completed). The CLI
+prints out one candidate per line, optionally followed by a tab and a
+description.
+
+Command names are looked up in the CLI's command index, and parameter names
+come from the manifest if there is one, so the command modules don't need to
+be imported.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from targ import CLI, Command
+
+
+BASH_SCRIPT = r"""
+_targ_complete_{function}() {{
+    local IFS=$'\n'
+    local candidates
+    candidates=($("${{COMP_WORDS[0]}}" --targ-complete \
+        "${{COMP_WORDS[@]:1:COMP_CWORD}}" 2>/dev/null | cut -f1))
+    COMPREPLY=($(compgen -W "${{candidates[*]}}" -- \
+        "${{COMP_WORDS[COMP_CWORD]}}"))
+    if [[ ${{#COMPREPLY[@]}} -eq 1 && ${{COMPREPLY[0]}} == *= ]]; then
+        compopt -o nospace
+    fi
+}}
+complete -F _targ_complete_{function} {program}
+"""
+
+ZSH_SCRIPT = r"""
+#compdef {program}
+_targ_complete_{function}() {{
+    local -a lines options values
+    local line
+    lines=("${{(@f)$(${{words[1]}} --targ-complete \
+        "${{(@)words[2,CURRENT]}}" 2>/dev/null)}}")
+    for line in $lines; do
+        [[ -z $line ]] && continue
+        line=${{line//:/\\:}}
+        line=${{line/$'\t'/:}}
+        if [[ ${{line%%:*}} == *= ]]; then
+            options+=($line)
+        else
+            values+=($line)
+        fi
+    done
+    _describe 'command' values
+    _describe 'option' options -S ''
+}}
+compdef _targ_complete_{function} {program}
+"""
+
+FISH_SCRIPT = r"""
+function __targ_complete_{function}
+    set -l words (commandline -opc)
+    $words[1] --targ-complete $words[2..-1] (commandline -ct) 2>/dev/null
+end
+complete -c {program} -f -a '(__targ_complete_{function})'
+"""
+
+SCRIPTS = {"bash": BASH_SCRIPT, "zsh": ZSH_SCRIPT, "fish": FISH_SCRIPT}
+
+
+def get_script(shell: str, program: str) -> str:
+    """
+    :param shell:
+        One of ``'bash'``, ``'zsh'`` or ``'fish'``.
+    :param program:
+        The name the CLI is invoked with, e.g. ``manage.py``.
+
+    """
+    try:
+        script = SCRIPTS[shell]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported shell - {shell}. Choose from "
+            f"{', '.join(SCRIPTS.keys())}."
+        )
+
+    program = os.path.basename(program)
+    function = re.sub(r"\W", "_", program)
+    return script.format(program=program, function=function).strip()
+
+
+def _join_equals(words: list[str]) -> list[str]:
+    """
+    Bash splits words on ``=``, so ``--name=bob`` arrives as three words.
+    """
+    output: list[str] = []
+    join_next = False
+
+    for word in words:
+        if word == "=" and output:
+            output[-1] += word
+            join_next = True
+        elif join_next:
+            output[-1] += word
+            join_next = False
+        else:
+            output.append(word)
+
+    return output
+
+
+def _get_description(command: Command) -> str:
+    # Parsing the docstrings of every command on each key press would be
+    # slow, so only use the description if it's in the manifest.
+    if command.manifest_entry is not None:
+        return command.description.strip()
+    return ""
+
+
+def _get_parameter_candidates(
+    command: Command, typed: list[str]
+) -> list[tuple[str, str]]:
+    given = {word[2:].split("=", 1)[0] for word in typed}
+
+    output = []
+    for parameter in command.parameters:
+        if parameter.name in given:
+            continue
+
+        if parameter.is_flag:
+            candidate = f"--{parameter.name}"
+        else:
+            candidate = f"--{parameter.name}="
+
+        description = (
+            f"default: {parameter.default_json}"
+            if parameter.default_json is not None
+            else parameter.description.strip().split("\n")[0]
+        )
+        output.append((candidate, description))
+
+    output.extend([("--help", ""), ("--trace", "")])
+    return output
+
+
+def get_completions(cli: CLI, words: list[str]) -> list[tuple[str, str]]:
+    """
+    :param words:
+        The words typed after the program name - the last one is the word
+        being completed, and may be an empty string.
+    :returns:
+        The matching candidates, along with a description for each.
+
+    """
+    words = _join_equals(words) or [""]
+    typed, current = words[:-1], words[-1]
+
+    if "=" in current:
+        # We don't complete values.
+        return []
+
+    candidates: list[tuple[str, str]] = []
+
+    if not typed:
+        groups = set()
+        for (group_name, name), command in cli._command_index.items():
+            if group_name is None:
+                candidates.append((name, _get_description(command)))
+            elif group_name not in groups:
+                groups.add(group_name)
+                candidates.append((group_name, "group"))
+    elif len(typed) == 1 and cli._get_command(typed[0]) is None:
+        for (group_name, name), command in cli._command_index.items():
+            if group_name == typed[0]:
+                candidates.append((name, _get_description(command)))
+    else:
+        matched_command, args = cli._find_command(typed)
+        if matched_command is not None and current.startswith("-"):
+            candidates = _get_parameter_candidates(
+                matched_command, [i for i in args if i.startswith("--")]
+            )
+
+    return [i for i in candidates if i[0].startswith(current)]
@@ -0,0 +1,111 @@
+"""
+Reads argument values from config files and environment variables, so they
+don't all need passing in on the command line.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from targ import Command
+
+
+# Maps each path to the file's modification time and size when it was
+# parsed, and the parsed contents.
+_cache: dict[str, tuple[tuple[int, int], dict[str, Any]]] = {}
+
+
+def load_config_file(path: str) -> dict[str, Any]:
+    """
+    Parse a ``targ.toml`` or ``pyproject.toml`` file. In a
+    ``pyproject.toml`` file, only the ``[tool.targ]`` section is used.
+
+    The result is cached, and the file is only parsed again if its
+    modification time or size changes - so in a long running process (e.g.
+    batch mode, or a server), the file isn't parsed for every command.
+
+    :returns:
+        The parsed contents, or an empty dictionary if the file doesn't
+        exist.
+
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        _cache.pop(path, None)
+        return {}
+
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    if sys.version_info >= (3, 11):
+        import tomllib
+    else:
+        import tomli as tomllib  # type: ignore
+
+    with open(path, "rb") as f:
+        contents = tomllib.load(f)
+
+    if os.path.basename(path) == "pyproject.toml":
+        contents = contents.get("tool", {}).get("targ", {})
+
+    _cache[path] = (key, contents)
+    return contents
+
+
+def get_config_values(
+    contents: dict[str, Any], command: Command
+) -> dict[str, Any]:
+    """
+    Get the values for the command from a parsed config file. For a command
+    called ``add`` in the ``maths`` group, the values come from the
+    ``[maths.add]`` section. Values directly in the ``[maths]`` section are
+    used by every command in the group which has a parameter with that name.
+    """
+    values: dict[str, Any] = {}
+    section = contents
+
+    if command.group_name:
+        section = contents.get(command.group_name, {})
+        if not isinstance(section, dict):
+            return values
+
+        parameter_names = command.signature.parameters
+        values.update(
+            (key, value)
+            for key, value in section.items()
+            if not isinstance(value, dict) and key in parameter_names
+        )
+
+    command_section = section.get(command.command_name or "")
+    if isinstance(command_section, dict):
+        values.update(command_section)
+
+    return values
+
+
+def get_env_name(prefix: str, command: Command, parameter_name: str) -> str:
+    """
+    For example, ``TARG_MATHS_ADD_A`` for the ``a`` parameter of the ``add``
+    command in the ``maths`` group, when the prefix is ``TARG``.
+    """
+    parts = [prefix, command.group_name, command.command_name, parameter_name]
+    name = "_".join(part for part in parts if part)
+    return re.sub(r"\W", "_", name).upper()
+
+
+def get_env_values(prefix: str, command: Command) -> dict[str, str]:
+    values = {}
+
+    for parameter_name in command.signature.parameters:
+        value = os.environ.get(get_env_name(prefix, command, parameter_name))
+        if value is not None:
+            values[parameter_name] = value
+
+    return values
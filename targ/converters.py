@@ -0,0 +1,358 @@
+"""
+Works out how to convert the values from the command line into the types
+which each command expects, based on its type annotations.
+"""
+
+from __future__ import annotations
+
+import decimal
+import enum
+import sys
+from collections.abc import Callable
+from functools import partial
+from typing import Any, Literal, Optional, Union, get_args, get_origin
+
+from .files import BinaryFile, MMap, map_file, open_binary_file
+from .streams import Stream, get_element_annotation, is_stream_type
+
+# Only available in Python 3.10 and above:
+try:
+    from types import NoneType, UnionType  # type: ignore
+except ImportError:
+    NoneType = type(None)  # type: ignore
+
+    class UnionType:  # type: ignore
+        pass
+
+
+Converter = Callable[[Any], Any]
+
+# If an annotation is one of these values, we will convert the string value
+# to it.
+CONVERTABLE_TYPES = (int, float, decimal.Decimal)
+
+TRUE_VALUES = ("true", "t", "yes", "y", "1")
+FALSE_VALUES = ("false", "f", "no", "n", "0")
+
+# Converters registered using ``register_converter``.
+_registered: dict[Any, Converter] = {}
+
+# Each annotation is only resolved once. ``None`` means the value is passed
+# through unchanged.
+_cache: dict[Any, Optional[Converter]] = {}
+
+
+def register_converter(annotation: Any, converter: Converter):
+    """
+    Tell targ how to convert values for parameters annotated with your own
+    types.
+
+    .. code-block:: python
+
+        targ.register_converter(Money, Money.parse)
+
+    :param annotation:
+        The type annotation, e.g. ``Money``.
+    :param converter:
+        Called with the value from the command line (usually a string),
+        and returns the converted value. It should raise a ``ValueError`` if
+        the value is invalid.
+
+    """
+    _registered[annotation] = converter
+    _cache.clear()
+
+
+def get_converter(annotation: Any) -> Optional[Converter]:
+    """
+    Work out how to convert a value from the command line to match the type
+    annotation.
+
+    :returns:
+        A callable which does the conversion, or ``None`` if the value should
+        be passed through unchanged.
+
+    """
+    try:
+        return _cache[annotation]
+    except KeyError:
+        converter = _cache[annotation] = _resolve(annotation)
+        return converter
+    except TypeError:
+        # It's unhashable, e.g. ``Literal[[1, 2]]``.
+        return _resolve(annotation)
+
+
+def _get_imported(module_name: str, attribute: str) -> Any:
+    """
+    Get a class from a module, but only if the module has already been
+    imported. If it hasn't, the annotation can't be that class - and
+    importing it would slow down startup for every command.
+    """
+    module = sys.modules.get(module_name)
+    return getattr(module, attribute, None) if module else None
+
+
+def _resolve(annotation: Any) -> Optional[Converter]:
+    if annotation is None:
+        # The parameter doesn't have an annotation.
+        return None
+
+    try:
+        return _registered[annotation]
+    except (KeyError, TypeError):
+        pass
+
+    if annotation in CONVERTABLE_TYPES:
+        return annotation
+
+    if annotation is bool:
+        return to_bool
+
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return partial(to_choice, choices=_get_enum_choices(annotation))
+
+    if annotation in (
+        _get_imported("pathlib", "Path"),
+        _get_imported("uuid", "UUID"),
+    ):
+        return annotation
+
+    if annotation in (
+        _get_imported("datetime", "datetime"),
+        _get_imported("datetime", "date"),
+    ):
+        return annotation.fromisoformat
+
+    if is_stream_type(annotation):
+        # The value is a file path, or '-' for stdin.
+        return partial(
+            Stream,
+            converter=get_converter(get_element_annotation(annotation)),
+        )
+
+    if annotation is BinaryFile:
+        return open_binary_file
+
+    if annotation is MMap:
+        return map_file
+
+    origin = get_origin(annotation)
+
+    if origin is Literal:
+        return partial(
+            to_choice,
+            choices={str(value): value for value in get_args(annotation)},
+        )
+
+    if annotation is _get_imported("array", "array"):
+        return to_array
+
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and numpy.ndarray in (annotation, origin):
+        return partial(to_ndarray, dtype=_get_numpy_dtype(annotation))
+
+    if annotation is list or origin is list:
+        element_annotation = get_element_annotation(annotation)
+        return partial(
+            to_list,
+            converter=get_converter(element_annotation),
+            split=(
+                _split_numbers
+                if element_annotation in CONVERTABLE_TYPES
+                else _split
+            ),
+        )
+
+    if annotation is tuple or origin is tuple:
+        return _get_tuple_converter(get_args(annotation))
+
+    if origin in [Union, UnionType]:  # type: ignore
+        # Union is used to detect Optional
+        inner_annotations = get_args(annotation)
+        filtered = [i for i in inner_annotations if i is not NoneType]
+        if len(filtered) == 1:
+            return get_converter(filtered[0])
+
+    return None
+
+
+def is_multi_valued(annotation: Any) -> bool:
+    """
+    Whether the parameter can be passed multiple times on the command line,
+    e.g. ``--tag=a --tag=b`` for ``list[str]``.
+    """
+    origin = get_origin(annotation)
+
+    if origin in [Union, UnionType]:  # type: ignore
+        return any(is_multi_valued(i) for i in get_args(annotation))
+
+    if annotation in (list, tuple) or origin in (list, tuple):
+        return True
+
+    numpy = sys.modules.get("numpy")
+    return annotation is _get_imported("array", "array") or (
+        numpy is not None and numpy.ndarray in (annotation, origin)
+    )
+
+
+###############################################################################
+# The converters
+
+
+def to_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+
+    lowered = str(value).lower()
+    if lowered in TRUE_VALUES:
+        return True
+    if lowered in FALSE_VALUES:
+        return False
+
+    raise ValueError(f"{value} isn't a valid boolean - use true or false.")
+
+
+def _get_enum_choices(annotation: type[enum.Enum]) -> dict[str, Any]:
+    # Members can be specified using their name, or their value.
+    choices: dict[str, Any] = {
+        str(member.value): member for member in annotation
+    }
+    choices.update(annotation.__members__)
+    return choices
+
+
+def to_choice(value: Any, choices: dict[str, Any]) -> Any:
+    try:
+        return choices[str(value)]
+    except KeyError:
+        raise ValueError(
+            f"{value} isn't a valid choice - the options are "
+            f"{', '.join(choices)}."
+        ) from None
+
+
+def _split(value: Any) -> list[Any]:
+    """
+    Values can be comma separated (``--tags=a,b``), or the parameter can be
+    repeated (``--tags=a --tags=b``), in which case it's already a list.
+    """
+    if isinstance(value, list):
+        return [item for element in value for item in _split(element)]
+    if isinstance(value, str):
+        return value.split(",") if value else []
+    return [value]
+
+
+def _split_numbers(value: Any) -> list[Any]:
+    """
+    Like ``_split``, but the values can also be read from a file, using
+    ``@path``. The file can be comma, space or newline separated.
+    """
+    if isinstance(value, list):
+        return [item for element in value for item in _split_numbers(element)]
+    if isinstance(value, str) and value.startswith("@"):
+        return _join_numbers(value).split()
+    return _split(value)
+
+
+def to_list(
+    value: Any,
+    converter: Optional[Converter] = None,
+    split: Callable[[Any], list[Any]] = _split,
+) -> list[Any]:
+    values = split(value)
+    if converter is None:
+        return values
+    return list(map(converter, values))
+
+
+def to_array(value: Any) -> Any:
+    """
+    Converts the values into an ``array.array``, which stores them as
+    machine values rather than Python objects. It contains 64 bit integers,
+    unless any of the values are floats.
+    """
+    import array
+
+    values = _split_numbers(value)
+    try:
+        return array.array("q", map(int, values))
+    except (ValueError, OverflowError):
+        return array.array("d", map(float, values))
+
+
+def _get_numpy_dtype(annotation: Any) -> Any:
+    """
+    Gets the dtype from annotations like ``NDArray[numpy.float32]``.
+    """
+    args = get_args(annotation)
+    if len(args) == 2:
+        dtype_args = get_args(args[1])
+        if dtype_args and dtype_args[0] is not Any:
+            return dtype_args[0]
+    return None
+
+
+def _join_numbers(value: Any) -> str:
+    """
+    Like ``_split_numbers``, but returns the values in a single space
+    separated string, so they can be parsed in bulk.
+    """
+    if isinstance(value, list):
+        return " ".join(_join_numbers(element) for element in value)
+    if isinstance(value, str) and value.startswith("@"):
+        with open(value[1:]) as file:
+            return file.read().replace(",", " ")
+    return str(value).replace(",", " ")
+
+
+def to_ndarray(value: Any, dtype: Any = None) -> Any:
+    """
+    Converts the values into a NumPy array. The string is parsed by NumPy,
+    rather than converting each value into a Python object first. If the
+    dtype isn't specified by the annotation, it's ``int64``, unless any of
+    the values are floats.
+    """
+    import warnings
+
+    import numpy  # type: ignore
+
+    text = _join_numbers(value)
+
+    for candidate in (dtype,) if dtype else (numpy.int64, numpy.float64):
+        try:
+            with warnings.catch_warnings():
+                # Older versions of NumPy only warn about invalid values.
+                warnings.simplefilter("error", DeprecationWarning)
+                return numpy.fromstring(text, dtype=candidate, sep=" ")
+        except (ValueError, DeprecationWarning):
+            continue
+
+    raise ValueError(f"{value} isn't a valid list of numbers.")
+
+
+def _get_tuple_converter(element_annotations: tuple) -> Converter:
+    if not element_annotations or (
+        len(element_annotations) == 2 and element_annotations[1] is Ellipsis
+    ):
+        # e.g. ``tuple[int, ...]``, which can be any length.
+        converter = get_converter(
+            element_annotations[0] if element_annotations else str
+        )
+        return lambda value: tuple(to_list(value, converter=converter))
+
+    converters = [get_converter(i) for i in element_annotations]
+
+    def to_tuple(value: Any) -> tuple:
+        values = _split(value)
+        if len(values) != len(converters):
+            raise ValueError(
+                f"Expected {len(converters)} values, but got {len(values)}."
+            )
+        return tuple(
+            converter(item) if converter is not None else item
+            for converter, item in zip(converters, values)
+        )
+
+    return to_tuple
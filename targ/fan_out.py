@@ -0,0 +1,239 @@
+"""
+Runs a single command many times, with different arguments each time, using
+a pool of threads or processes, or concurrent coroutines.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import traceback
+from collections.abc import Callable, Coroutine, Iterator
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional
+
+from .cancellation import time_limit, wait_for
+from .format import Color, format_text
+from .progress import Progress
+
+if TYPE_CHECKING:
+    from targ import Arguments, Command
+
+
+@dataclass
+class FanOutResult:
+    """
+    The outcome of calling the command with one set of arguments.
+
+    :param args:
+        The arguments, as they were given on the command line.
+    :param result:
+        The value returned by the command.
+    :param exception:
+        If the command failed, the exception which was raised.
+
+    """
+
+    args: list[str]
+    result: Any = None
+    exception: Optional[BaseException] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.exception is None
+
+
+@contextmanager
+def _start_progress(names: list[str]) -> Iterator[dict[str, Progress]]:
+    """
+    Each call gets its own ``Progress``, which is only started once the call
+    starts, so there's only a thread drawing it for the running calls.
+    """
+    progress = {name: Progress().start() for name in names}
+    try:
+        yield progress
+    finally:
+        for value in progress.values():
+            value.close()
+
+
+def _call(
+    function: Callable,
+    kwargs: dict[str, Any],
+    timeout: Optional[float],
+    progress: list[str],
+) -> Any:
+    """
+    Runs in the thread or process pool.
+    """
+    with _start_progress(progress) as extra_kwargs, time_limit(timeout):
+        return function(**kwargs, **extra_kwargs)
+
+
+async def _gather(
+    command: Command,
+    pending: list[tuple[FanOutResult, Arguments]],
+    jobs: int,
+    timeout: Optional[float],
+):
+    function = command.command_callable
+    binding_plan = command.binding_plan
+    semaphore = asyncio.Semaphore(jobs)
+
+    async def call(result: FanOutResult, arg_class: Arguments):
+        async with semaphore:
+            try:
+                kwargs = command.bind_arguments(arg_class)
+            except Exception as exception:
+                result.exception = exception
+                return
+
+            try:
+                with _start_progress(binding_plan.progress) as extra_kwargs:
+                    result.result = await wait_for(
+                        function(**kwargs, **extra_kwargs), timeout
+                    )
+            except Exception as exception:
+                result.exception = exception
+            finally:
+                binding_plan.close(kwargs)
+
+    await asyncio.gather(
+        *[call(result, arg_class) for result, arg_class in pending]
+    )
+
+
+def fan_out(
+    command: Command,
+    arg_sets: list[tuple[list[str], Arguments]],
+    jobs: int = 1,
+    use_processes: bool = False,
+    run_coroutine: Callable[[Coroutine], Any] = asyncio.run,
+    timeout: Optional[float] = None,
+) -> list[FanOutResult]:
+    """
+    Call the command once for each set of arguments.
+
+    :param arg_sets:
+        Each item is the raw arguments (used for reporting), and the parsed
+        ``Arguments``.
+    :param jobs:
+        How many calls can run at the same time - at least 1.
+    :param use_processes:
+        If ``True``, normal functions are called using a process pool rather
+        than a thread pool. The function, and its arguments, must be
+        picklable. Coroutines always run concurrently in one event loop.
+    :param timeout:
+        If a call takes longer than this many seconds, it's stopped, and
+        fails with ``CommandTimeout``.
+
+    """
+    if jobs < 1:
+        raise ValueError("The number of jobs should be at least 1.")
+
+    pending = [
+        (FanOutResult(args=args), arg_class) for args, arg_class in arg_sets
+    ]
+
+    # The arguments are only converted right before each call, so things
+    # like open files only exist for the calls which are running.
+    if command.binding_plan.is_coroutine:
+        run_coroutine(_gather(command, pending, jobs, timeout))
+    else:
+        _call_all(command, pending, jobs, use_processes, timeout)
+
+    return [result for result, _ in pending]
+
+
+def _call_all(
+    command: Command,
+    pending: list[tuple[FanOutResult, Arguments]],
+    jobs: int,
+    use_processes: bool,
+    timeout: Optional[float],
+):
+    function = command.command_callable
+    binding_plan = command.binding_plan
+    remaining = iter(pending)
+    running: dict[Future, tuple[FanOutResult, dict[str, Any]]] = {}
+
+    executor: Executor = (
+        ProcessPoolExecutor(max_workers=jobs)
+        if use_processes
+        else ThreadPoolExecutor(max_workers=jobs)
+    )
+
+    def submit_next():
+        for result, arg_class in remaining:
+            try:
+                kwargs = command.bind_arguments(arg_class)
+            except Exception as exception:
+                result.exception = exception
+                continue
+
+            try:
+                future = executor.submit(
+                    _call, function, kwargs, timeout, binding_plan.progress
+                )
+            except BaseException:
+                binding_plan.close(kwargs)
+                raise
+
+            running[future] = (result, kwargs)
+            return
+
+    try:
+        for _ in range(jobs):
+            submit_next()
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result, kwargs = running.pop(future)
+                binding_plan.close(kwargs)
+                try:
+                    result.result = future.result()
+                except Exception as exception:
+                    result.exception = exception
+                submit_next()
+    finally:
+        # If interrupted, no more calls are started - the running ones are
+        # waited for.
+        executor.shutdown()
+        for _, kwargs in running.values():
+            binding_plan.close(kwargs)
+
+
+def print_summary(results: list[FanOutResult], trace: bool = False):
+    failures = [i for i in results if not i.succeeded]
+
+    print("")
+    print(
+        format_text(
+            f"{len(results) - len(failures)} succeeded, "
+            f"{len(failures)} failed.",
+            color=Color.red if failures else Color.green,
+        )
+    )
+
+    for failure in failures:
+        print(format_text(" ".join(failure.args), color=Color.cyan))
+        print(failure.exception)
+        if trace and failure.exception is not None:
+            print(
+                "".join(
+                    traceback.format_exception(
+                        type(failure.exception),
+                        failure.exception,
+                        failure.exception.__traceback__,
+                    )
+                )
+            )
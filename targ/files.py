@@ -0,0 +1,92 @@
+"""
+Lets commands receive files which have already been opened, or memory
+mapped, rather than a path which they need to open themselves. Also has
+helpers for the files targ writes itself, like caches and manifests.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from typing import TYPE_CHECKING, Any, BinaryIO, Union
+
+if TYPE_CHECKING:
+    # So type checkers know what the command actually receives.
+    BinaryFile = BinaryIO
+    MMap = memoryview
+else:
+
+    class BinaryFile:
+        """
+        Annotate a parameter with this, and the command receives the file
+        opened in binary mode (an ``io.BufferedReader``), rather than the
+        path. Use ``-`` for stdin.
+        """
+
+    class MMap:
+        """
+        Annotate a parameter with this, and the command receives a read-only
+        ``memoryview`` of the memory mapped file. The file's contents are
+        only read from disk as they're accessed, and are never copied into a
+        ``bytes`` object, so it's suitable for very large files.
+        """
+
+
+def open_binary_file(path: str) -> BinaryIO:
+    if path == "-":
+        return sys.stdin.buffer
+    return open(path, "rb")
+
+
+def map_file(path: str) -> memoryview:
+    import mmap
+
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            # Empty files can't be memory mapped.
+            return memoryview(b"")
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return memoryview(mapped)
+
+
+def close_resource(value: Any):
+    """
+    Clean up a value created by one of the converters above, or a
+    ``Stream``, once the command has finished.
+    """
+    if isinstance(value, memoryview):
+        mapped: Any = value.obj
+        value.release()
+        if not isinstance(mapped, bytes):
+            try:
+                mapped.close()
+            except BufferError:
+                # The command kept a reference to part of the mapped file,
+                # so it's closed when that's garbage collected instead.
+                pass
+    elif value is not getattr(sys.stdin, "buffer", None):
+        value.close()
+
+
+def write_file(path: str, data: Union[str, bytes]):
+    """
+    Write to a temporary file, then rename it, so another process never
+    sees a partially written file. The temporary file is unique to each
+    process and thread, so writing the same file at the same time is safe -
+    the last one wins.
+    """
+    import threading
+
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        with open(temp_path, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
@@ -1,37 +1,162 @@
 from __future__ import annotations
 
+import re
+import sys
 from enum import Enum
 
-import colorama  # type: ignore
+# These are the same as the constants in colorama - colorama itself is only
+# imported when we're about to write coloured output to a terminal.
+BRIGHT = "\033[1m"
+RESET = "\033[39m"
+RESET_ALL = "\033[0m"
 
-colorama.init()
+ANSI_CODE = re.compile(r"\033\[[0-9;]*m")
+
+# Help text isn't any wider than this, even in wide terminals, as long lines
+# are hard to read.
+MAX_WIDTH = 100
+
+# The gap between columns in the help text.
+COLUMN_GAP = 2
+
+# The first column in the help text is never wider than this - longer values
+# are put on their own line instead.
+MAX_COLUMN_WIDTH = 30
+
+# If the terminal is too narrow to fit a second column of at least this
+# width, the second column is put below the first instead.
+MIN_COLUMN_WIDTH = 30
 
 
 class Color(Enum):
-    white = colorama.Fore.WHITE
-    yellow = colorama.Fore.YELLOW
-    red = colorama.Fore.RED
-    green = colorama.Fore.GREEN
-    cyan = colorama.Fore.CYAN
+    white = "\033[37m"
+    yellow = "\033[33m"
+    red = "\033[31m"
+    green = "\033[32m"
+    cyan = "\033[36m"
+
+
+_colorama_initialised = False
+
+
+def use_color() -> bool:
+    """
+    Only output colours when writing to a terminal.
+    """
+    global _colorama_initialised
+
+    isatty = getattr(sys.stdout, "isatty", None)
+    if isatty is None or not isatty():
+        return False
+
+    if not _colorama_initialised:
+        # On Windows, this converts the ANSI codes into Win32 calls.
+        import colorama  # type: ignore
+
+        colorama.init()
+        _colorama_initialised = True
+
+    return True
 
 
 def format_text(message: str, color: Color = Color.white, bold=False) -> str:
-    return (
-        (colorama.Style.BRIGHT if bold else "")
-        + color.value
-        + message
-        + colorama.Fore.RESET
-        + colorama.Style.RESET_ALL
-    )
+    if not use_color():
+        return message
+
+    return (BRIGHT if bold else "") + color.value + message + RESET + RESET_ALL
 
 
 def fixed_width(text: str, min_length: int = 10) -> str:
-    length = len(text)
-    if length < min_length:
-        return text + "".join([" " for _ in range(min_length - length)])
-    else:
-        return text
+    return text.ljust(min_length)
 
 
 def get_underline(length: int, character: str = "=") -> str:
-    return "".join([character for i in range(length)])
+    return character * length
+
+
+def get_terminal_width() -> int:
+    import shutil
+
+    return min(shutil.get_terminal_size().columns, MAX_WIDTH)
+
+
+def get_visible_length(text: str) -> int:
+    """
+    The length of the text, ignoring any colour codes.
+    """
+    return len(ANSI_CODE.sub("", text)) if "\033" in text else len(text)
+
+
+def wrap(text: str, width: int) -> list[str]:
+    """
+    Split the text into lines which fit within the width. It's a lot faster
+    than ``textwrap``, which matters when there are hundreds of commands.
+    """
+    return wrap_words(text.split(), width=max(width, MIN_COLUMN_WIDTH))
+
+
+def wrap_words(words: list[str], width: int, indent: int = 0) -> list[str]:
+    """
+    Join the words into lines which fit within the width. The words can
+    contain colour codes, and are never split up.
+
+    :param indent:
+        How many spaces to put before each line, except for the first.
+
+    """
+    lines: list[str] = []
+    line: list[str] = []
+    line_length = 0
+
+    for word in words:
+        length = get_visible_length(word)
+        if line and line_length + 1 + length > width:
+            lines.append(" ".join(line))
+            line = []
+            line_length = indent
+
+        if line:
+            line_length += 1
+        line.append(word)
+        line_length += length
+
+    if line:
+        lines.append(" ".join(line))
+
+    return [lines[0]] + [" " * indent + i for i in lines[1:]] if lines else []
+
+
+def format_columns(rows: list[tuple[str, str]], width: int) -> list[str]:
+    """
+    Lay out the rows in two columns - for example, names and descriptions.
+    The second column is wrapped to fit the width, and is aligned.
+
+    :param rows:
+        The first column can contain colour codes.
+
+    """
+    left_width = min(
+        max((get_visible_length(left) for left, _ in rows), default=0),
+        MAX_COLUMN_WIDTH,
+    )
+    if width - left_width - COLUMN_GAP < MIN_COLUMN_WIDTH:
+        # Too narrow, so put the second column underneath instead.
+        left_width = -COLUMN_GAP
+        indent = " " * 4
+    else:
+        indent = " " * (left_width + COLUMN_GAP)
+
+    lines = []
+
+    for left, right in rows:
+        wrapped = wrap(right, width - len(indent)) if right else []
+        padding = left_width - get_visible_length(left)
+
+        if wrapped and padding >= 0:
+            lines.append(left + " " * (padding + COLUMN_GAP) + wrapped.pop(0))
+        else:
+            lines.append(left)
+
+        lines.extend(indent + line for line in wrapped)
+
+    return lines
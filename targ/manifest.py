@@ -0,0 +1,136 @@
+"""
+A manifest stores the help text for each command in a JSON file, so it can be
+shown without importing the command modules, or parsing their docstrings.
+
+Each entry records the command's source file, along with its modification time
+and hash. An entry is only used if the source file hasn't changed since the
+manifest was built.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import inspect
+import json
+import os
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from targ import Command
+
+
+MANIFEST_VERSION = 1
+
+
+def get_source_path(command: Command) -> Optional[str]:
+    """
+    :returns:
+        The path of the file where the command's function is defined, or
+        ``None`` if it can't be determined (e.g. for builtins).
+    """
+    try:
+        source_path = inspect.getsourcefile(command.command_callable)
+    except TypeError:
+        return None
+
+    return os.path.abspath(source_path) if source_path else None
+
+
+def get_file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def get_fingerprint(path: str) -> dict[str, Any]:
+    stat = os.stat(path)
+    return {
+        "path": path,
+        "mtime": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "hash": get_file_hash(path),
+    }
+
+
+def is_fresh(fingerprint: dict[str, Any]) -> bool:
+    """
+    Check whether a source file is unchanged since the fingerprint was taken.
+    The modification time is checked first, as it's cheap - the file is only
+    hashed if it has changed (e.g. the file was checked out again, but the
+    contents are the same).
+    """
+    try:
+        stat = os.stat(fingerprint["path"])
+    except OSError:
+        return False
+
+    if (
+        stat.st_mtime_ns == fingerprint["mtime"]
+        and stat.st_size == fingerprint["size"]
+    ):
+        return True
+
+    if stat.st_size != fingerprint["size"]:
+        return False
+
+    return get_file_hash(fingerprint["path"]) == fingerprint["hash"]
+
+
+def build_entry(command: Command) -> Optional[dict[str, Any]]:
+    """
+    :returns:
+        A manifest entry for the command, or ``None`` if it can't be cached
+        because its source file is unknown.
+    """
+    source_path = get_source_path(command)
+    if source_path is None:
+        return None
+
+    return {
+        "import_path": command.import_path,
+        "description": command.description,
+        "parameters": [
+            dataclasses.asdict(parameter) for parameter in command.parameters
+        ],
+        "source": get_fingerprint(source_path),
+    }
+
+
+def build_manifest(commands: list[Command]) -> dict[str, Any]:
+    entries = {}
+
+    for command in commands:
+        entry = build_entry(command)
+        if entry is not None:
+            entries[command.full_name] = entry
+
+    return {"version": MANIFEST_VERSION, "commands": entries}
+
+
+def write_manifest(manifest: dict[str, Any], path: str):
+    """
+    A CLI which is running at the same time never sees a partially written
+    manifest.
+    """
+    from .files import write_file
+
+    write_file(path, json.dumps(manifest, separators=(",", ":")))
+
+
+def read_manifest(path: str) -> dict[str, dict[str, Any]]:
+    """
+    :returns:
+        The manifest entries, keyed by the command's full name. If the
+        manifest is missing, or was built by an incompatible version of targ,
+        then an empty dict is returned.
+    """
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+
+    return manifest.get("commands", {})
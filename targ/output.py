@@ -0,0 +1,310 @@
+"""
+Writes the values returned by commands, using ``--targ-output``.
+"""
+
+from __future__ import annotations
+
+import csv
+import dataclasses
+import inspect
+import io
+import json
+import os
+import sys
+from collections.abc import AsyncIterator, Callable, Coroutine, Iterator
+from typing import Any, Optional, TextIO
+
+FORMATS = ("json", "jsonl", "csv", "table")
+
+# Rows are written in chunks, rather than one at a time, to reduce the number
+# of writes.
+CHUNK_SIZE = 1000
+
+# The column widths of a table are worked out from this many rows, so the
+# rest can be streamed.
+TABLE_SAMPLE_SIZE = 100
+
+
+# Values of these types are written as they are, so the checks in
+# ``_to_record`` can be skipped.
+_PLAIN_TYPES = frozenset((dict, list, tuple, str, int, float, bool))
+
+
+def _is_rows(value: Any) -> bool:
+    """
+    Whether the value should be written as a sequence of rows (e.g. the
+    values yielded by a generator), rather than a single value.
+    """
+    return isinstance(value, (list, tuple, Iterator))
+
+
+def _to_record(value: Any) -> Any:
+    """
+    Convert dataclasses and named tuples into dictionaries, so their field
+    names are used for the column names and JSON keys.
+    """
+    if type(value) in _PLAIN_TYPES:
+        return value
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {
+            field.name: getattr(value, field.name)
+            for field in dataclasses.fields(value)
+        }
+    if isinstance(value, tuple) and hasattr(value, "_asdict"):
+        return value._asdict()
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    record = _to_record(value)
+    if record is not value:
+        return record
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+# Reused for every row, as ``json.dumps`` creates a new encoder each time if
+# ``default`` is passed in.
+_json_encoder = json.JSONEncoder(default=_json_default)
+
+
+class OutputWriter:
+    """
+    Writes a command's return value in the given format. If the command
+    returns a generator (or an async generator), each value it yields is
+    written as a row, as soon as it's yielded, so the rows never need to be
+    held in memory.
+
+    :param format:
+        One of ``'json'``, ``'jsonl'``, ``'csv'``, or ``'table'``.
+    :param file:
+        Where to write the output. Defaults to stdout.
+
+    """
+
+    def __init__(self, format: str, file: Optional[TextIO] = None):
+        if format not in FORMATS:
+            raise ValueError(
+                f"Unrecognised output format - {format}. The options are "
+                f"{', '.join(FORMATS)}."
+            )
+
+        self.format = format
+        self.file = file or sys.stdout
+        # When a person is watching the output, show each row straight away.
+        self.chunk_size = 1 if self.file.isatty() else CHUNK_SIZE
+
+        self._chunk: list[str] = []
+        self._row_count = 0
+        self._write_row: Callable[[Any], None] = getattr(
+            self, f"_write_{format}_row"
+        )
+
+        # Used by the CSV and table writers:
+        self._column_names: Optional[list[str]] = None
+        self._csv_writer: Any = None
+        self._table_sample: Optional[list[Any]] = []
+        self._column_widths: list[int] = []
+
+    ###########################################################################
+    # Writing the chunks
+
+    def _add(self, text: str):
+        chunk = self._chunk
+        chunk.append(text)
+        if len(chunk) >= self.chunk_size:
+            self._flush_chunk()
+
+    def _flush_chunk(self):
+        if self._chunk:
+            self.file.write("".join(self._chunk))
+            self._chunk.clear()
+
+    def _handle_broken_pipe(self):
+        """
+        The reader went away (e.g. ``| head``). Python tries to flush stdout
+        again when exiting, so it's pointed at ``/dev/null`` to avoid another
+        error, as recommended by the ``signal`` docs.
+        """
+        self._chunk.clear()
+        try:
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, self.file.fileno())
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            pass
+
+    ###########################################################################
+    # The formats
+
+    def _write_jsonl_row(self, row: Any):
+        self._add(_json_encoder.encode(row) + "\n")
+
+    def _write_json_row(self, row: Any):
+        prefix = ",\n  " if self._row_count else "[\n  "
+        self._add(prefix + _json_encoder.encode(row))
+
+    def _write_csv_row(self, row: Any):
+        row = _to_record(row)
+
+        if self._csv_writer is None:
+            # The csv module writes each row to this, so it's added to the
+            # current chunk.
+            self._csv_writer = csv.writer(
+                _ChunkTarget(self), lineterminator="\n"
+            )
+            if isinstance(row, dict):
+                self._column_names = list(row)
+                self._csv_writer.writerow(self._column_names)
+
+        if isinstance(row, dict) and self._column_names is not None:
+            # Missing values are None, which are written as empty strings.
+            self._csv_writer.writerow(map(row.get, self._column_names))
+        elif isinstance(row, (list, tuple)):
+            self._csv_writer.writerow(row)
+        else:
+            self._csv_writer.writerow((row,))
+
+    def _get_cells(self, row: Any) -> list[str]:
+        if self._column_names is not None and isinstance(row, dict):
+            return [str(row.get(name, "")) for name in self._column_names]
+        if isinstance(row, (list, tuple)):
+            return [str(i) for i in row]
+        return [str(row)]
+
+    def _write_table_line(self, cells: list[str]):
+        widths = self._column_widths
+        padded = [
+            cell.ljust(widths[index]) if index < len(widths) else cell
+            for index, cell in enumerate(cells)
+        ]
+        self._add(" | ".join(padded).rstrip() + "\n")
+
+    def _write_table_sample(self):
+        sample = self._table_sample or []
+        self._table_sample = None
+
+        if sample and isinstance(sample[0], dict):
+            self._column_names = list(sample[0])
+
+        rows = [self._get_cells(row) for row in sample]
+        header = self._column_names
+
+        for cells in rows + ([header] if header else []):
+            for index, cell in enumerate(cells):
+                if index < len(self._column_widths):
+                    self._column_widths[index] = max(
+                        self._column_widths[index], len(cell)
+                    )
+                else:
+                    self._column_widths.append(len(cell))
+
+        if header:
+            self._write_table_line(header)
+            self._add(
+                "-+-".join("-" * width for width in self._column_widths) + "\n"
+            )
+
+        for cells in rows:
+            self._write_table_line(cells)
+
+    def _write_table_row(self, row: Any):
+        row = _to_record(row)
+        sample = self._table_sample
+        if sample is not None:
+            sample.append(row)
+            if len(sample) >= TABLE_SAMPLE_SIZE:
+                self._write_table_sample()
+        else:
+            self._write_table_line(self._get_cells(row))
+
+    ###########################################################################
+    # Starting and finishing
+
+    def _flush_all(self):
+        self._flush_chunk()
+        self.file.flush()
+
+    def _finish_rows(self):
+        if self.format == "json":
+            self._add("\n]\n" if self._row_count else "[]\n")
+        elif self.format == "table" and self._table_sample is not None:
+            self._write_table_sample()
+
+        self._flush_all()
+
+    def _write_value(self, value: Any):
+        if self.format == "json":
+            self._add(json.dumps(value, default=_json_default, indent=2))
+            self._add("\n")
+            self._flush_all()
+        else:
+            # Written as a single row.
+            self._write_rows(iter([value]))
+
+    def _write_rows(self, rows: Iterator[Any]):
+        write_row = self._write_row
+        for row in rows:
+            write_row(row)
+            self._row_count += 1
+        self._finish_rows()
+
+    async def _awrite_rows(self, rows: AsyncIterator[Any]):
+        write_row = self._write_row
+        try:
+            async for row in rows:
+                write_row(row)
+                self._row_count += 1
+            self._finish_rows()
+        except BrokenPipeError:
+            self._handle_broken_pipe()
+            await rows.aclose()  # type: ignore
+
+    def write(
+        self,
+        value: Any,
+        run_coroutine: Optional[Callable[[Coroutine], Any]] = None,
+    ):
+        """
+        Write the value returned by a command.
+
+        :param run_coroutine:
+            Used to consume async generators. Defaults to ``asyncio.run``.
+
+        """
+        if inspect.isasyncgen(value):
+            if run_coroutine is None:
+                import asyncio
+
+                run_coroutine = asyncio.run
+            run_coroutine(self._awrite_rows(value))
+            return
+
+        try:
+            if _is_rows(value):
+                self._write_rows(iter(value))
+            elif value is not None:
+                self._write_value(value)
+        except BrokenPipeError:
+            self._handle_broken_pipe()
+            close = getattr(value, "close", None)
+            if close is not None:
+                close()
+
+    async def awrite(self, value: Any):
+        """
+        The same as :meth:`write`, but for use within a running event loop.
+        """
+        if inspect.isasyncgen(value):
+            await self._awrite_rows(value)
+        else:
+            self.write(value)
+
+
+class _ChunkTarget:
+    """
+    Lets the ``csv`` module write to the current chunk.
+    """
+
+    def __init__(self, writer: OutputWriter):
+        self.write = writer._add
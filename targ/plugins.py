@@ -0,0 +1,130 @@
+"""
+Finds commands published by installed packages, using entry points.
+
+Scanning for entry points means reading the metadata of every installed
+package, which is slow in large virtualenvs. So the results are cached, along
+with the modification time of each directory on ``sys.path``. Installing or
+removing a package changes the modification time of the directory it's
+installed in, so the packages are only scanned again when that happens.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from typing import Any, Optional
+
+ENTRY_POINT_GROUP = "targ.commands"
+
+CACHE_VERSION = 1
+
+
+def get_cache_path() -> str:
+    """
+    Each combination of Python environment and ``sys.path`` gets its own
+    cache file, so running several projects doesn't invalidate the cache
+    each time.
+    """
+    import zlib
+
+    from .cache import get_cache_directory
+
+    key = zlib.crc32("\0".join([sys.prefix, *sys.path]).encode())
+    return os.path.join(get_cache_directory(), f"plugins-{key:08x}.json")
+
+
+def get_path_fingerprint() -> list[list[Any]]:
+    """
+    :returns:
+        Each entry in ``sys.path``, along with its modification time (or
+        ``None`` if it doesn't exist).
+    """
+    fingerprint = []
+
+    for path in sys.path:
+        try:
+            modified = os.stat(path or os.curdir).st_mtime_ns
+        except OSError:
+            modified = None
+        fingerprint.append([path, modified])
+
+    return fingerprint
+
+
+def scan_entry_points(group: str) -> list[list[str]]:
+    """
+    :returns:
+        The name and import string of each entry point in the group. If
+        several packages use the same name, the first one on ``sys.path``
+        wins.
+    """
+    from importlib.metadata import entry_points
+
+    found: dict[str, str] = {}
+
+    for entry_point in entry_points(group=group):
+        found.setdefault(
+            entry_point.name,
+            (
+                f"{entry_point.module}:{entry_point.attr}"
+                if entry_point.attr
+                else entry_point.module
+            ),
+        )
+
+    return [[name, value] for name, value in found.items()]
+
+
+def read_cache(path: str) -> dict[str, Any]:
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+
+    return cache
+
+
+def write_cache(cache: dict[str, Any], path: str):
+    from .files import write_file
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_file(path, json.dumps(cache, separators=(",", ":")))
+
+
+def get_entry_points(
+    group: str = ENTRY_POINT_GROUP, cache_path: Optional[str] = None
+) -> list[list[str]]:
+    """
+    Like ``scan_entry_points``, but the result is cached until a directory
+    on ``sys.path`` changes.
+
+    :param cache_path:
+        Defaults to a file in ``$XDG_CACHE_HOME/targ`` (or ``~/.cache/targ``).
+
+    """
+    cache_path = cache_path or get_cache_path()
+    fingerprint = get_path_fingerprint()
+
+    cache = read_cache(cache_path)
+    if cache.get("fingerprint") != fingerprint:
+        cache = {
+            "version": CACHE_VERSION,
+            "fingerprint": fingerprint,
+            "groups": {},
+        }
+
+    groups = cache["groups"]
+    if group not in groups:
+        groups[group] = scan_entry_points(group)
+        try:
+            write_cache(cache, cache_path)
+        except OSError:
+            # e.g. the home directory is read only - it'll just be slower.
+            pass
+
+    return groups[group]
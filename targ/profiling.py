@@ -0,0 +1,156 @@
+"""
+Used by ``--targ-profile``, to show where the time goes when running a
+command - in Python's startup, registering the commands, importing the
+command's module, or running the command itself.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import pstats
+import subprocess
+import sys
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Optional
+
+from . import STARTUP_CPU_TIME, TARG_IMPORTED_AT
+from .format import Color, fixed_width, format_text, get_underline
+
+if TYPE_CHECKING:
+    from targ import Command
+
+# Imports which take less time than this (in microseconds) aren't shown.
+IMPORT_TIME_THRESHOLD = 1000
+
+
+class Profiler:
+    """
+    :param mode:
+        An empty string just shows how long each phase took. ``'cprofile'``
+        additionally shows the slowest functions while the command was
+        running, and ``'imports'`` shows how long it takes to import the
+        command's module. If it's a file path ending in ``.prof``, the
+        ``cProfile`` stats are saved to it instead, e.g. for use with
+        ``snakeviz``.
+
+    """
+
+    def __init__(self, mode: str = ""):
+        self.mode = mode
+        self.phases: list[tuple[str, float]] = []
+        self.stats: Optional[pstats.Stats] = None
+
+    @property
+    def use_cprofile(self) -> bool:
+        return self.mode == "cprofile" or self.mode.endswith(".prof")
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started_at))
+
+    def call(self, function: Callable, *args, **kwargs) -> Any:
+        if not self.use_cprofile:
+            return function(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(function, *args, **kwargs)
+        finally:
+            self.stats = pstats.Stats(profile, stream=sys.stderr)
+
+    def print_report(
+        self,
+        command: Command,
+        run_started_at: float,
+        registration_times: dict[str, float],
+    ):
+        registration_time = sum(registration_times.values())
+
+        timings = [
+            ("Startup until targ loaded (CPU time)", STARTUP_CPU_TIME),
+            (
+                "Imports and setup after targ",
+                run_started_at - TARG_IMPORTED_AT - registration_time,
+            ),
+            (
+                f"Registering {len(registration_times)} commands",
+                registration_time,
+            ),
+            *self.phases,
+        ]
+
+        _print("")
+        _print("Profile")
+        _print(get_underline(7, character="-"))
+        for name, duration in timings:
+            _print(fixed_width(name, 36) + _format_duration(duration))
+        _print("")
+
+        slowest = sorted(
+            registration_times.items(), key=lambda i: i[1], reverse=True
+        )[:5]
+        if slowest:
+            _print("Slowest registrations")
+            _print(get_underline(21, character="-"))
+            for name, duration in slowest:
+                _print(fixed_width(name, 36) + _format_duration(duration))
+            _print("")
+
+        if self.stats is not None:
+            if self.mode.endswith(".prof"):
+                self.stats.dump_stats(self.mode)
+                _print(f"Saved the cProfile stats to {self.mode}")
+            else:
+                self.stats.sort_stats("cumulative").print_stats(30)
+
+        if self.mode == "imports":
+            print_import_times(command)
+
+
+def _print(message: str):
+    # So the report doesn't get mixed up with the command's output.
+    print(message, file=sys.stderr)
+
+
+def _format_duration(duration: float) -> str:
+    return format_text(f"{duration * 1000:.2f} ms", color=Color.cyan)
+
+
+def print_import_times(command: Command):
+    """
+    Show how long it takes to import the command's module, in the same
+    format as ``python -X importtime``. It's done in a separate process, as
+    the module has already been imported by this one.
+    """
+    module = command.import_path.partition(":")[0]
+
+    if module == "__main__":
+        # Import the script, without running the ``__main__`` block.
+        code = f"import runpy; runpy.run_path({sys.argv[0]!r})"
+    else:
+        code = f"import {module}"
+
+    response = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+    )
+
+    _print(f"Import times for {module} (over {IMPORT_TIME_THRESHOLD} us)")
+    _print(get_underline(40, character="-"))
+
+    for line in response.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        cumulative = line.split("|")[1].strip()
+        if (
+            not cumulative.isdigit()
+            or int(cumulative) >= IMPORT_TIME_THRESHOLD
+        ):
+            _print(line)
@@ -0,0 +1,180 @@
+"""
+Shows the progress of long running commands, without slowing them down.
+
+Updating the progress just increments a counter. A background thread reads
+the counter at a fixed rate, and redraws a progress bar if the output is a
+terminal, or otherwise writes out a line periodically (e.g. in CI logs).
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from typing import Any, Optional, TextIO
+
+from .format import Color, format_text, get_terminal_width
+
+# How often the progress bar is redrawn on a terminal, in seconds.
+TTY_INTERVAL = 0.1
+
+# How often the progress is written out when it's not a terminal, in seconds.
+LOG_INTERVAL = 10.0
+
+# The progress bar isn't shown if there's less room than this for it.
+MIN_BAR_WIDTH = 10
+
+CLEAR_LINE = "\033[K"
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02}s"
+    return f"{seconds}s"
+
+
+class Progress:
+    """
+    Add a parameter annotated with ``targ.Progress`` to a command, and targ
+    passes one in:
+
+    .. code-block:: python
+
+        def import_rows(path: str, progress: targ.Progress):
+            rows = load_rows(path)
+            progress.total = len(rows)
+
+            for row in rows:
+                save(row)
+                progress.advance()
+
+    The parameter isn't shown in the help text, and can't be set from the
+    command line.
+
+    :param total:
+        How many items there are to process, if known. It's used to show
+        the percentage complete, and the time remaining.
+    :param description:
+        Shown before the progress bar.
+    :param file:
+        Where the progress is written to - ``sys.stderr`` by default, so it
+        doesn't get mixed up with the command's output.
+    :param interval:
+        How often the progress is written out, in seconds. Defaults to
+        ``TTY_INTERVAL`` on a terminal, otherwise ``LOG_INTERVAL``.
+
+    """
+
+    def __init__(
+        self,
+        total: Optional[int] = None,
+        description: str = "",
+        file: Optional[TextIO] = None,
+        interval: Optional[float] = None,
+    ):
+        self.count = 0
+        self.total = total
+        self.description = description
+        self.file = file or sys.stderr
+
+        isatty = getattr(self.file, "isatty", None)
+        self.is_tty = bool(isatty and isatty())
+        self.interval = (
+            interval
+            if interval is not None
+            else (TTY_INTERVAL if self.is_tty else LOG_INTERVAL)
+        )
+
+        self.started_at = time.perf_counter()
+        self._stopped: Any = None
+        self._thread: Any = None
+        self._last_line = ""
+
+    def advance(self, amount: int = 1):
+        """
+        Record that ``amount`` more items have been processed. It just
+        increments ``count``, so it's cheap enough to call for every item in
+        a tight loop.
+        """
+        self.count += amount
+
+    ###########################################################################
+    # Rendering
+
+    def render(self, width: int = 80) -> str:
+        count = self.count
+        total = self.total
+        elapsed = time.perf_counter() - self.started_at
+        rate = count / elapsed if elapsed > 0 else 0.0
+
+        stats = [f"{count:,}/{total:,}" if total else f"{count:,}"]
+        if total:
+            stats.append(f"({min(count / total, 1.0):.0%})")
+        stats.append(f"{rate:,.0f}/s" if rate >= 10 else f"{rate:.1f}/s")
+        if total and rate and count < total:
+            stats.append(f"{format_duration((total - count) / rate)} left")
+
+        words = [self.description] if self.description else []
+
+        if total and self.is_tty:
+            text_length = sum(len(i) + 1 for i in words + stats)
+            bar_width = width - text_length - 2
+            if bar_width >= MIN_BAR_WIDTH:
+                filled = int(bar_width * min(count / total, 1.0))
+                bar = format_text("#" * filled, color=Color.green)
+                words.append(f"[{bar}{'-' * (bar_width - filled)}]")
+
+        return " ".join(words + stats)
+
+    def _draw(self, final: bool = False):
+        if self.is_tty:
+            line = self.render(width=get_terminal_width())
+            self.file.write(f"\r{line}{CLEAR_LINE}" + ("\n" if final else ""))
+        else:
+            line = self.render()
+            if line == self._last_line:
+                return
+            self.file.write(f"{line}\n")
+
+        self._last_line = line
+        self.file.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._draw()
+
+    ###########################################################################
+    # Starting and stopping
+
+    def start(self) -> Progress:
+        """
+        Start drawing the progress in a background thread.
+        """
+        import threading
+
+        self.started_at = time.perf_counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """
+        Stop the background thread, and write out the final progress - unless
+        the progress was never used.
+        """
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+
+        if self.count or self.total:
+            self._draw(final=True)
+
+    def __enter__(self) -> Progress:
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
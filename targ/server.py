@@ -0,0 +1,196 @@
+"""
+Server mode keeps a CLI, and all of its command modules, loaded in a
+background process, so commands can be run without paying the startup cost
+each time.
+
+The server listens on a Unix socket. For each connection, it forks a child
+process, which takes over the client's stdin, stdout and stderr (they're
+passed over the socket), runs the command, and sends back the exit code. If
+any of the command source files change, the server restarts itself.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import traceback
+from typing import TYPE_CHECKING, Any
+
+from .manifest import get_source_path
+
+if TYPE_CHECKING:
+    from targ import CLI
+
+
+# Requests start with the length of the JSON payload.
+HEADER = struct.Struct("!Q")
+
+
+def is_supported() -> bool:
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "fork")
+
+
+def send_message(connection: socket.socket, message: dict[str, Any]):
+    connection.sendall(json.dumps(message).encode() + b"\n")
+
+
+def _receive_exactly(connection: socket.socket, length: int) -> bytes:
+    data = b""
+    while len(data) < length:
+        chunk = connection.recv(length - len(data))
+        if not chunk:
+            raise ConnectionError("The client disconnected.")
+        data += chunk
+    return data
+
+
+def _preload(cli: CLI):
+    """
+    Import every command up front, so it's ready when a request comes in.
+    """
+    for command in cli.commands:
+        try:
+            command.binding_plan
+        except Exception:
+            print(f"Unable to load {command.full_name}:")
+            traceback.print_exc()
+
+
+def _get_modification_times(cli: CLI) -> dict[str, int]:
+    paths = set()
+
+    main_file = getattr(sys.modules.get("__main__"), "__file__", None)
+    if main_file:
+        paths.add(os.path.abspath(main_file))
+
+    for command in cli.commands:
+        if command.is_loaded:
+            source_path = get_source_path(command)
+            if source_path:
+                paths.add(source_path)
+
+    modification_times = {}
+    for path in paths:
+        try:
+            modification_times[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+
+    return modification_times
+
+
+def _handle_request(cli: CLI, connection: socket.socket) -> int:
+    """
+    Runs in the forked child process.
+
+    :returns:
+        The command's exit code.
+
+    """
+    header, fds, _, _ = socket.recv_fds(connection, HEADER.size, 3)
+    header += _receive_exactly(connection, HEADER.size - len(header))
+    (length,) = HEADER.unpack(header)
+    request = json.loads(_receive_exactly(connection, length))
+
+    # Take over the client's stdin, stdout and stderr.
+    for fd, target in zip(fds, (0, 1, 2)):
+        os.dup2(fd, target)
+        os.close(fd)
+
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    sys.argv = [sys.argv[0], *request["args"]]
+
+    send_message(connection, {"pid": os.getpid()})
+
+    status = 0
+
+    try:
+        cli.run()
+    except SystemExit as exception:
+        if exception.code is None:
+            status = 0
+        elif isinstance(exception.code, int):
+            status = exception.code
+        else:
+            print(exception.code, file=sys.stderr)
+            status = 1
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+    return status
+
+
+def serve(cli: CLI, socket_path: str):
+    """
+    Listen for requests on the Unix socket, until interrupted.
+    """
+    if not is_supported():
+        raise RuntimeError("Server mode is only supported on Unix.")
+
+    _preload(cli)
+    modification_times = _get_modification_times(cli)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    # Anyone who can connect can run commands, so only the current user has
+    # access. The socket is created with these permissions, rather than
+    # changing them afterwards, so there's no window where others can
+    # connect.
+    umask = os.umask(0o177)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(umask)
+
+    server.listen()
+
+    # Stops finished child processes becoming zombies.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    # Make sure the socket is removed when terminated.
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+
+    print(f"Listening on {socket_path}")
+    sys.stdout.flush()
+
+    try:
+        while True:
+            connection, _ = server.accept()
+
+            if _get_modification_times(cli) != modification_times:
+                # Restart the server with the same arguments. The client
+                # will reconnect once it's ready.
+                send_message(connection, {"reload": True})
+                connection.close()
+                server.close()
+                os.unlink(socket_path)
+                os.execv(sys.executable, sys.orig_argv)
+
+            if os.fork() == 0:
+                server.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                status = 0
+                try:
+                    status = _handle_request(cli, connection)
+                    send_message(connection, {"exit": status})
+                finally:
+                    os._exit(status)
+
+            connection.close()
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,157 @@
+"""
+An interactive shell, for running lots of commands one after the other,
+without paying the startup cost each time.
+"""
+
+from __future__ import annotations
+
+import cmd
+import os
+import shlex
+import sys
+from typing import TYPE_CHECKING, Optional, TextIO
+
+from .completion import get_completions
+
+if TYPE_CHECKING:
+    from targ import CLI
+
+
+HISTORY_PATH = os.path.expanduser("~/.targ_history")
+HISTORY_LENGTH = 1000
+
+
+class Shell(cmd.Cmd):
+    """
+    Each line is run like a line in batch mode, e.g.
+    ``group_name command_name --arg=value``.
+    """
+
+    def __init__(
+        self,
+        cli: CLI,
+        trace: bool = False,
+        stdin: Optional[TextIO] = None,
+        stdout: Optional[TextIO] = None,
+    ):
+        super().__init__(stdin=stdin, stdout=stdout)
+        self.cli = cli
+        self.trace = trace
+        self.prompt = f"{os.path.basename(sys.argv[0]) or 'targ'}> "
+        self.intro = (
+            f"{cli.description} - enter a command, 'help' to list the "
+            "commands, or 'exit' to quit."
+        )
+        if stdin is not None:
+            # It's not a terminal, so don't use readline.
+            self.use_rawinput = False
+
+    def default(self, line: str):
+        try:
+            self.cli.run_batch([line], trace=self.trace)
+        except ValueError as exception:
+            # e.g. unmatched quotes.
+            print(f"Error - {exception}")
+
+    def emptyline(self):
+        # By default, the previous command is run again.
+        pass
+
+    def do_help(self, arg: str):
+        words = shlex.split(arg)
+        if not words:
+            self.cli.print_help()
+            return
+
+        command, _ = self.cli._find_command(words)
+        if command is None:
+            print(f"Unrecognised command - {arg}")
+        else:
+            command.print_help()
+
+    def do_exit(self, arg: str) -> bool:
+        return True
+
+    do_quit = do_exit
+
+    def do_EOF(self, arg: str) -> bool:
+        print("")
+        return True
+
+    ###########################################################################
+    # Completion
+
+    def _complete(self, text: str, line: str, begidx: int) -> list[str]:
+        try:
+            words = shlex.split(line[:begidx])
+        except ValueError:
+            return []
+
+        return [
+            candidate
+            for candidate, _ in get_completions(self.cli, words + [text])
+        ]
+
+    def completenames(self, text, line, begidx, endidx):
+        return self._complete(text, line, begidx)
+
+    def completedefault(self, text, line, begidx, endidx):
+        return self._complete(text, line, begidx)
+
+
+def _load_history() -> bool:
+    """
+    :returns:
+        Whether readline is available.
+    """
+    try:
+        import readline
+    except ImportError:
+        return False
+
+    # So option names like ``--name=`` can be completed.
+    readline.set_completer_delims(" \t\n")
+    readline.set_history_length(HISTORY_LENGTH)
+
+    try:
+        readline.read_history_file(HISTORY_PATH)
+    except OSError:
+        pass
+
+    return True
+
+
+def _save_history():
+    import readline
+
+    try:
+        readline.write_history_file(HISTORY_PATH)
+    except OSError:
+        pass
+
+
+def run_shell(cli: CLI, trace: bool = False):
+    """
+    Start the interactive shell, and keep going until the user exits. The
+    same event loop is used for all of the commands.
+    """
+    shell = Shell(cli, trace=trace)
+    has_readline = shell.use_rawinput and _load_history()
+
+    persistent_loop = cli.persistent_loop
+    cli.persistent_loop = True
+
+    try:
+        while True:
+            try:
+                shell.cmdloop()
+                break
+            except KeyboardInterrupt:
+                # Cancel the current line, or the command which is running.
+                print("")
+                shell.intro = None
+    finally:
+        cli.persistent_loop = persistent_loop
+        cli.close()
+        if has_readline:
+            _save_history()
@@ -0,0 +1,105 @@
+"""
+Lets commands process large inputs a line at a time, rather than reading
+everything into memory first.
+"""
+
+from __future__ import annotations
+
+import collections.abc
+import sys
+from collections.abc import Callable, Iterator
+from typing import IO, Any, Generic, Optional, TypeVar, get_args, get_origin
+
+T = TypeVar("T")
+
+# Parameters annotated with these (e.g. ``Iterator[int]``) are passed a
+# ``Stream``.
+STREAM_TYPES = (collections.abc.Iterator, collections.abc.Iterable)
+
+
+class Stream(Generic[T]):
+    """
+    Reads lines from a file, or stdin, one at a time. Each line is converted
+    into the correct type (e.g. ``int`` for ``Stream[int]``) as it's read, so
+    arbitrarily large inputs can be processed in constant memory.
+
+    The file isn't opened until the stream is first iterated over. It can
+    only be iterated over once.
+
+    :param source:
+        The path of the file to read, or ``'-'`` for stdin.
+    :param converter:
+        Converts each line (without the trailing newline) into the correct
+        type. If ``None``, the lines are returned as strings.
+
+    """
+
+    def __init__(
+        self,
+        source: str = "-",
+        converter: Optional[Callable[[str], T]] = None,
+    ):
+        self.source = source
+        self.converter = converter
+        self._file: Optional[IO[str]] = None
+        self._values: Optional[Iterator[T]] = None
+
+    def __repr__(self) -> str:
+        return f"Stream({self.source!r})"
+
+    def _get_values(self) -> Iterator[T]:
+        if self._values is not None:
+            return self._values
+
+        if self.source == "-":
+            file = sys.stdin
+        else:
+            file = self._file = open(self.source)
+
+        lines = (line.rstrip("\r\n") for line in file)
+        values: Iterator[Any] = (
+            map(self.converter, lines) if self.converter is not None else lines
+        )
+        self._values = values
+        return values
+
+    def __iter__(self) -> Iterator[T]:
+        # Returning the underlying iterator, rather than ``self``, means a
+        # ``for`` loop doesn't call back into Python for each line.
+        return self._get_values()
+
+    def __next__(self) -> T:
+        return next(self._get_values())
+
+    def close(self):
+        """
+        Close the file, if one was opened. Stdin is left open.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> Stream[T]:
+        return self
+
+    def __exit__(self, *exc_info: Any):
+        self.close()
+
+
+def is_stream_type(annotation: Any) -> bool:
+    """
+    Whether a parameter with this annotation should be passed a ``Stream``.
+    """
+    return (
+        annotation is Stream
+        or annotation in STREAM_TYPES
+        or get_origin(annotation) in (Stream, *STREAM_TYPES)
+    )
+
+
+def get_element_annotation(annotation: Any) -> Any:
+    """
+    For example, ``int`` for ``Iterator[int]``. Defaults to ``str``.
+    """
+    args = get_args(annotation)
+    return args[0] if args else str
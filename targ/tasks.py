@@ -0,0 +1,368 @@
+"""
+Runs a command after the commands it depends on, like ``make``.
+
+The dependencies form a graph, which is run with independent tasks in
+parallel. Each task runs at most once. If a task declares its output files,
+it's skipped when its input and output files are unchanged since it last
+ran successfully.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import os
+import stat
+import sys
+import time
+import traceback
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Optional
+
+from .format import Color, format_text
+
+if TYPE_CHECKING:
+    from targ import Command
+
+
+STATE_VERSION = 1
+
+
+@dataclass
+class Task:
+    """
+    A command, and the arguments it's called with.
+
+    :param dependencies:
+        The keys of the tasks which have to finish first.
+
+    """
+
+    command: Command
+    args: list[str] = field(default_factory=list)
+    dependencies: list[str] = field(default_factory=list)
+
+    @property
+    def key(self) -> str:
+        return " ".join([self.command.full_name, *self.args])
+
+
+class TaskStatus(Enum):
+    succeeded = "succeeded"
+    failed = "failed"
+    # Its files were up to date:
+    skipped = "skipped"
+    # A task it depends on failed:
+    not_run = "not run"
+
+
+@dataclass
+class TaskResult:
+    task: Task
+    status: TaskStatus = TaskStatus.not_run
+    exception: Optional[BaseException] = None
+    duration: float = 0.0
+
+
+def build_graph(
+    command: Command,
+    args: list[str],
+    find_command: Callable[[list[str]], tuple[Optional[Command], list[str]]],
+) -> dict[str, Task]:
+    """
+    Work out every task which needs running, by following ``depends_on``.
+
+    :param find_command:
+        Finds the command, and its arguments, for a dependency like
+        ``'assets build --minify'``.
+    :returns:
+        The tasks, keyed by ``Task.key``. Each task comes after its
+        dependencies, so the command being run is last.
+
+    """
+    import shlex
+
+    tasks: dict[str, Task] = {}
+    # The tasks which are being visited, to detect cycles:
+    path: list[str] = []
+
+    def visit(task: Task):
+        key = task.key
+        if key in tasks:
+            return
+
+        if key in path:
+            index = path.index(key)
+            cycle = " -> ".join([*path[index:], key])
+            raise ValueError(f"There's a circular dependency - {cycle}")
+
+        path.append(key)
+
+        for dependency in task.command.depends_on:
+            words = shlex.split(dependency)
+            dependency_command, dependency_args = (
+                find_command(words) if words else (None, words)
+            )
+            if dependency_command is None:
+                raise ValueError(
+                    f"{task.command.full_name} depends on {dependency}, "
+                    "which isn't a registered command."
+                )
+
+            dependency_task = Task(
+                command=dependency_command, args=dependency_args
+            )
+            visit(dependency_task)
+            task.dependencies.append(dependency_task.key)
+
+        path.pop()
+        tasks[key] = task
+
+    visit(Task(command=command, args=list(args)))
+    return tasks
+
+
+###############################################################################
+# Fingerprints
+
+
+def get_state_path() -> str:
+    """
+    The fingerprints are stored in the cache directory, separately for each
+    working directory, as the file patterns are relative to it.
+    """
+    import zlib
+
+    from .cache import get_cache_directory
+
+    key = zlib.crc32(os.getcwd().encode())
+    return os.path.join(get_cache_directory(), f"tasks-{key:08x}.json")
+
+
+def read_state(path: str) -> dict[str, Any]:
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        return {}
+
+    return state.get("tasks", {})
+
+
+def write_state(tasks: dict[str, Any], path: str):
+    from .files import write_file
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_file(path, json.dumps({"version": STATE_VERSION, "tasks": tasks}))
+
+
+def get_files(patterns: list[str]) -> list[list[list[Any]]]:
+    """
+    :returns:
+        For each glob pattern, the matching files, along with their
+        modification time and size.
+    """
+    files = []
+
+    for pattern in patterns:
+        matches = []
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(stat_result.st_mode):
+                matches.append(
+                    [path, stat_result.st_mtime_ns, stat_result.st_size]
+                )
+        files.append(matches)
+
+    return files
+
+
+def get_fingerprint(task: Task) -> dict[str, Any]:
+    return {
+        "inputs": get_files(task.command.inputs),
+        "outputs": get_files(task.command.outputs),
+    }
+
+
+def is_up_to_date(task: Task, state: dict[str, Any]) -> bool:
+    """
+    A task is up to date if it has outputs, they all exist, and none of its
+    input or output files have changed since it last succeeded. Tasks
+    without outputs always run.
+    """
+    if not task.command.outputs:
+        return False
+
+    fingerprint = get_fingerprint(task)
+    if not all(fingerprint["outputs"]):
+        return False
+
+    return state.get(task.key) == fingerprint
+
+
+###############################################################################
+# Running
+
+
+def _run_task(task: Task, call: Callable[[Task], Any]) -> TaskResult:
+    result = TaskResult(task=task)
+    started_at = time.perf_counter()
+
+    try:
+        call(task)
+    except Exception as exception:
+        result.status = TaskStatus.failed
+        result.exception = exception
+    else:
+        result.status = TaskStatus.succeeded
+
+    result.duration = time.perf_counter() - started_at
+    return result
+
+
+def _submit(
+    executor: Optional[ThreadPoolExecutor], function: Callable, *args
+) -> Future:
+    if executor is None:
+        # Run it straight away, in this thread.
+        future: Future = Future()
+        future.set_result(function(*args))
+        return future
+
+    return executor.submit(function, *args)
+
+
+def run_graph(
+    tasks: dict[str, Task],
+    call: Callable[[Task], Any],
+    jobs: int = 1,
+    state_path: Optional[str] = None,
+) -> list[TaskResult]:
+    """
+    Run the tasks, once their dependencies have finished. Once a task fails,
+    no more tasks are started.
+
+    :param call:
+        Runs the task's command. Called in a worker thread if ``jobs`` is
+        more than 1.
+    :param jobs:
+        How many tasks can run at the same time.
+    :param state_path:
+        Where the fingerprints are stored - defaults to ``get_state_path()``.
+    :returns:
+        The result of each task, in the same order as ``tasks``.
+
+    """
+    from concurrent.futures import wait
+
+    state_path = state_path or get_state_path()
+    state = read_state(state_path)
+
+    results = {key: TaskResult(task=task) for key, task in tasks.items()}
+    root_key = next(reversed(tasks))
+
+    waiting = {key: set(task.dependencies) for key, task in tasks.items()}
+    ready = [key for key, dependencies in waiting.items() if not dependencies]
+    running: dict[Future, str] = {}
+    failed = False
+
+    def finish(key: str):
+        for other_key, dependencies in waiting.items():
+            if key in dependencies:
+                dependencies.remove(key)
+                if not dependencies:
+                    ready.append(other_key)
+
+    executor = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+
+    try:
+        while ready or running:
+            while ready and not failed:
+                key = ready.pop(0)
+                task = tasks[key]
+
+                if is_up_to_date(task, state):
+                    print(
+                        format_text(f"{key} is up to date", Color.green),
+                        file=sys.stderr,
+                    )
+                    results[key].status = TaskStatus.skipped
+                    finish(key)
+                    continue
+
+                if key != root_key:
+                    # Printed to stderr, so it doesn't get mixed up with
+                    # the command's output (e.g. with --targ-output).
+                    print(
+                        format_text(f"Running {key}", Color.cyan),
+                        file=sys.stderr,
+                    )
+
+                running[_submit(executor, _run_task, task, call)] = key
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                result = results[key] = future.result()
+
+                if result.status is TaskStatus.failed:
+                    failed = True
+                    state.pop(key, None)
+                else:
+                    state[key] = get_fingerprint(result.task)
+                    finish(key)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+        try:
+            write_state(state, state_path)
+        except OSError:
+            pass
+
+    return list(results.values())
+
+
+def print_failures(results: list[TaskResult], trace: bool = False):
+    failures = [i for i in results if i.status is TaskStatus.failed]
+    if not failures:
+        return
+
+    not_run = [i for i in results if i.status is TaskStatus.not_run]
+
+    print(format_text("The command failed.", color=Color.red))
+
+    for failure in failures:
+        print(format_text(failure.task.key, color=Color.cyan))
+        print(failure.exception)
+        if trace and failure.exception is not None:
+            print(
+                "".join(
+                    traceback.format_exception(
+                        type(failure.exception),
+                        failure.exception,
+                        failure.exception.__traceback__,
+                    )
+                )
+            )
+
+    if not_run:
+        print(
+            "These weren't run: "
+            + ", ".join(result.task.key for result in not_run)
+        )
+
+    if not trace:
+        print("For a full stack trace, use --trace")
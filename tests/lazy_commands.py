@@ -0,0 +1,11 @@
+"""
+Used for testing lazy registration - this module shouldn't be imported until
+one of its commands is run.
+"""
+
+
+def multiply(a: int, b: int):
+    """
+    Multiply the two numbers.
+    """
+    print(a * b)
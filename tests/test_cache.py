@@ -0,0 +1,178 @@
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from targ import CLI
+from targ.cache import evict, get_results_directory
+
+
+class ResultCacheTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.environ = patch.dict(
+            os.environ, XDG_CACHE_HOME=self.temp_dir.name
+        )
+        self.environ.start()
+        self.calls = []
+
+    def tearDown(self):
+        self.environ.stop()
+        self.temp_dir.cleanup()
+
+    def _get_cli(self, **kwargs) -> CLI:
+        def diff(a: int, b: int):
+            self.calls.append((a, b))
+            print(f"The difference is {a - b}")
+            return {"difference": a - b}
+
+        cli = CLI()
+        cli.register(diff, cacheable=True, **kwargs)
+        return cli
+
+    def _run(self, cli: CLI, line: str) -> str:
+        stdout = io.StringIO()
+        with patch("sys.stdout", stdout):
+            self.assertEqual(cli.run_batch([line]), [0])
+        return stdout.getvalue()
+
+    def test_cached(self):
+        """
+        Make sure the result and output are returned from the cache, without
+        running the command again.
+        """
+        cli = self._get_cli()
+
+        first = self._run(cli, "diff 3 1 --targ-output=jsonl")
+        second = self._run(cli, "diff 3 1 --targ-output=jsonl")
+
+        self.assertEqual(first, 'The difference is 2\n{"difference": 2}\n')
+        self.assertEqual(second, first)
+        self.assertEqual(self.calls, [(3, 1)])
+
+        # Different arguments aren't cached yet.
+        self._run(cli, "diff 3 --b=2")
+        self.assertEqual(self.calls, [(3, 1), (3, 2)])
+
+    def test_argument_order(self):
+        """
+        Make sure the same arguments use the same cached result, however
+        they're given.
+        """
+        cli = self._get_cli()
+
+        for line in ("diff 3 1", "diff --b=1 --a=3", "diff 3 --b=1"):
+            self._run(cli, line)
+
+        self.assertEqual(self.calls, [(3, 1)])
+
+    def test_threads(self):
+        """
+        Make sure commands running in parallel each cache their own output,
+        and stdout is restored afterwards.
+        """
+        barrier = threading.Barrier(2, timeout=5)
+
+        def first():
+            barrier.wait()
+            for i in range(20):
+                print(f"first {i}")
+                time.sleep(0.001)
+
+        def second():
+            barrier.wait()
+            for i in range(20):
+                print(f"second {i}")
+                time.sleep(0.001)
+
+        def both():
+            pass
+
+        cli = CLI()
+        cli.register(first, cacheable=True)
+        cli.register(second, cacheable=True)
+        cli.register(both, depends_on=["first", "second"])
+
+        stdout = io.StringIO()
+        with patch("sys.stdout", stdout), patch("sys.stderr"):
+            cli.run_tasks(cli.commands[2], jobs=2)
+            self.assertIs(sys.stdout, stdout)
+
+        output = self._run(cli, "both")
+        self.assertEqual(
+            output.splitlines(),
+            [f"first {i}" for i in range(20)]
+            + [f"second {i}" for i in range(20)],
+        )
+
+    def test_no_cache(self):
+        cli = self._get_cli()
+
+        self._run(cli, "diff 3 1")
+        self._run(cli, "diff 3 1 --targ-no-cache")
+        self.assertEqual(self.calls, [(3, 1), (3, 1)])
+
+    def test_ttl(self):
+        cli = self._get_cli(cache_ttl=60)
+
+        self._run(cli, "diff 3 1")
+        self._run(cli, "diff 3 1")
+        self.assertEqual(len(self.calls), 1)
+
+        with patch("time.time", return_value=time.time() + 61):
+            self._run(cli, "diff 3 1")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_not_cacheable(self):
+        """
+        Make sure commands are only cached if they opt in.
+        """
+        cli = CLI()
+
+        def add(a: int, b: int):
+            self.calls.append((a, b))
+
+        cli.register(add)
+        self._run(cli, "add 1 2")
+        self._run(cli, "add 1 2")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_exception(self):
+        """
+        Make sure failures aren't cached.
+        """
+        failures = []
+
+        def divide(a: int, b: int):
+            failures.append(b)
+            return a / b
+
+        cli = CLI()
+        cli.register(divide, cacheable=True)
+
+        with patch("sys.stdout", io.StringIO()):
+            cli.run_batch(["divide 1 0", "divide 1 0"])
+
+        self.assertEqual(failures, [0, 0])
+
+    def test_evict(self):
+        """
+        Make sure the least recently used results are removed first.
+        """
+        directory = get_results_directory()
+        os.makedirs(directory)
+
+        for index, name in enumerate(["a", "b", "c"]):
+            path = os.path.join(directory, f"{name}.pickle")
+            with open(path, "wb") as f:
+                f.write(b"x" * 10)
+            os.utime(path, ns=(index, index))
+
+        evict(directory, max_size=20)
+        self.assertEqual(
+            sorted(os.listdir(directory)), ["b.pickle", "c.pickle"]
+        )
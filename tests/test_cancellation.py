@@ -0,0 +1,303 @@
+import asyncio
+import io
+import os
+import signal
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from targ import CLI, Arguments
+from targ.cancellation import CommandCancelled, CommandTimeout, time_limit
+
+
+class TimeoutTest(TestCase):
+    def setUp(self):
+        self.cleaned_up = []
+
+    def _run(self, cli: CLI, line: str) -> str:
+        stdout = io.StringIO()
+        with patch("sys.stdout", stdout):
+            self.status = cli.run_batch([line])[0]
+        return stdout.getvalue()
+
+    def test_coroutine(self):
+        """
+        Make sure coroutines are cancelled, so they can clean up.
+        """
+
+        async def wait(seconds: float):
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                self.cleaned_up.append(seconds)
+
+        cli = CLI()
+        cli.register(wait)
+
+        output = self._run(cli, "wait 5 --targ-timeout=0.1")
+        self.assertEqual(self.status, 1)
+        self.assertIn("didn't finish within 0.1 seconds", output)
+        self.assertEqual(self.cleaned_up, [5])
+
+        self._run(cli, "wait 0")
+        self.assertEqual(self.status, 0)
+
+    def test_function(self):
+        """
+        Make sure normal functions are interrupted, even when blocked.
+        """
+
+        def wait(seconds: float):
+            try:
+                time.sleep(seconds)
+            finally:
+                self.cleaned_up.append(seconds)
+
+        cli = CLI()
+        cli.register(wait, timeout=0.1)
+
+        started_at = time.perf_counter()
+        output = self._run(cli, "wait 5")
+        self.assertLess(time.perf_counter() - started_at, 2)
+        self.assertEqual(self.status, 1)
+        self.assertIn("didn't finish within 0.1 seconds", output)
+        self.assertEqual(self.cleaned_up, [5])
+
+        # The timeout can be overridden.
+        self._run(cli, "wait 0.2 --targ-timeout=5")
+        self.assertEqual(self.status, 0)
+
+    def test_invalid(self):
+        """
+        Make sure invalid timeouts are reported as a failure for that line,
+        rather than stopping the batch.
+        """
+
+        def wait(seconds: float):
+            time.sleep(seconds)
+
+        cli = CLI()
+        cli.register(wait)
+
+        stdout = io.StringIO()
+        with patch("sys.stdout", stdout):
+            statuses = cli.run_batch(
+                [
+                    "wait 0 --targ-timeout=soon",
+                    "wait 0 --targ-timeout=0",
+                    "wait 0",
+                ]
+            )
+
+        self.assertEqual(statuses, [1, 1, 0])
+        self.assertIn(
+            "Error - --targ-timeout should be a number of seconds greater "
+            "than 0, not 'soon'.",
+            stdout.getvalue(),
+        )
+
+        with patch.object(
+            cli,
+            "_get_cleaned_args",
+            return_value=["wait", "0", "--targ-timeout=abc"],
+        ), patch("sys.stdout", io.StringIO()):
+            with self.assertRaises(SystemExit):
+                cli.run()
+
+    def test_thread(self):
+        """
+        Make sure functions running outside of the main thread can be
+        interrupted.
+        """
+        errors = []
+
+        def work():
+            try:
+                with time_limit(0.1):
+                    while True:
+                        time.sleep(0.01)
+            except CommandTimeout as exception:
+                errors.append(exception)
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join(timeout=5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(errors[0].timeout, 0.1)
+
+    def test_thread_caught(self):
+        """
+        Make sure the thread carries on if the command catches the
+        exception.
+        """
+        caught = []
+
+        def work():
+            with time_limit(0.1):
+                try:
+                    while True:
+                        time.sleep(0.01)
+                except Exception as exception:
+                    caught.append(exception)
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join(timeout=5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertIsInstance(caught[0], CommandTimeout)
+
+    def test_generator(self):
+        """
+        Make sure the timeout applies while generators are written out.
+        """
+
+        def rows():
+            for i in range(50):
+                time.sleep(0.1)
+                yield {"value": i}
+
+        async def arows():
+            try:
+                for i in range(50):
+                    await asyncio.sleep(0.1)
+                    yield {"value": i}
+            finally:
+                self.cleaned_up.append("arows")
+
+        cli = CLI()
+        cli.register(rows, timeout=0.2)
+        cli.register(arows, timeout=0.2)
+
+        for line in ("rows --targ-output=jsonl", "arows --targ-output=jsonl"):
+            started_at = time.perf_counter()
+            output = self._run(cli, line)
+            self.assertLess(time.perf_counter() - started_at, 2)
+            self.assertEqual(self.status, 1)
+            self.assertIn("didn't finish within 0.2 seconds", output)
+
+        self.assertEqual(self.cleaned_up, ["arows"])
+
+    def test_fan_out(self):
+        def wait(seconds: float):
+            # Blocking calls in other threads are only interrupted once they
+            # return, so sleep in short bursts.
+            finish_at = time.perf_counter() + seconds
+            while time.perf_counter() < finish_at:
+                time.sleep(0.01)
+
+        async def await_(seconds: float):
+            await asyncio.sleep(seconds)
+
+        cli = CLI()
+        cli.register(wait, timeout=0.1)
+        cli.register(await_)
+
+        for command, timeout in zip(cli.commands, (None, 0.1)):
+            started_at = time.perf_counter()
+            results = cli.run_map(
+                command, [], ["5", "0"], jobs=2, timeout=timeout
+            )
+            self.assertLess(time.perf_counter() - started_at, 2)
+            self.assertIsInstance(results[0].exception, CommandTimeout)
+            self.assertTrue(results[1].succeeded)
+
+
+class SignalTest(TestCase):
+    def setUp(self):
+        self.cleaned_up = []
+        self.sigterm_handler = signal.getsignal(signal.SIGTERM)
+
+    def tearDown(self):
+        # Make sure the handlers are restored.
+        self.assertIs(signal.getsignal(signal.SIGTERM), self.sigterm_handler)
+
+    def test_coroutine(self):
+        async def serve():
+            asyncio.get_running_loop().call_later(
+                0.05, os.kill, os.getpid(), signal.SIGINT
+            )
+            try:
+                await asyncio.sleep(5)
+            finally:
+                self.cleaned_up.append(True)
+
+        cli = CLI()
+        cli.register(serve)
+
+        with self.assertRaises(CommandCancelled):
+            cli.run_batch(["serve"])
+
+        self.assertEqual(self.cleaned_up, [True])
+
+    def test_library(self):
+        """
+        When calling commands directly, rather than via the CLI, the signal
+        handlers shouldn't be changed.
+        """
+        cli = CLI()
+        cli.register(lambda: None, command_name="noop")
+
+        with patch("signal.signal") as signal_mock:
+            cli.commands[0].call_with(Arguments())
+
+        signal_mock.assert_not_called()
+
+    def test_function(self):
+        def serve():
+            try:
+                os.kill(os.getpid(), signal.SIGTERM)
+                time.sleep(5)
+            finally:
+                self.cleaned_up.append(True)
+
+        cli = CLI()
+        cli.register(serve)
+
+        with self.assertRaises(CommandCancelled) as context:
+            cli.run_batch(["serve"])
+
+        self.assertEqual(context.exception.signal_number, signal.SIGTERM)
+        self.assertEqual(self.cleaned_up, [True])
+
+    def test_cancellation_caught(self):
+        """
+        If a coroutine stops in time, the grace period is over - the next
+        command isn't cut short, and a later signal cancels it rather than
+        exiting.
+        """
+
+        async def serve():
+            asyncio.get_running_loop().call_later(
+                0.05, os.kill, os.getpid(), signal.SIGINT
+            )
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                self.cleaned_up.append(True)
+
+        def wait(seconds: float):
+            time.sleep(seconds)
+
+        def interrupt():
+            os.kill(os.getpid(), signal.SIGTERM)
+            time.sleep(5)
+
+        cli = CLI()
+        cli.register(serve)
+        cli.register(wait)
+        cli.register(interrupt)
+
+        exits = []
+
+        with patch("targ.cancellation.GRACE_PERIOD", 0.1), patch(
+            "targ.cancellation._exit", side_effect=exits.append
+        ):
+            with self.assertRaises(CommandCancelled) as context:
+                cli.run_batch(["serve", "wait 0.3", "interrupt"])
+
+        self.assertEqual(context.exception.signal_number, signal.SIGTERM)
+        self.assertEqual(self.cleaned_up, [True])
+        self.assertEqual(exits, [])
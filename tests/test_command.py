@@ -1,11 +1,13 @@
+import asyncio
 import dataclasses
 import decimal
 import sys
-from typing import Any, Optional, Union
+import tempfile
+from typing import Any, Optional, Union, get_type_hints
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
-from targ import CLI
+from targ import CLI, Arguments
 
 
 def add(a: int, b: int):
@@ -42,6 +44,74 @@ class CLITest(TestCase):
         self.assertTrue(len(cli.commands) == 1)
         self.assertTrue(cli.commands[0].command is add)
 
+    def test_register_import_string(self):
+        """
+        Make sure a command can be registered using an import string, and the
+        module isn't imported until it's needed.
+        """
+        sys.modules.pop("tests.lazy_commands", None)
+
+        cli = CLI()
+        cli.register("tests.lazy_commands:multiply", group_name="math")
+
+        command = cli.commands[0]
+        self.assertEqual(command.command_name, "multiply")
+        self.assertFalse(command.is_loaded)
+        self.assertNotIn("tests.lazy_commands", sys.modules)
+
+        with patch("targ.CLI._get_cleaned_args") as _get_cleaned_args:
+            _get_cleaned_args.return_value = ["math", "multiply", "2", "3"]
+            with patch("builtins.print", side_effect=print_) as print_mock:
+                cli.run()
+                print_mock.assert_called_with(6)
+
+        self.assertTrue(command.is_loaded)
+        self.assertIn("tests.lazy_commands", sys.modules)
+
+    def test_duplicate_names(self):
+        """
+        Make sure commands with clashing names or aliases are rejected.
+        """
+        cli = CLI()
+        cli.register(add, aliases=["sum"])
+
+        with self.assertRaises(ValueError):
+            cli.register(add)
+
+        with self.assertRaises(ValueError):
+            cli.register(print_, command_name="sum")
+
+        with self.assertRaises(ValueError):
+            cli.register(print_, aliases=["p", "p"])
+
+        # The same name is allowed in a different group.
+        cli.register(add, group_name="math")
+        self.assertEqual(len(cli.commands), 2)
+
+    def test_command_exists(self):
+        """
+        Make sure ``command_exists`` finds commands by group and name.
+        """
+        cli = CLI()
+        cli.register(add, group_name="math", aliases=["sum"])
+
+        self.assertTrue(
+            cli.command_exists(group_name="math", command_name="add")
+        )
+        self.assertFalse(
+            cli.command_exists(group_name="math", command_name="sum")
+        )
+        self.assertFalse(
+            cli.command_exists(group_name="other", command_name="add")
+        )
+
+    def test_invalid_import_string(self):
+        """
+        Make sure import strings without an attribute are rejected.
+        """
+        with self.assertRaises(ValueError):
+            CLI().register("tests.lazy_commands")
+
     @patch("targ.CLI._get_cleaned_args")
     def test_run(self, _get_cleaned_args: MagicMock):
         """
@@ -507,6 +577,169 @@ class CLITest(TestCase):
                 print_mock.assert_called_with(config.output)
                 print_mock.reset_mock()
 
+    def test_binding_plan(self):
+        """
+        Make sure the introspection is only done once, no matter how many
+        times the command is called.
+        """
+        cli = CLI()
+        cli.register(add)
+        command = cli.commands[0]
+
+        with patch("targ.get_type_hints", wraps=get_type_hints) as hints_mock:
+            with patch("builtins.print") as print_mock:
+                for _ in range(3):
+                    command.call_with(Arguments(args=["1"], kwargs={"b": "2"}))
+                    print_mock.assert_called_with(3)
+
+        self.assertEqual(hints_mock.call_count, 1)
+        self.assertEqual(command.binding_plan.positional, ["a", "b"])
+
+        with self.assertRaises(ValueError):
+            command.call_with(Arguments(args=["1", "2", "3"]))
+
+    def test_run_batch(self):
+        """
+        Make sure several commands can be run in one go, and the exit status
+        of each is returned.
+        """
+
+        def test_exception():
+            raise Exception("Bad things")
+
+        cli = CLI()
+        cli.register(add)
+        cli.register(add, group_name="math")
+        cli.register(test_exception)
+
+        lines = [
+            "add 1 2",
+            "",
+            "# A comment",
+            "math add --a=2 --b=2",
+            "test_exception",
+            "unknown_command",
+            "add 3 3",
+        ]
+
+        with patch("builtins.print", side_effect=print_) as print_mock:
+            statuses = cli.run_batch(lines)
+            print_mock.assert_any_call(3)
+            print_mock.assert_any_call(4)
+            print_mock.assert_called_with(6)
+
+            self.assertEqual(statuses, [0, 0, 1, 1, 0])
+
+            statuses = cli.run_batch(lines, stop_on_error=True)
+            self.assertEqual(statuses, [0, 0, 1])
+
+    @patch("targ.CLI._get_cleaned_args")
+    def test_batch_flag(self, _get_cleaned_args: MagicMock):
+        """
+        Make sure ``--batch`` reads commands from a file.
+        """
+        cli = CLI()
+        cli.register(add)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+            f.write("add 1 2\nadd 2 2\n")
+            f.flush()
+
+            _get_cleaned_args.return_value = ["--batch", f.name]
+
+            with patch("builtins.print", side_effect=print_) as print_mock:
+                cli.run()
+                print_mock.assert_any_call(3)
+                print_mock.assert_called_with(4)
+
+            _get_cleaned_args.return_value = ["--batch", f.name]
+            with patch("builtins.print", side_effect=print_):
+                with patch.object(cli, "run_batch", return_value=[0, 1]):
+                    with self.assertRaises(SystemExit):
+                        cli.run()
+
+    def test_persistent_loop(self):
+        """
+        Make sure coroutine commands share an event loop when
+        ``persistent_loop`` is enabled.
+        """
+        loops = []
+
+        async def get_loop():
+            loops.append(asyncio.get_running_loop())
+
+        loop_factory = MagicMock(side_effect=asyncio.new_event_loop)
+
+        cli = CLI(persistent_loop=True, loop_factory=loop_factory)
+        cli.register(get_loop)
+        self.assertEqual(cli.run_batch(["get_loop", "get_loop"]), [0, 0])
+        cli.close()
+
+        self.assertIs(loops[0], loops[1])
+        self.assertTrue(loops[0].is_closed())
+        loop_factory.assert_called_once()
+
+        # Without a persistent loop, a new loop is used each time.
+        loops.clear()
+        cli = CLI()
+        cli.register(get_loop)
+        cli.run_batch(["get_loop", "get_loop"])
+        self.assertIsNot(loops[0], loops[1])
+
+    def test_pending_tasks(self):
+        """
+        Make sure tasks which are still running when the command finishes
+        are cancelled, so they can clean up, before the loop is closed.
+        """
+        cleaned_up = []
+
+        async def background():
+            try:
+                await asyncio.sleep(5)
+            finally:
+                cleaned_up.append(True)
+
+        async def start():
+            asyncio.get_running_loop().create_task(background())
+            await asyncio.sleep(0)
+
+        for cli in (
+            CLI(loop_factory=asyncio.new_event_loop),
+            CLI(persistent_loop=True),
+        ):
+            cli.register(start)
+            self.assertEqual(cli.run_batch(["start"]), [0])
+            cli.close()
+
+        self.assertEqual(cleaned_up, [True, True])
+
+    def test_run_async(self):
+        """
+        Make sure commands can be run from within a running event loop.
+        """
+
+        async def async_add(a: int, b: int):
+            await asyncio.sleep(0)
+            print(a + b)
+
+        cli = CLI()
+        cli.register(async_add)
+        cli.register(add)
+
+        async def main():
+            return [
+                await cli.run_async(["async_add", "1", "2"]),
+                await cli.run_async(["add", "2", "2"]),
+                await cli.run_async(["unknown"]),
+            ]
+
+        with patch("builtins.print", side_effect=print_) as print_mock:
+            statuses = asyncio.run(main())
+            print_mock.assert_any_call(3)
+            print_mock.assert_any_call(4)
+
+        self.assertEqual(statuses, [0, 0, 1])
+
     @patch("targ.CLI._get_cleaned_args")
     def test_aliases(self, _get_cleaned_args: MagicMock):
         """
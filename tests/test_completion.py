@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from targ import CLI
+from targ.completion import get_completions, get_script
+
+
+def say_hello(name: str, greeting: str = "hello", loud: bool = False):
+    """
+    Greet someone.
+
+    :param name:
+        The person to greet.
+
+    """
+    print(f"{greeting} {name}")
+
+
+class CompletionTest(TestCase):
+    def setUp(self):
+        self.cli = CLI()
+        self.cli.register(say_hello, aliases=["hi"])
+        self.cli.register("tests.lazy_commands:multiply", group_name="math")
+
+    def _get_candidates(self, *words: str) -> list[str]:
+        return [i[0] for i in get_completions(self.cli, list(words))]
+
+    def test_commands(self):
+        self.assertEqual(self._get_candidates(""), ["say_hello", "hi", "math"])
+        self.assertEqual(self._get_candidates("m"), ["math"])
+        self.assertEqual(self._get_candidates("math", ""), ["multiply"])
+
+    def test_parameters(self):
+        self.assertEqual(
+            self._get_candidates("say_hello", "--"),
+            ["--name=", "--greeting=", "--loud", "--help", "--trace"],
+        )
+
+        # Parameters which were already given are omitted.
+        self.assertEqual(
+            self._get_candidates("hi", "--greeting=hey", "--g"), []
+        )
+
+        # Bash splits words on equals signs.
+        self.assertEqual(
+            self._get_candidates("hi", "--greeting", "=", "hey", "--n"),
+            ["--name="],
+        )
+
+        completions = dict(get_completions(self.cli, ["say_hello", "--"]))
+        self.assertEqual(completions["--greeting="], 'default: "hello"')
+        self.assertEqual(completions["--name="], "The person to greet.")
+
+    def test_manifest(self):
+        """
+        Make sure parameters can be completed without importing the command
+        module, if there's a manifest.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest_path = os.path.join(temp_dir, "manifest.json")
+            self.cli.write_manifest(manifest_path)
+            sys.modules.pop("tests.lazy_commands", None)
+
+            cli = CLI(manifest_path=manifest_path)
+            cli.register("tests.lazy_commands:multiply", group_name="math")
+            cli._load_manifest()
+
+            completions = get_completions(cli, ["math", "multiply", "--"])
+            self.assertIn(("--a=", ""), completions)
+            self.assertNotIn("tests.lazy_commands", sys.modules)
+
+    @patch("targ.CLI._get_cleaned_args")
+    def test_protocol(self, _get_cleaned_args: MagicMock):
+        """
+        Make sure ``--targ-complete`` prints out a candidate per line.
+        """
+        _get_cleaned_args.return_value = ["--targ-complete", "math", ""]
+
+        with patch("sys.stdout") as stdout:
+            self.cli.run()
+            stdout.write.assert_called_once_with("multiply\t\n")
+
+    def test_scripts(self):
+        for shell in ("bash", "zsh", "fish"):
+            script = get_script(shell, "/home/bob/manage.py")
+            self.assertIn("manage.py", script)
+            self.assertIn("_targ_complete_manage_py", script)
+
+        with self.assertRaises(ValueError):
+            get_script("powershell", "manage.py")
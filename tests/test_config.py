@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import textwrap
+from unittest import TestCase
+from unittest.mock import patch
+
+from targ import CLI
+from targ.config import load_config_file
+
+
+class ConfigTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.received = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, file_name: str, contents: str) -> str:
+        path = os.path.join(self.temp_dir, file_name)
+        with open(path, "w") as f:
+            f.write(textwrap.dedent(contents))
+        return path
+
+    def _get_cli(self, **kwargs) -> CLI:
+        def add(a: int, b: int = 0, label: str = ""):
+            self.received.append((a, b, label))
+
+        def subtract(a: int, b: int):
+            pass
+
+        cli = CLI(**kwargs)
+        cli.register(add, group_name="maths")
+        cli.register(subtract, group_name="maths")
+        return cli
+
+    def _run(self, cli: CLI, args: list[str]):
+        with patch("targ.CLI._get_cleaned_args", return_value=args):
+            cli.run()
+
+    def test_config_files(self):
+        """
+        Make sure values are read from the command's section, and the
+        group's section, with later files taking precedence.
+        """
+        targ_toml = self._write(
+            "targ.toml",
+            """
+            [maths]
+            label = "from group"
+
+            [maths.add]
+            a = 1
+            b = 2
+            """,
+        )
+        pyproject_toml = self._write(
+            "pyproject.toml",
+            """
+            [tool.targ.maths.add]
+            b = 3
+            """,
+        )
+
+        cli = self._get_cli(config_files=[targ_toml, pyproject_toml])
+        self._run(cli, ["maths", "add"])
+
+        self.assertEqual(self.received, [(1, 3, "from group")])
+
+    def test_env_vars(self):
+        """
+        Make sure environment variables take precedence over config files,
+        and the command line takes precedence over both.
+        """
+        targ_toml = self._write(
+            "targ.toml",
+            """
+            [maths.add]
+            a = 1
+            b = 2
+            label = "config"
+            """,
+        )
+
+        cli = self._get_cli(config_files=[targ_toml], env_prefix="TARG")
+
+        with patch.dict(
+            os.environ, {"TARG_MATHS_ADD_B": "5", "TARG_MATHS_ADD_A": "4"}
+        ):
+            self._run(cli, ["maths", "add", "7", "--label=cli"])
+
+        self.assertEqual(self.received, [(7, 5, "cli")])
+
+    def test_cache(self):
+        """
+        Make sure the file is only parsed again if it changes.
+        """
+        path = self._write("targ.toml", "[add]\na = 1\n")
+
+        contents = load_config_file(path)
+        self.assertIs(load_config_file(path), contents)
+
+        os.utime(path, ns=(0, 0))
+        self.assertIsNot(load_config_file(path), contents)
+
+        path = self._write("targ.toml", "[add]\na = 100\n")
+        self.assertEqual(load_config_file(path), {"add": {"a": 100}})
+
+    def test_missing_file(self):
+        cli = self._get_cli(
+            config_files=[os.path.join(self.temp_dir, "targ.toml")]
+        )
+        self._run(cli, ["maths", "add", "1"])
+        self.assertEqual(self.received, [(1, 0, "")])
@@ -0,0 +1,203 @@
+import array
+import datetime
+import enum
+import os
+import pathlib
+import tempfile
+import uuid
+from typing import Literal, Optional
+from unittest import TestCase, skipIf
+
+from targ import CLI, Arguments, get_converter, register_converter
+
+
+class Colour(enum.Enum):
+    red = "r"
+    green = "g"
+
+
+class Money:
+    def __init__(self, pence: int):
+        self.pence = pence
+
+    @classmethod
+    def parse(cls, value: str) -> "Money":
+        pounds, pence = value.split(".")
+        return cls(int(pounds) * 100 + int(pence))
+
+
+class ConverterTest(TestCase):
+    def _convert(self, annotation, value):
+        converter = get_converter(annotation)
+        assert converter is not None
+        return converter(value)
+
+    def test_enum(self):
+        """
+        Make sure enum members can be specified by name or value.
+        """
+        self.assertIs(self._convert(Colour, "red"), Colour.red)
+        self.assertIs(self._convert(Colour, "g"), Colour.green)
+
+        with self.assertRaises(ValueError):
+            self._convert(Colour, "blue")
+
+    def test_literal(self):
+        annotation = Literal["fast", "slow", 1]
+        self.assertEqual(self._convert(annotation, "fast"), "fast")
+        self.assertEqual(self._convert(annotation, "1"), 1)
+
+        with self.assertRaises(ValueError):
+            self._convert(annotation, "medium")
+
+    def test_bool(self):
+        self.assertIs(self._convert(bool, "yes"), True)
+        self.assertIs(self._convert(bool, "0"), False)
+        self.assertIs(self._convert(bool, True), True)
+
+        with self.assertRaises(ValueError):
+            self._convert(bool, "maybe")
+
+    def test_standard_library_types(self):
+        self.assertEqual(
+            self._convert(datetime.datetime, "2024-01-02T03:04:05"),
+            datetime.datetime(2024, 1, 2, 3, 4, 5),
+        )
+        self.assertEqual(
+            self._convert(datetime.date, "2024-01-02"),
+            datetime.date(2024, 1, 2),
+        )
+        value = "12345678-1234-5678-1234-567812345678"
+        self.assertEqual(self._convert(uuid.UUID, value), uuid.UUID(value))
+        self.assertEqual(
+            self._convert(Optional[pathlib.Path], "a.txt"),
+            pathlib.Path("a.txt"),
+        )
+
+    def test_list(self):
+        self.assertEqual(self._convert(list[int], "1,2,3"), [1, 2, 3])
+        self.assertEqual(self._convert(list[int], ["1", "2,3"]), [1, 2, 3])
+        self.assertEqual(self._convert(list, "a,b"), ["a", "b"])
+        self.assertEqual(self._convert(list[str], ""), [])
+
+    def test_tuple(self):
+        self.assertEqual(self._convert(tuple[int, float], "1,2.5"), (1, 2.5))
+        self.assertEqual(self._convert(tuple[int, ...], "1,2,3"), (1, 2, 3))
+
+        with self.assertRaises(ValueError):
+            self._convert(tuple[int, float], "1,2,3")
+
+    def test_register_converter(self):
+        register_converter(Money, Money.parse)
+        self.assertEqual(self._convert(Money, "1.50").pence, 150)
+        self.assertEqual(
+            [i.pence for i in self._convert(list[Money], "1.50,0.01")],
+            [150, 1],
+        )
+
+    def test_cached(self):
+        """
+        Make sure each annotation is only resolved once.
+        """
+        self.assertIs(get_converter(list[int]), get_converter(list[int]))
+
+
+class RepeatedArgumentTest(TestCase):
+    def test_repeated(self):
+        """
+        Make sure list parameters receive every value when they're repeated,
+        and other parameters receive the last value.
+        """
+        received = []
+
+        def tag(tags: list[str], limit: int = 1):
+            received.append((tags, limit))
+
+        cli = CLI()
+        cli.register(tag)
+        command = cli.commands[0]
+
+        arg_class = cli._get_arg_class(
+            ["--tags=a", "--tags=b,c", "--limit=1", "--limit=2"]
+        )
+        self.assertEqual(
+            command.bind_arguments(arg_class),
+            {"tags": ["a", "b", "c"], "limit": 2},
+        )
+
+        arg_class = Arguments(kwargs={"tags": "a,b"})
+        self.assertEqual(
+            command.bind_arguments(arg_class), {"tags": ["a", "b"]}
+        )
+
+
+try:
+    import numpy  # type: ignore
+except ImportError:
+    numpy = None
+
+
+class VectorTest(TestCase):
+    def setUp(self):
+        file = tempfile.NamedTemporaryFile(
+            mode="w", suffix=".txt", delete=False
+        )
+        file.write("1,2\n3\n4 5\n")
+        file.close()
+        self.path = file.name
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_array(self):
+        converter = get_converter(array.array)
+        assert converter is not None
+
+        value = converter("1,2,3")
+        self.assertEqual(value.typecode, "q")
+        self.assertEqual(value.tolist(), [1, 2, 3])
+
+        value = converter("1,2.5")
+        self.assertEqual(value.typecode, "d")
+        self.assertEqual(value.tolist(), [1.0, 2.5])
+
+    def test_file(self):
+        """
+        Make sure numeric values can be read from a file, using ``@path``.
+        """
+        for annotation in (list[int], array.array):
+            converter = get_converter(annotation)
+            assert converter is not None
+            self.assertEqual(list(converter(f"@{self.path}")), [1, 2, 3, 4, 5])
+
+        # It's only supported for numbers, as strings could start with @.
+        converter = get_converter(list[str])
+        assert converter is not None
+        self.assertEqual(converter("@bob"), ["@bob"])
+
+    def test_repeated(self):
+        received = []
+
+        def total(numbers: array.array):
+            received.append(numbers.tolist())
+
+        cli = CLI()
+        cli.register(total)
+
+        arg_class = cli._get_arg_class(["--numbers=1,2", "--numbers=3"])
+        cli.commands[0].call_with(arg_class)
+        self.assertEqual(received, [[1, 2, 3]])
+
+    @skipIf(numpy is None, "NumPy isn't installed")
+    def test_ndarray(self):
+        from numpy.typing import NDArray  # type: ignore
+
+        converter = get_converter(numpy.ndarray)
+        assert converter is not None
+        self.assertEqual(converter("1,2,3").dtype, numpy.int64)
+        self.assertEqual(converter("1,2.5").tolist(), [1.0, 2.5])
+        self.assertEqual(converter(f"@{self.path}").tolist(), [1, 2, 3, 4, 5])
+
+        converter = get_converter(NDArray[numpy.float32])
+        assert converter is not None
+        self.assertEqual(converter("1,2").dtype, numpy.float32)
@@ -0,0 +1,161 @@
+import asyncio
+import os
+import tempfile
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from targ import CLI
+
+
+def square(tenant: str, value: int):
+    if value < 0:
+        raise ValueError("Negative value")
+    return value * value
+
+
+def get_pid(value: int):
+    return os.getpid()
+
+
+class FanOutTest(TestCase):
+    def test_threads(self):
+        """
+        Make sure the command is called once per line, and failures are
+        collected.
+        """
+        cli = CLI()
+        cli.register(square)
+
+        results = cli.run_map(
+            cli.commands[0],
+            ["acme"],
+            ["--value=2", "# A comment", "", "--value=-1", "--value=abc"],
+            jobs=4,
+        )
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0].result, 4)
+        self.assertEqual(results[0].args, ["--value=2"])
+        self.assertIsInstance(results[1].exception, ValueError)
+        self.assertIsInstance(results[2].exception, ValueError)
+
+    def test_processes(self):
+        cli = CLI()
+        cli.register(get_pid)
+
+        results = cli.run_map(
+            cli.commands[0],
+            [],
+            ["1", "2"],
+            jobs=2,
+            use_processes=True,
+        )
+
+        self.assertTrue(all(i.succeeded for i in results))
+        self.assertNotIn(os.getpid(), [i.result for i in results])
+
+    def test_coroutines(self):
+        """
+        Make sure coroutines run concurrently, up to the number of jobs.
+        """
+        running = 0
+        max_running = 0
+
+        async def task(value: int):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return value
+
+        cli = CLI()
+        cli.register(task)
+
+        results = cli.run_map(
+            cli.commands[0], [], [str(i) for i in range(10)], jobs=3
+        )
+
+        self.assertEqual([i.result for i in results], list(range(10)))
+        self.assertEqual(max_running, 3)
+
+    def test_interrupt(self):
+        """
+        Make sure no more calls are started once interrupted.
+        """
+        calls = []
+
+        def work(value: int):
+            calls.append(value)
+            time.sleep(0.05)
+            if value == 0:
+                raise KeyboardInterrupt()
+
+        cli = CLI()
+        cli.register(work)
+
+        with self.assertRaises(KeyboardInterrupt):
+            cli.run_map(cli.commands[0], [], [str(i) for i in range(10)])
+
+        self.assertLess(len(calls), 10)
+
+    @patch("targ.CLI._get_cleaned_args")
+    def test_invalid_jobs(self, _get_cleaned_args: MagicMock):
+        async def task(value: int):
+            return value
+
+        cli = CLI()
+        cli.register(task)
+
+        for jobs in ("0", "x"):
+            _get_cleaned_args.return_value = [
+                "task",
+                "--targ-map",
+                "-",
+                f"--targ-jobs={jobs}",
+            ]
+            with patch("builtins.print") as print_mock:
+                with self.assertRaises(SystemExit):
+                    cli.run()
+                self.assertIn(
+                    "should be a whole number of at least 1",
+                    str(print_mock.call_args_list),
+                )
+
+        with self.assertRaises(ValueError):
+            cli.run_map(cli.commands[0], [], ["1"], jobs=0)
+
+    @patch("targ.CLI._get_cleaned_args")
+    def test_flags(self, _get_cleaned_args: MagicMock):
+        """
+        Make sure ``--targ-map`` and ``--targ-jobs`` work from the command
+        line, and the exit code reflects any failures.
+        """
+        cli = CLI()
+        cli.register(square)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+            f.write("--value=1\n--value=2\n")
+            f.flush()
+
+            _get_cleaned_args.return_value = [
+                "square",
+                "acme",
+                "--targ-map",
+                f.name,
+                "--targ-jobs=2",
+            ]
+
+            with patch("targ.fan_out.print") as print_mock:
+                cli.run()
+                self.assertIn(
+                    "2 succeeded, 0 failed.", str(print_mock.call_args_list)
+                )
+
+            f.write("--value=-1\n")
+            f.flush()
+
+            with patch("targ.fan_out.print"):
+                with self.assertRaises(SystemExit):
+                    cli.run()
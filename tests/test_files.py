@@ -0,0 +1,201 @@
+import builtins
+import os
+import pathlib
+import tempfile
+from typing import Optional
+from unittest import TestCase
+from unittest.mock import patch
+
+from targ import CLI, Arguments, BinaryFile, MMap
+from targ.files import write_file
+
+builtin_open = builtins.open
+
+
+class FilesTest(TestCase):
+    def setUp(self):
+        file = tempfile.NamedTemporaryFile(suffix=".bin", delete=False)
+        file.write(b"hello world")
+        file.close()
+        self.path = file.name
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def _run(self, cli: CLI, args: list[str]):
+        with patch("targ.CLI._get_cleaned_args", return_value=args):
+            cli.run()
+
+    def test_path(self):
+        """
+        Make sure ``pathlib.Path`` annotations are converted, including when
+        they're optional.
+        """
+        received = []
+
+        def show(path: pathlib.Path, other: Optional[pathlib.Path] = None):
+            received.append((path, other))
+
+        cli = CLI()
+        cli.register(show)
+        self._run(cli, ["show", "a.txt", "--other=b.txt"])
+
+        self.assertEqual(
+            received, [(pathlib.Path("a.txt"), pathlib.Path("b.txt"))]
+        )
+
+    def test_binary_file(self):
+        """
+        Make sure the command receives an open file, which is closed
+        afterwards.
+        """
+        files = []
+
+        def read(file: BinaryFile):
+            files.append(file)
+            self.assertEqual(file.read(), b"hello world")
+
+        cli = CLI()
+        cli.register(read)
+        self._run(cli, ["read", self.path])
+
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].closed)
+
+    def test_invalid_output(self):
+        """
+        Make sure the file is closed if the output format is invalid.
+        """
+
+        def read(file: BinaryFile):
+            pass
+
+        cli = CLI()
+        cli.register(read)
+        command = cli.commands[0]
+
+        kwargs = command.bind_arguments(Arguments(args=[self.path]))
+        with self.assertRaises(ValueError):
+            command.call(kwargs, output_format="unknown")
+
+        self.assertTrue(kwargs["file"].closed)
+
+    def test_fan_out(self):
+        """
+        Make sure files are only opened for the calls which are running.
+        """
+        opened = []
+        max_open = 0
+
+        def open_(*args, **kwargs):
+            file = builtin_open(*args, **kwargs)
+            opened.append(file)
+            return file
+
+        def read(file: BinaryFile):
+            nonlocal max_open
+            max_open = max(max_open, len([i for i in opened if not i.closed]))
+
+        cli = CLI()
+        cli.register(read)
+
+        with patch("builtins.open", side_effect=open_):
+            results = cli.run_map(
+                cli.commands[0], [], [self.path] * 20, jobs=2
+            )
+
+        self.assertTrue(all(i.succeeded for i in results))
+        self.assertEqual(len(opened), 20)
+        self.assertLessEqual(max_open, 2)
+        self.assertTrue(all(i.closed for i in opened))
+
+    def test_mmap(self):
+        """
+        Make sure the command receives a memoryview of the mapped file, which
+        is released afterwards.
+        """
+        views = []
+
+        def read(data: MMap):
+            views.append(data)
+            self.assertEqual(bytes(data[:5]), b"hello")
+            self.assertTrue(data.readonly)
+
+        cli = CLI()
+        cli.register(read)
+        self._run(cli, ["read", self.path])
+
+        self.assertEqual(len(views), 1)
+        with self.assertRaises(ValueError):
+            views[0].tobytes()
+
+    def test_mmap_empty(self):
+        """
+        Empty files can't be memory mapped, so make sure they're still
+        handled.
+        """
+        received = []
+
+        def read(data: MMap):
+            received.append(bytes(data))
+
+        with tempfile.NamedTemporaryFile() as file:
+            cli = CLI()
+            cli.register(read)
+            self._run(cli, ["read", file.name])
+
+        self.assertEqual(received, [b""])
+
+    def test_missing_file(self):
+        """
+        Make sure the path is checked before the command is called.
+        """
+        calls = []
+
+        def read(data: MMap):
+            calls.append(data)
+
+        cli = CLI()
+        cli.register(read)
+
+        with patch("targ.CLI._print_failure") as print_failure:
+            with self.assertRaises(SystemExit):
+                self._run(cli, ["read", "missing.bin"])
+
+        self.assertEqual(calls, [])
+        exception = print_failure.call_args[0][1]
+        self.assertIsInstance(exception, FileNotFoundError)
+
+
+class WriteFileTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "data.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_write(self):
+        write_file(self.path, "text")
+        write_file(self.path, b"bytes")
+
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"bytes")
+
+        self.assertEqual(os.listdir(self.temp_dir.name), ["data.json"])
+
+    def test_failure(self):
+        """
+        Make sure the temporary file is removed if writing fails, and the
+        existing file is left alone.
+        """
+        write_file(self.path, "original")
+
+        with patch("os.replace", side_effect=OSError("Disk full")):
+            with self.assertRaises(OSError):
+                write_file(self.path, "new")
+
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "original")
+
+        self.assertEqual(os.listdir(self.temp_dir.name), ["data.json"])
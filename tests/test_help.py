@@ -0,0 +1,83 @@
+from unittest import TestCase
+
+from targ import CLI
+
+
+def add(a: int, b: int = 2):
+    """
+    Add two numbers together, which is a very useful thing to do when you
+    have lots of numbers lying around.
+
+    :param a:
+        The first number.
+    :param b:
+        The second number, which has a long description, so it has to be
+        wrapped onto several lines.
+
+    """
+    print(a + b)
+
+
+def subtract(a: int, b: int):
+    """
+    Subtract the second number from the first.
+    """
+    print(a - b)
+
+
+class HelpTextTest(TestCase):
+    def _get_cli(self) -> CLI:
+        cli = CLI()
+        cli.register(add)
+        cli.register(subtract, group_name="maths")
+        return cli
+
+    def test_width(self):
+        """
+        Make sure the help text is wrapped to fit the width.
+        """
+        cli = self._get_cli()
+
+        for width in (40, 80):
+            for help_text in (
+                cli.get_help_text(width=width),
+                cli.commands[0].get_help_text(width=width),
+            ):
+                lengths = [len(line) for line in help_text.splitlines()]
+                self.assertLessEqual(max(lengths), width)
+
+    def test_columns(self):
+        """
+        Make sure the descriptions are aligned, and continue on the
+        following lines when they're wrapped.
+        """
+        help_text = self._get_cli().commands[0].get_help_text(width=60)
+        lines = help_text.splitlines()
+        index = lines.index("Args") + 2
+        args = lines[index:]
+
+        self.assertEqual(args[0], "a              The first number.")
+        self.assertTrue(args[1].startswith("b [default=2]  The second"))
+        self.assertRegex(args[2], r"^ {15}\w")
+
+    def test_cached(self):
+        """
+        Make sure the help text is only rendered once for each width, and is
+        rendered again when a new command is registered.
+        """
+        cli = self._get_cli()
+
+        help_text = cli.get_help_text(width=80)
+        self.assertIs(cli.get_help_text(width=80), help_text)
+        self.assertIsNot(cli.get_help_text(width=60), help_text)
+
+        command = cli.commands[0]
+        self.assertIs(
+            command.get_help_text(width=80), command.get_help_text(width=80)
+        )
+
+        def multiply(a: int, b: int):
+            print(a * b)
+
+        cli.register(multiply)
+        self.assertIn("multiply", cli.get_help_text(width=80))
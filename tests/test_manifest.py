@@ -0,0 +1,85 @@
+import json
+import os
+import sys
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from targ import CLI
+from targ.__main__ import build
+
+
+class ManifestTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manifest_path = os.path.join(self.temp_dir.name, "manifest.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _get_cli(self) -> CLI:
+        cli = CLI(manifest_path=self.manifest_path)
+        cli.register("tests.lazy_commands:multiply", group_name="math")
+        return cli
+
+    def test_help_without_import(self):
+        """
+        Make sure help text can be shown using the manifest, without importing
+        the command's module.
+        """
+        self._get_cli().write_manifest()
+        sys.modules.pop("tests.lazy_commands", None)
+
+        cli = self._get_cli()
+        help_text = cli.get_help_text()
+        self.assertIn("Multiply the two numbers.", help_text)
+
+        with patch("builtins.print"):
+            cli.commands[0].print_help()
+
+        self.assertFalse(cli.commands[0].is_loaded)
+        self.assertNotIn("tests.lazy_commands", sys.modules)
+        self.assertEqual(
+            [i.name for i in cli.commands[0].parameters], ["a", "b"]
+        )
+
+    def test_stale_entry(self):
+        """
+        Make sure entries are ignored if the source file has changed.
+        """
+        self._get_cli().write_manifest()
+
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+
+        entry = manifest["commands"]["math multiply"]
+        entry["description"] = "Out of date"
+        entry["source"]["mtime"] -= 1
+        entry["source"]["hash"] = "abc123"
+
+        with open(self.manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+        cli = self._get_cli()
+        cli.get_help_text()
+        self.assertIsNone(cli.commands[0].manifest_entry)
+        self.assertNotIn("Out of date", cli.commands[0].description)
+
+    def test_build_command(self):
+        """
+        Make sure ``targ manifest build`` writes the manifest.
+        """
+        with patch("builtins.print"):
+            build(
+                cli="tests.test_manifest:example_cli",
+                path=self.manifest_path,
+            )
+
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+
+        self.assertIn("math multiply", manifest["commands"])
+
+
+example_cli = CLI()
+example_cli.register("tests.lazy_commands:multiply", group_name="math")
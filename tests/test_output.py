@@ -0,0 +1,185 @@
+import dataclasses
+import io
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from targ import CLI
+from targ.output import OutputWriter
+
+
+@dataclasses.dataclass
+class Band:
+    name: str
+    members: int
+
+
+def get_bands():
+    yield Band(name="Pythonistas", members=3)
+    yield Band(name="Rustaceans", members=12)
+
+
+class OutputWriterTest(TestCase):
+    def _write(self, format: str, value) -> str:
+        file = io.StringIO()
+        OutputWriter(format=format, file=file).write(value)
+        return file.getvalue()
+
+    def test_jsonl(self):
+        self.assertEqual(
+            self._write("jsonl", get_bands()),
+            '{"name": "Pythonistas", "members": 3}\n'
+            '{"name": "Rustaceans", "members": 12}\n',
+        )
+
+    def test_json(self):
+        self.assertEqual(
+            json.loads(self._write("json", get_bands())),
+            [
+                {"name": "Pythonistas", "members": 3},
+                {"name": "Rustaceans", "members": 12},
+            ],
+        )
+        self.assertEqual(self._write("json", iter([])), "[]\n")
+        self.assertEqual(json.loads(self._write("json", {"a": 1})), {"a": 1})
+
+    def test_csv(self):
+        self.assertEqual(
+            self._write("csv", get_bands()),
+            "name,members\nPythonistas,3\nRustaceans,12\n",
+        )
+        self.assertEqual(self._write("csv", [(1, 2), (3, 4)]), "1,2\n3,4\n")
+
+    def test_table(self):
+        self.assertEqual(
+            self._write("table", get_bands()),
+            "name        | members\n"
+            "------------+--------\n"
+            "Pythonistas | 3\n"
+            "Rustaceans  | 12\n",
+        )
+
+    def test_none(self):
+        """
+        Make sure nothing is written if the command doesn't return anything.
+        """
+        self.assertEqual(self._write("jsonl", None), "")
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            OutputWriter(format="xml")
+
+    def test_streaming(self):
+        """
+        Make sure rows are written in chunks as they're yielded, rather than
+        all being held in memory.
+        """
+        file = io.StringIO()
+        writer = OutputWriter(format="jsonl", file=file)
+        writer.chunk_size = 10
+
+        def numbers():
+            for number in range(100):
+                if number == 50:
+                    self.assertEqual(len(file.getvalue().split()), 50)
+                yield number
+
+        writer.write(numbers())
+        self.assertEqual(len(file.getvalue().split()), 100)
+
+    def test_broken_pipe(self):
+        """
+        Make sure the generator is stopped if the reader goes away.
+        """
+
+        class ClosedFile(io.StringIO):
+            def write(self, text):
+                raise BrokenPipeError()
+
+        closed = []
+
+        def numbers():
+            try:
+                for number in range(100_000):
+                    yield number
+            finally:
+                closed.append(True)
+
+        rows = numbers()
+        writer = OutputWriter(format="jsonl", file=ClosedFile())
+        writer.write(rows)
+
+        self.assertEqual(closed, [True])
+
+
+class TargOutputTest(TestCase):
+    def _run(self, cli: CLI, args: list[str]) -> str:
+        stdout = io.StringIO()
+        with patch("targ.CLI._get_cleaned_args", return_value=args):
+            with patch("sys.stdout", stdout):
+                cli.run()
+        return stdout.getvalue()
+
+    def test_generator(self):
+        cli = CLI()
+        cli.register(get_bands)
+
+        self.assertEqual(
+            self._run(cli, ["get_bands", "--targ-output=csv"]),
+            "name,members\nPythonistas,3\nRustaceans,12\n",
+        )
+
+    def test_async_generator(self):
+        async def count(limit: int):
+            for number in range(limit):
+                yield number
+
+        cli = CLI()
+        cli.register(count)
+
+        self.assertEqual(
+            self._run(cli, ["count", "3", "--targ-output", "jsonl"]),
+            "0\n1\n2\n",
+        )
+
+    def test_coroutine(self):
+        async def get_total(a: int, b: int):
+            return {"total": a + b}
+
+        cli = CLI()
+        cli.register(get_total)
+
+        self.assertEqual(
+            self._run(cli, ["get_total", "1", "2", "--targ-output=jsonl"]),
+            '{"total": 3}\n',
+        )
+
+    def test_no_output_format(self):
+        """
+        Make sure return values are ignored without ``--targ-output``.
+        """
+
+        def get_total(a: int, b: int):
+            return a + b
+
+        cli = CLI()
+        cli.register(get_total)
+
+        self.assertEqual(self._run(cli, ["get_total", "1", "2"]), "")
+
+    def test_unknown_format(self):
+        """
+        Make sure the command isn't run if the format isn't recognised.
+        """
+        calls = []
+
+        def get_total(a: int, b: int):
+            calls.append((a, b))
+
+        cli = CLI()
+        cli.register(get_total)
+
+        with self.assertRaises(SystemExit):
+            self._run(cli, ["get_total", "1", "2", "--targ-output=xml"])
+
+        self.assertEqual(calls, [])
@@ -0,0 +1,144 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+from unittest import TestCase
+from unittest.mock import patch
+
+from targ import CLI
+from targ.plugins import get_entry_points
+
+
+class PluginTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.site_dir = os.path.join(self.temp_dir.name, "site-packages")
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+        os.makedirs(self.site_dir)
+
+        self._install(
+            "maths_plugin",
+            {"maths.multiply": "tests.lazy_commands:multiply"},
+        )
+
+        sys.path.insert(0, self.site_dir)
+        self.environ = patch.dict(os.environ, XDG_CACHE_HOME=self.cache_dir)
+        self.environ.start()
+
+    def tearDown(self):
+        self.environ.stop()
+        sys.path.remove(self.site_dir)
+        self.temp_dir.cleanup()
+
+    def _install(self, name: str, commands: dict[str, str]):
+        """
+        Fake an installed package, with entry points.
+        """
+        dist_info = os.path.join(self.site_dir, f"{name}-1.0.dist-info")
+        os.makedirs(dist_info)
+
+        with open(os.path.join(dist_info, "METADATA"), "w") as f:
+            f.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\n")
+
+        with open(os.path.join(dist_info, "entry_points.txt"), "w") as f:
+            f.write("[targ.commands]\n")
+            for key, value in commands.items():
+                f.write(f"{key} = {value}\n")
+
+        # Make sure the modification time changes, even if the file system's
+        # timestamps are coarse.
+        modified = os.stat(self.site_dir).st_mtime_ns + 1_000_000_000
+        os.utime(self.site_dir, ns=(modified, modified))
+
+    def test_register_plugins(self):
+        """
+        Make sure plugin commands are registered lazily.
+        """
+        sys.modules.pop("tests.lazy_commands", None)
+
+        cli = CLI()
+        cli.register_plugins()
+
+        command = cli.commands[0]
+        self.assertEqual(command.full_name, "maths multiply")
+        self.assertFalse(command.is_loaded)
+        self.assertNotIn("tests.lazy_commands", sys.modules)
+
+        with patch("builtins.print") as print_:
+            cli.run_batch(["maths multiply 2 3"])
+
+        print_.assert_called_with(6)
+
+    def test_cache(self):
+        """
+        Make sure the packages are only scanned again when ``sys.path``
+        changes.
+        """
+        self.assertEqual(
+            get_entry_points(),
+            [["maths.multiply", "tests.lazy_commands:multiply"]],
+        )
+
+        with patch("targ.plugins.scan_entry_points") as scan_entry_points:
+            get_entry_points()
+
+        scan_entry_points.assert_not_called()
+
+        self._install("greeting_plugin", {"hello": "greetings:hello"})
+        self.assertEqual(
+            sorted(get_entry_points()),
+            [
+                ["hello", "greetings:hello"],
+                ["maths.multiply", "tests.lazy_commands:multiply"],
+            ],
+        )
+
+    def test_clash(self):
+        """
+        Make sure a clashing plugin command doesn't stop the CLI working.
+        """
+
+        def multiply(a: int, b: int):
+            pass
+
+        cli = CLI()
+        cli.register(multiply, group_name="maths")
+
+        with self.assertWarns(UserWarning):
+            cli.register_plugins()
+
+        self.assertEqual(len(cli.commands), 1)
+        self.assertIs(cli.commands[0].command, multiply)
+
+    def test_cached_startup(self):
+        """
+        Make sure ``importlib.metadata`` isn't imported when the cache is up
+        to date, as it's slow to import.
+        """
+        script = textwrap.dedent(f"""
+            import sys
+
+            sys.path.insert(0, {self.site_dir!r})
+
+            from targ import CLI
+
+            CLI().register_plugins()
+            print("importlib.metadata" in sys.modules)
+            """)
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.path.dirname(os.path.dirname(__file__)),
+        }
+
+        outputs = [
+            subprocess.run(
+                [sys.executable, "-c", script],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+            for _ in range(2)
+        ]
+        self.assertEqual(outputs, ["True", "False"])
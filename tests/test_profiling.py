@@ -0,0 +1,61 @@
+import io
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from targ import CLI
+
+
+def add(a: int, b: int):
+    print(a + b)
+
+
+class ProfilingTest(TestCase):
+    def _run(self, *args: str) -> str:
+        cli = CLI()
+        cli.register(add)
+
+        with patch("targ.CLI._get_cleaned_args") as _get_cleaned_args:
+            _get_cleaned_args.return_value = ["add", "1", "2", *args]
+            with patch("sys.stderr", new_callable=io.StringIO) as stderr:
+                with patch("builtins.print", wraps=print) as print_mock:
+                    cli.run()
+                    print_mock.assert_any_call(3)
+                return stderr.getvalue()
+
+    def test_phases(self):
+        """
+        Make sure the time taken by each phase is shown.
+        """
+        report = self._run("--targ-profile")
+        for phase in (
+            "Registering 1 commands",
+            "Loading the command",
+            "Parsing arguments",
+            "Converting arguments",
+            "Running the command",
+        ):
+            self.assertIn(phase, report)
+
+    def test_cprofile(self):
+        report = self._run("--targ-profile=cprofile")
+        self.assertIn("function calls", report)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "stats.prof")
+            self._run(f"--targ-profile={path}")
+            self.assertTrue(os.path.exists(path))
+
+    @patch("targ.profiling.subprocess.run")
+    def test_imports(self, run: MagicMock):
+        run.return_value.stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:        10 |         10 |   fast\n"
+            "import time:      2000 |       5000 | tests.test_profiling\n"
+        )
+
+        report = self._run("--targ-profile=imports")
+        self.assertIn("tests.test_profiling", report)
+        self.assertNotIn("fast", report)
+        self.assertIn("import tests.test_profiling", run.call_args[0][0])
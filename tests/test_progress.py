@@ -0,0 +1,151 @@
+import io
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from targ import CLI, Arguments, Progress
+from targ.progress import format_duration
+
+
+class TTYStringIO(io.StringIO):
+    def isatty(self) -> bool:
+        return True
+
+
+class ProgressTest(TestCase):
+    def test_render(self):
+        progress = Progress(total=200, description="Importing")
+        progress.advance(50)
+        line = progress.render()
+        self.assertTrue(line.startswith("Importing 50/200 (25%)"))
+        self.assertIn("/s", line)
+        self.assertIn("left", line)
+
+        # Without a total, just the count and rate are shown.
+        progress = Progress()
+        progress.advance()
+        self.assertTrue(progress.render().startswith("1 "))
+
+    def test_bar(self):
+        """
+        Make sure a progress bar is only shown on a terminal.
+        """
+        progress = Progress(total=4, file=TTYStringIO())
+        progress.advance(2)
+        with patch("targ.format.use_color", return_value=False):
+            line = progress.render(width=80)
+        bar = line.split("[")[1].split("]")[0]
+        self.assertEqual(bar.count("#"), len(bar) // 2)
+        self.assertEqual(len(line), 80)
+
+        progress = Progress(total=4, file=io.StringIO())
+        progress.advance(2)
+        self.assertNotIn("#", progress.render(width=80))
+
+    def test_log(self):
+        """
+        Make sure the progress is written out periodically when it's not a
+        terminal, without repeating lines.
+        """
+        file = io.StringIO()
+        with Progress(total=10, file=file, interval=0.01) as progress:
+            progress.advance(5)
+            time.sleep(0.1)
+
+        lines = file.getvalue().splitlines()
+        self.assertEqual(len(lines), len(set(lines)))
+        self.assertTrue(lines[0].startswith("5/10 (50%)"))
+
+    def test_unused(self):
+        """
+        If the progress is never used, nothing is written out.
+        """
+        file = io.StringIO()
+        Progress(file=file).start().close()
+        self.assertEqual(file.getvalue(), "")
+
+    def test_format_duration(self):
+        self.assertEqual(format_duration(5.5), "5s")
+        self.assertEqual(format_duration(65), "1m05s")
+        self.assertEqual(format_duration(3720), "1h02m")
+
+
+class CommandTest(TestCase):
+    def setUp(self):
+        def process(count: int, progress: Progress):
+            """
+            Process some items.
+
+            :param count:
+                How many items to process.
+
+            """
+            progress.total = count
+            for _ in range(count):
+                progress.advance()
+
+        self.cli = CLI()
+        self.cli.register(process)
+
+    def test_passed_in(self):
+        """
+        Make sure targ passes in a ``Progress``, and writes out the final
+        progress to stderr once the command has finished.
+        """
+        stderr = io.StringIO()
+        with patch("sys.stderr", stderr):
+            self.assertEqual(self.cli.run_batch(["process 3"]), [0])
+
+        self.assertTrue(stderr.getvalue().startswith("3/3 (100%)"))
+
+    def test_started_on_call(self):
+        """
+        Make sure the ``Progress`` is only created once the command is
+        called, and stopped even if the command doesn't run.
+        """
+        command = self.cli.commands[0]
+        kwargs = command.bind_arguments(Arguments(args=["3"]))
+        self.assertNotIn("progress", kwargs)
+
+        threads = threading.active_count()
+        with self.assertRaises(ValueError):
+            command.call(kwargs, output_format="unknown")
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_fan_out(self):
+        """
+        Make sure only the running calls have a thread drawing the progress.
+        """
+        threads = threading.active_count()
+        max_threads = 0
+
+        def process(count: int, progress: Progress):
+            nonlocal max_threads
+            max_threads = max(max_threads, threading.active_count())
+            time.sleep(0.01)
+            progress.advance(count)
+
+        cli = CLI()
+        cli.register(process)
+
+        with patch("sys.stderr", io.StringIO()):
+            results = cli.run_map(
+                cli.commands[0], [], [str(i) for i in range(20)], jobs=2
+            )
+
+        self.assertTrue(all(i.succeeded for i in results))
+        # Two workers, each with a progress thread.
+        self.assertLessEqual(max_threads, threads + 4)
+
+    def test_help(self):
+        """
+        Make sure the parameter isn't shown in the help text.
+        """
+        stdout = io.StringIO()
+        with patch("sys.stdout", stdout):
+            self.cli.run_batch(["process --help"])
+
+        output = stdout.getvalue()
+        self.assertIn("count", output)
+        self.assertNotIn("progress", output)
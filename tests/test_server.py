@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+from unittest import TestCase, skipUnless
+
+from targ.server import is_supported
+
+SCRIPT = textwrap.dedent("""
+    from targ import CLI
+
+
+    def add(a: int, b: int):
+        print({prefix!r}, a + b)
+
+
+    if __name__ == "__main__":
+        cli = CLI()
+        cli.register(add)
+        cli.run()
+    """)
+
+
+@skipUnless(is_supported(), "Server mode is only supported on Unix.")
+class ServerTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.script_path = os.path.join(self.temp_dir.name, "cli.py")
+        self.socket_path = os.path.join(self.temp_dir.name, "cli.sock")
+        self.env = {
+            **os.environ,
+            "PYTHONPATH": os.path.dirname(os.path.dirname(__file__)),
+        }
+        self._write_script(prefix="sum")
+
+        self.server = subprocess.Popen(
+            [
+                sys.executable,
+                self.script_path,
+                "--targ-serve",
+                self.socket_path,
+            ],
+            env=self.env,
+            stdout=subprocess.DEVNULL,
+        )
+
+    def tearDown(self):
+        self.server.terminate()
+        self.server.wait()
+        self.temp_dir.cleanup()
+
+    def _write_script(self, prefix: str):
+        with open(self.script_path, "w") as f:
+            f.write(SCRIPT.format(prefix=prefix))
+
+    def _run_client(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, "-m", "targ.client", self.socket_path, *args],
+            env=self.env,
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+
+    def test_run(self):
+        """
+        Make sure commands run on the server, and the output and exit code
+        are passed back to the client.
+        """
+        response = self._run_client("add", "1", "2")
+        self.assertEqual(response.returncode, 0)
+        self.assertEqual(response.stdout, "sum 3\n")
+
+        response = self._run_client("add", "1", "abc")
+        self.assertEqual(response.returncode, 1)
+        self.assertIn("The command failed.", response.stdout)
+
+    def test_permissions(self):
+        """
+        Make sure only the current user can connect to the socket.
+        """
+        self.assertEqual(self._run_client("add", "1", "2").returncode, 0)
+        self.assertEqual(os.stat(self.socket_path).st_mode & 0o777, 0o600)
+
+    def test_reload(self):
+        """
+        Make sure the server restarts if the source files change.
+        """
+        self.assertEqual(self._run_client("add", "1", "2").stdout, "sum 3\n")
+
+        # Make sure the modification time changes.
+        time.sleep(0.01)
+        self._write_script(prefix="total")
+
+        response = self._run_client("add", "1", "2")
+        self.assertEqual(response.stdout, "total 3\n", response.stderr)
@@ -0,0 +1,60 @@
+import io
+from unittest import TestCase
+from unittest.mock import patch
+
+from targ import CLI
+from targ.shell import Shell
+
+
+class ShellTest(TestCase):
+    def setUp(self):
+        self.received = []
+
+        def add(a: int, b: int):
+            self.received.append(a + b)
+
+        async def greet(name: str, loud: bool = False):
+            self.received.append(f"hello {name}")
+
+        self.cli = CLI(persistent_loop=True)
+        self.cli.register(add, group_name="maths")
+        self.cli.register(greet)
+
+    def tearDown(self):
+        self.cli.close()
+
+    def _run(self, *lines: str) -> str:
+        stdout = io.StringIO()
+        with patch("sys.stdout", stdout):
+            shell = Shell(self.cli, stdin=io.StringIO("\n".join(lines)))
+            shell.cmdloop()
+        return stdout.getvalue()
+
+    def test_commands(self):
+        """
+        Make sure each line is run as a command, using the same event loop
+        for coroutines.
+        """
+        self._run("maths add 1 2", "", "greet bob", "greet sally", "exit")
+        self.assertEqual(self.received, [3, "hello bob", "hello sally"])
+
+    def test_unrecognised(self):
+        output = self._run("maths divide 1 2")
+        self.assertIn("Unrecognised command - divide", output)
+
+        output = self._run("multiply 1 2")
+        self.assertIn("Unrecognised command - multiply", output)
+
+    def test_help(self):
+        output = self._run("help maths add")
+        self.assertIn("Usage", output)
+        self.assertIn("maths add", self._run("help"))
+
+    def test_complete(self):
+        shell = Shell(self.cli, stdin=io.StringIO())
+
+        self.assertEqual(shell.completenames("ma", "ma", 0, 2), ["maths"])
+        self.assertEqual(shell.completedefault("a", "maths a", 6, 7), ["add"])
+        self.assertEqual(
+            shell.completedefault("--l", "greet --l", 6, 9), ["--loud"]
+        )
@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from unittest import TestCase
+
+# The maximum time (in seconds) for importing targ, registering a command,
+# and running it. It's deliberately generous, so the test isn't flaky on
+# slow machines - the main thing is to catch heavy imports creeping in.
+STARTUP_BUDGET = 0.2
+
+# None of these should be needed for running a command without help text.
+LAZY_MODULES = [
+    "asyncio",
+    "colorama",
+    "concurrent.futures",
+    "docstring_parser",
+    "mmap",
+    "pathlib",
+    "targ.cache",
+    "targ.completion",
+    "targ.fan_out",
+    "targ.manifest",
+    "targ.plugins",
+    "targ.profiling",
+    "targ.server",
+    "targ.shell",
+    "targ.tasks",
+]
+
+SCRIPT = textwrap.dedent("""
+    import json
+    import sys
+    import time
+
+    started_at = time.perf_counter()
+
+    from targ import CLI
+
+
+    def add(a: int, b: int):
+        \"\"\"
+        Add the two numbers.
+        \"\"\"
+        pass
+
+
+    cli = CLI()
+    cli.register(add)
+    sys.argv = ["main.py", "add", "1", "2"]
+    cli.run()
+
+    print(
+        json.dumps(
+            {
+                "duration": time.perf_counter() - started_at,
+                "modules": list(sys.modules.keys()),
+            }
+        )
+    )
+    """)
+
+
+class StartupTest(TestCase):
+    def _run(self) -> dict:
+        response = subprocess.run(
+            [sys.executable, "-c", SCRIPT],
+            env={
+                **os.environ,
+                "PYTHONPATH": os.path.dirname(os.path.dirname(__file__)),
+            },
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return json.loads(response.stdout)
+
+    def test_lazy_imports(self):
+        """
+        Make sure that modules which are only needed for help text, colours,
+        or other optional features aren't imported when running a command.
+        """
+        modules = self._run()["modules"]
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_budget(self):
+        # The first run writes the bytecode.
+        self._run()
+        duration = min(self._run()["duration"] for _ in range(3))
+        self.assertLess(duration, STARTUP_BUDGET)
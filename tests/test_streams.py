@@ -0,0 +1,100 @@
+import io
+import os
+import tempfile
+from collections.abc import Iterable, Iterator
+from unittest import TestCase
+from unittest.mock import patch
+
+from targ import CLI, Stream
+
+
+class StreamTest(TestCase):
+    def setUp(self):
+        file = tempfile.NamedTemporaryFile(
+            mode="w", suffix=".txt", delete=False
+        )
+        file.write("1\n2\n3\n")
+        file.close()
+        self.path = file.name
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def _run(self, cli: CLI, args: list[str]):
+        with patch("targ.CLI._get_cleaned_args", return_value=args):
+            cli.run()
+
+    def test_file(self):
+        """
+        Make sure each line of the file is converted, based on the element
+        type of the annotation.
+        """
+        received = []
+
+        def total(numbers: Iterator[int]):
+            received.append(sum(numbers))
+
+        cli = CLI()
+        cli.register(total)
+
+        self._run(cli, ["total", self.path])
+        self._run(cli, ["total", f"--numbers={self.path}"])
+        self.assertEqual(received, [6, 6])
+
+    def test_stdin(self):
+        """
+        Make sure the lines are read from stdin if the argument is ``-``, or
+        if it's omitted.
+        """
+        received = []
+
+        def collect(names: Iterable[str]):
+            received.append(list(names))
+
+        cli = CLI()
+        cli.register(collect)
+
+        for args in (["collect", "-"], ["collect"]):
+            with patch("sys.stdin", io.StringIO("bob\nsally\n")):
+                self._run(cli, args)
+
+        self.assertEqual(received, [["bob", "sally"], ["bob", "sally"]])
+
+    def test_lazy(self):
+        """
+        Make sure lines are only read as they're needed, and the file is
+        closed once the command has finished.
+        """
+        streams = []
+
+        def first(numbers: Stream[int]):
+            streams.append(numbers)
+            self.assertEqual(next(numbers), 1)
+            file = numbers._file
+            assert file is not None
+            self.assertEqual(file.readline(), "2\n")
+
+        cli = CLI()
+        cli.register(first)
+        self._run(cli, ["first", self.path])
+
+        self.assertEqual(len(streams), 1)
+        self.assertIsNone(streams[0]._file)
+
+    def test_missing_file(self):
+        """
+        Make sure a missing file is reported as a failure.
+        """
+
+        def total(numbers: Iterator[int]):
+            print(sum(numbers))
+
+        cli = CLI()
+        cli.register(total)
+
+        with patch("targ.CLI._print_failure") as print_failure:
+            with self.assertRaises(SystemExit):
+                self._run(cli, ["total", "missing.txt"])
+
+        exception = print_failure.call_args[0][1]
+        self.assertIsInstance(exception, FileNotFoundError)
@@ -0,0 +1,223 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from targ import CLI
+from targ.tasks import TaskStatus
+
+
+class TaskTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.environ = patch.dict(
+            os.environ,
+            XDG_CACHE_HOME=os.path.join(self.temp_dir.name, "cache"),
+        )
+        self.environ.start()
+        self.cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        self.calls = []
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.environ.stop()
+        self.temp_dir.cleanup()
+
+    def _run(self, cli: CLI, line: str) -> str:
+        stdout = io.StringIO()
+        self.stderr = io.StringIO()
+        with patch("sys.stdout", stdout), patch("sys.stderr", self.stderr):
+            self.status = cli.run_batch([line])[0]
+        return stdout.getvalue()
+
+    def _get_cli(self) -> CLI:
+        """
+        ``build`` depends on ``compile`` and ``assets``, which both depend on
+        ``fetch``.
+        """
+
+        def fetch(source: str = "main"):
+            self.calls.append(f"fetch {source}")
+
+        def compile():
+            self.calls.append("compile")
+
+        async def assets():
+            self.calls.append("assets")
+
+        def build(release: bool = False):
+            self.calls.append(f"build {release}")
+
+        cli = CLI()
+        cli.register(fetch)
+        cli.register(compile, depends_on=["fetch --source=mirror"])
+        cli.register(
+            assets, group_name="web", depends_on=["fetch --source=mirror"]
+        )
+        cli.register(build, depends_on=["compile", "web assets"])
+        return cli
+
+    def test_dependencies(self):
+        """
+        Make sure dependencies run first, and only once.
+        """
+        cli = self._get_cli()
+        self._run(cli, "build --release")
+
+        self.assertEqual(self.status, 0)
+        self.assertEqual(
+            self.calls,
+            ["fetch mirror", "compile", "assets", "build True"],
+        )
+
+    def test_output(self):
+        """
+        Make sure the progress messages don't get mixed up with the
+        command's output.
+        """
+
+        def report():
+            return {"ok": True}
+
+        cli = self._get_cli()
+        cli.register(report, depends_on=["fetch"])
+
+        output = self._run(cli, "report --targ-output=json")
+        self.assertEqual(json.loads(output), {"ok": True})
+        self.assertIn("Running fetch", self.stderr.getvalue())
+
+    def test_parallel(self):
+        """
+        Make sure independent tasks run at the same time.
+        """
+        barrier = threading.Barrier(2, timeout=5)
+
+        def lint():
+            barrier.wait()
+
+        def test():
+            barrier.wait()
+
+        def check():
+            pass
+
+        cli = CLI()
+        cli.register(lint)
+        cli.register(test)
+        cli.register(check, depends_on=["lint", "test"])
+
+        results = cli.run_tasks(cli.commands[2], jobs=2)
+        self.assertEqual(
+            [i.status for i in results], [TaskStatus.succeeded] * 3
+        )
+
+        # Coroutines get their own event loop in each thread.
+        cli = self._get_cli()
+        results = cli.run_tasks(cli.commands[3], jobs=2)
+        self.assertEqual(
+            [i.status for i in results], [TaskStatus.succeeded] * 4
+        )
+        self.assertEqual(self.calls[-1], "build False")
+
+    def test_failure(self):
+        """
+        Make sure nothing else runs once a dependency fails.
+        """
+
+        def fetch():
+            raise ValueError("Network unavailable")
+
+        def build():
+            self.calls.append("build")
+
+        cli = CLI()
+        cli.register(fetch)
+        cli.register(build, depends_on=["fetch"])
+
+        output = self._run(cli, "build")
+        self.assertEqual(self.status, 1)
+        self.assertEqual(self.calls, [])
+        self.assertIn("Network unavailable", output)
+        self.assertIn("These weren't run: build", output)
+
+    def test_unsupported(self):
+        """
+        Make sure commands with dependencies aren't run without them.
+        """
+        cli = self._get_cli()
+        build = cli.commands[3]
+
+        with patch("builtins.print") as print_mock:
+            status = asyncio.run(cli.run_async(["build"]))
+        self.assertEqual(status, 1)
+        self.assertIn("use run_tasks", str(print_mock.call_args_list))
+
+        for option in (["--targ-profile"], ["--targ-map", "-"]):
+            with patch.object(
+                cli, "_get_cleaned_args", return_value=["build", *option]
+            ), patch("builtins.print") as print_mock:
+                with self.assertRaises(SystemExit):
+                    cli.run()
+            self.assertIn(
+                f"aren't supported with {option[0]}",
+                str(print_mock.call_args_list),
+            )
+
+        with self.assertRaises(ValueError):
+            cli.run_map(build, [], ["--release"])
+
+        self.assertEqual(self.calls, [])
+
+    def test_invalid(self):
+        def build():
+            pass
+
+        def test():
+            pass
+
+        cli = CLI()
+        cli.register(build, depends_on=["test"])
+        cli.register(test, depends_on=["build"])
+        self.assertIn("circular dependency", self._run(cli, "build"))
+        self.assertEqual(self.status, 1)
+
+        cli = CLI()
+        cli.register(build, depends_on=["missing"])
+        self.assertIn("isn't a registered command", self._run(cli, "build"))
+
+    def test_up_to_date(self):
+        """
+        Make sure tasks are skipped if their files haven't changed.
+        """
+        with open("input.txt", "w") as f:
+            f.write("hello")
+
+        def upper():
+            self.calls.append("upper")
+            with open("input.txt") as f:
+                contents = f.read()
+            with open("output.txt", "w") as f:
+                f.write(contents.upper())
+
+        cli = CLI()
+        cli.register(upper, inputs=["*.txt"], outputs=["output.txt"])
+
+        self._run(cli, "upper")
+        self._run(cli, "upper")
+        self.assertIn("upper is up to date", self.stderr.getvalue())
+        self.assertEqual(self.calls, ["upper"])
+
+        with open("input.txt", "w") as f:
+            f.write("goodbye")
+
+        self._run(cli, "upper")
+        self.assertEqual(self.calls, ["upper", "upper"])
+
+        os.remove("output.txt")
+        self._run(cli, "upper")
+        self.assertEqual(len(self.calls), 3)